@@ -1,5 +1,6 @@
 using UnityEngine;
 using System.Collections.Generic;
+using System.Globalization;
 using System.IO;
 using System.Linq;
 
@@ -29,6 +30,11 @@ namespace DroneSim
         private List<TargetData> targetDataList = new List<TargetData>();
         private bool isInitialized = false;
 
+        // Set when the file starts with a "# t0=...,dt=..." line (fixed-rate grid from the simulation service)
+        private bool hasUniformGrid = false;
+        private float gridT0 = 0f;
+        private float gridDt = 0f;
+
         void Awake()
         {
             LoadCsvData();
@@ -43,8 +49,16 @@ namespace DroneSim
             {
                 var lines = File.ReadAllLines(fullPath); // Directly try to read
 
-                // Skip header row (assuming first line is header)
-                for (int i = 1; i < lines.Length; i++)
+                int firstDataLine = 1;
+                hasUniformGrid = false;
+                if (lines.Length > 0 && lines[0].StartsWith("#"))
+                {
+                    hasUniformGrid = TryParseGridHeader(lines[0]);
+                    firstDataLine = 2; // grid line + column header
+                }
+
+                // Skip header row(s)
+                for (int i = firstDataLine; i < lines.Length; i++)
                 {
                     var values = lines[i].Split(',');
 
@@ -70,6 +84,11 @@ namespace DroneSim
                 // Sort by time just in case the CSV isn't ordered
                 targetDataList = targetDataList.OrderBy(td => td.Time).ToList();
 
+                if (hasUniformGrid)
+                {
+                    Debug.Log($"CsvReader: uniform grid t0={gridT0}, dt={gridDt}");
+                }
+
                 if (targetDataList.Count > 0)
                 {
                     isInitialized = true;
@@ -128,7 +147,16 @@ namespace DroneSim
             }
 
             // Find the two data points surrounding the current time
-            int index = targetDataList.FindIndex(td => td.Time >= currentTime);
+            int index;
+            if (hasUniformGrid)
+            {
+                // Rows sit at t0 + k*dt, so the right bracket is a direct index
+                index = Mathf.Clamp(Mathf.FloorToInt((currentTime - gridT0) / gridDt) + 1, 1, targetDataList.Count - 1);
+            }
+            else
+            {
+                index = targetDataList.FindIndex(td => td.Time >= currentTime);
+            }
             TargetData prevData = targetDataList[index - 1];
             TargetData nextData = targetDataList[index];
 
@@ -140,6 +168,33 @@ namespace DroneSim
             return new TargetData(currentTime, interpolatedPitch, interpolatedRoll);
         }
 
+        // Parses "# t0=<float>,dt=<float>,..." written by simulation-service/src/resampling.py
+        bool TryParseGridHeader(string line)
+        {
+            bool haveT0 = false, haveDt = false;
+            foreach (var item in line.TrimStart('#').Split(','))
+            {
+                var pair = item.Split('=');
+                if (pair.Length != 2) continue;
+                string key = pair[0].Trim();
+                string value = pair[1].Trim();
+                if (key == "t0")
+                {
+                    haveT0 = float.TryParse(value, NumberStyles.Float, CultureInfo.InvariantCulture, out gridT0);
+                }
+                else if (key == "dt")
+                {
+                    haveDt = float.TryParse(value, NumberStyles.Float, CultureInfo.InvariantCulture, out gridDt);
+                }
+            }
+            if (!haveT0 || !haveDt || gridDt <= 0f)
+            {
+                Debug.LogWarning($"CsvReader: ignoring malformed grid header: {line}");
+                return false;
+            }
+            return true;
+        }
+
         public bool IsInitialized()
         {
             return isInitialized;
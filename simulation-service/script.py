@@ -5,6 +5,11 @@ Simcenter → normalise → PID builder
 • Double‑click  → runs once with example\plane_config.json
 • -c <cfg.json> → runs once with that config
 • --watch DIR   → polls DIR for new *.json configs
+                   (--licenses N runs up to N simulations at once,
+                    shortest predicted runtime first)
+
+Each job runs in its own workspace and only publishes finished files, so
+concurrent jobs never overwrite each other's outputs.
 
 Dependencies: pandas (auto‑installed if missing)
 """
@@ -24,7 +29,7 @@ def _ensure_pandas():
 pd = _ensure_pandas()
 
 # ── stdlib imports (after future import) ─────────────────────────────────────
-import argparse
+import argparse, json
 from pathlib import Path
 from typing import Iterable, Tuple, Set
 
@@ -32,7 +37,8 @@ from typing import Iterable, Tuple, Set
 SCRIPT_DIR   = Path(__file__).resolve().parent
 AME_DIR      = r"C:\Program Files\Simcenter\2310\Amesim"
 SIM_PY       = Path(AME_DIR) / "python.bat"
-SIM_SCRIPT   = str(SCRIPT_DIR / "src" / "__main__.py")
+SRC_DIR      = SCRIPT_DIR / "src"
+SIM_SCRIPT   = str(SRC_DIR / "__main__.py")
 DEFAULT_CFG  = str(SCRIPT_DIR / "example" / "plane_config.json")
 
 # input.csv lives in example\data
@@ -41,43 +47,80 @@ INPUT_PATH   = SCRIPT_DIR / "example" / "data" / "input.csv"
 # roll / pitch CSVs come from AMESIM\Outputs
 CSV_DIR      = Path(r"C:\Users\PhotonUser\My Files\OneDrive\Files\AMESIM\Outputs") # Make sure this is correct
 OUT_DIR      = SCRIPT_DIR
+# simulation outputs land in <launch dir>/output, as when the service is run directly
+LAUNCH_DIR   = Path.cwd()
+CATALOG_DB   = LAUNCH_DIR / "output" / "catalog" / "runs.sqlite"
+SEGMENT_CACHE = LAUNCH_DIR / "output" / "segments"
+OPTIMIZE_TABLES = LAUNCH_DIR / "output" / "optimize" / "tables"
+PROFILE_CACHE = LAUNCH_DIR / "output" / "profiles"  # tables compiled from a stage input.csv
 
 EXCLUDE_COLS: Iterable[str] = ("Time - s", "Time", "time")
 TIME_ALIAS, PITCH_ALIAS, ROLL_ALIAS = "Time", "Target Pitch", "Target Roll"
 FLOAT_FMT    = "%.6f"
 POLL_SECS    = 5
+RESAMPLE_METHOD = "linear"   # used when --rate is given: linear | cubic | zoh
+LICENSES     = 1             # Amesim sessions allowed at once in --watch mode
+METRICS_FILE = "scheduler_metrics.json"
+HISTORY_FILE = "runtime_history.jsonl"  # per-job timings the runtime predictor learns from
+
+# shared post-processing helpers live next to the simulation service
+sys.path.insert(0, str(SRC_DIR))
+from csv_index import CHUNK_ROWS, load_stats
+from profiles import compile_profile, has_profile
+from resampling import write_uniform_csv
+from run_catalog import RunCatalog
+from runtime_model import RuntimePredictor, config_features
+from scheduler import POLICIES, JobScheduler, LicensePool, LicenseUnavailable
+from solver_log import rotate_logs
+from workspace import RETENTION, JobWorkspace
 
 # ── simulation launcher ──────────────────────────────────────────────────────
-def run_sim(cfg_json: str) -> None:
+def run_sim(cfg_json: str, ws: JobWorkspace | None = None, tmpfs: bool = False) -> None:
     env = {**os.environ, "AME": AME_DIR}
-    cmd = [str(SIM_PY), SIM_SCRIPT, "-c", cfg_json]
+    cmd = [str(SIM_PY), SIM_SCRIPT, "-c", str(Path(cfg_json).resolve())]
+    cwd = None
+    if ws is not None:
+        # the service writes ./output relative to its cwd, so that lands in the workspace
+        cwd = ws.output_subdir("sim")
+        cmd += ["--catalog", str(CATALOG_DB), "--segment-cache", str(SEGMENT_CACHE),
+                "--optimize-tables", str(OPTIMIZE_TABLES),
+                "--workspace-root", ws.scratch_dir,
+                "--keep-workspaces", ws.retention] + (["--tmpfs"] if tmpfs else [])
     print("[SIM] →", " ".join(cmd))
-    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=cwd)
     if proc.stdout: print(proc.stdout)
     if proc.stderr: print(proc.stderr, file=sys.stderr)
-    if proc.returncode: raise RuntimeError("Simulation failed")
+    if proc.returncode:
+        if "licen" in (proc.stderr + proc.stdout).lower():
+            raise LicenseUnavailable("Simulation could not check out an Amesim license")
+        raise RuntimeError("Simulation failed")
 
 # ── scaling helpers ──────────────────────────────────────────────────────────
-def minmax(col: pd.Series) -> pd.Series:
-    lo, hi = col.min(), col.max()
+# lo / hi come from the CSV index so a chunk can be scaled without seeing the rest
+def minmax(col: pd.Series, lo: float | None = None, hi: float | None = None) -> pd.Series:
+    if lo is None or hi is None: lo, hi = col.min(), col.max()
     if lo == hi: return pd.Series(0.0, index=col.index)
     return 2 * (col - lo) / (hi - lo) - 1
 
-def symmetric(col: pd.Series) -> pd.Series:
-    lo, hi = col.min(), col.max()
-    if lo == 0 and hi == 0: return pd.Series(0.0, index=col.index)
-    def f(x_val):
-        if x_val == 0:
-            return 0.0
-        if x_val > 0:
-            return x_val / hi if hi != 0 else 0.0
-        return x_val / abs(lo) if lo != 0 else 0.0
-    return col.apply(f)
+def symmetric(col: pd.Series, lo: float | None = None, hi: float | None = None) -> pd.Series:
+    if lo is None or hi is None: lo, hi = col.min(), col.max()
+    out = pd.Series(0.0, index=col.index)
+    if lo == 0 and hi == 0: return out
+    if hi != 0: out = out.mask(col > 0, col / hi)
+    if lo != 0: out = out.mask(col < 0, col / abs(lo)).mask(col.isna(), col)
+    return out
+
+def _all_zero(stats: dict) -> bool:
+    # same answer as (series.fillna(0) == 0).all()
+    return stats["count"] == 0 or (stats["min"] == 0 and stats["max"] == 0)
 
 # ── CSV normaliser ───────────────────────────────────────────────────────────
-def normalise(path: Path, symmetric_mode: bool, label: str) -> Tuple[pd.DataFrame, str]:
+def normalise(path: Path, symmetric_mode: bool, label: str,
+              out_dir: Path = OUT_DIR) -> Tuple[Path, str]:
+    # Returns the normalised file and its angle column; the data is never held
+    # in memory as a whole, so callers read back only the columns they need
     try:
-        df = pd.read_csv(path)
+        stats = load_stats(path)
     except FileNotFoundError:
         print(f"[ERR-NORM] File not found during normalise: {path}", file=sys.stderr)
         raise
@@ -85,69 +128,71 @@ def normalise(path: Path, symmetric_mode: bool, label: str) -> Tuple[pd.DataFram
         print(f"[ERR-NORM] Could not read CSV {path}: {e}", file=sys.stderr)
         raise
 
+    columns = stats["columns"]
     angle_col_candidates = [
-        c for c in df.columns
-        if c not in EXCLUDE_COLS and pd.api.types.is_numeric_dtype(df[c])
+        c for c, col_stats in columns.items()
+        if c not in EXCLUDE_COLS and col_stats["numeric"]
     ]
     if not angle_col_candidates:
         raise ValueError(
             f"No suitable numeric data column found in '{path.name}' for '{label}'. "
-            f"Excluded: {EXCLUDE_COLS}. Columns found: {list(df.columns)}"
+            f"Excluded: {EXCLUDE_COLS}. Columns found: {list(columns)}"
         )
     angle_col_name = angle_col_candidates[0]
+    lo, hi = columns[angle_col_name]["min"], columns[angle_col_name]["max"]
 
     is_roll_processing = "roll" in label.lower()
-    original_data_is_all_zeros = (df[angle_col_name].fillna(0) == 0).all()
+    original_data_is_all_zeros = _all_zero(columns[angle_col_name])
 
     if is_roll_processing and original_data_is_all_zeros:
-        df[angle_col_name] = 0.0
         print(f"[NORM] {label} ({path.name}): Original data is all zeros. Normalized to all zeros.")
-    else:
-        if symmetric_mode:
-            df[angle_col_name] = symmetric(df[angle_col_name])
-        else:
-            df[angle_col_name] = minmax(df[angle_col_name])
 
-    out_file = OUT_DIR / f"{label.replace(' ', '_').lower()}_norm.csv"
-    df.to_csv(out_file, index=False, float_format=FLOAT_FMT)
+    # single streaming pass: scale each chunk with the indexed min/max and append it
+    out_file = out_dir / f"{label.replace(' ', '_').lower()}_norm.csv"
+    written = False
+    with open(out_file, "w", newline="") as out:
+        for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS):
+            if is_roll_processing and original_data_is_all_zeros:
+                chunk[angle_col_name] = 0.0
+            elif symmetric_mode:
+                chunk[angle_col_name] = symmetric(chunk[angle_col_name], lo, hi)
+            else:
+                chunk[angle_col_name] = minmax(chunk[angle_col_name], lo, hi)
+            chunk.to_csv(out, index=False, header=not written, float_format=FLOAT_FMT)
+            written = True
+    if not written:
+        pd.DataFrame(columns=list(columns)).to_csv(out_file, index=False)
     print(f"[NORM] {label} → {out_file.name}")
-    return df, angle_col_name
+    return out_file, angle_col_name
 
 # ── choose roll CSV (based on input.csv content) ─────────────────────────────
 def roll_csv() -> Tuple[Path, str]:
-    # (Keeping your existing roll_csv logic as it was in the last version you confirmed)
+    # Decided from the indexed statistics of input.csv; the CSV itself is only
+    # re-read when it has changed since it was last indexed
     try:
-        raw = pd.read_csv(INPUT_PATH)
+        stats = load_stats(INPUT_PATH)
     except FileNotFoundError:
         print(f"[WARN] {INPUT_PATH} not found. Defaulting to 'roll angle.csv'.", file=sys.stderr)
         return CSV_DIR / "roll angle.csv", "Roll angle CSV" # Fallback
-            
-    angle_col_name_found = None
-    angle_col_series_processed = None
-
-    for col_header in raw.columns:
-        if col_header.lower() == "angle":
-            potential_angle_series = pd.to_numeric(raw[col_header], errors='coerce')
-            if not potential_angle_series.isnull().all():
-                angle_col_name_found = col_header
-                angle_col_series_processed = potential_angle_series.fillna(0)
-                break 
-            
-    if angle_col_series_processed is not None:
-        if (angle_col_series_processed == 0).all():
-            fname = "no roll.csv"
-            print(f"[ROLL_CHOICE] Selected 'no roll.csv' based on 'Angle' column in {INPUT_PATH.name}")
-            return CSV_DIR / fname, "Roll angle CSV"
-
-    numeric_df = raw.select_dtypes(include='number')
-
-    if numeric_df.empty or (numeric_df.fillna(0) == 0).all().all():
+
+    columns = stats["columns"]
+    for col_header, col_stats in columns.items():
+        if col_header.lower() == "angle" and col_stats["count"]:
+            if _all_zero(col_stats):
+                fname = "no roll.csv"
+                print(f"[ROLL_CHOICE] Selected 'no roll.csv' based on 'Angle' column in {INPUT_PATH.name}")
+                return CSV_DIR / fname, "Roll angle CSV"
+            break
+
+    numeric_cols = [col_stats for col_stats in columns.values() if col_stats["numeric"]]
+
+    if not numeric_cols or all(_all_zero(col_stats) for col_stats in numeric_cols):
         fname = "no roll.csv"
         print(f"[ROLL_CHOICE] Selected 'no roll.csv' based on all numeric data in {INPUT_PATH.name}")
         return CSV_DIR / fname, "Roll angle CSV"
 
-    has_positive = (numeric_df > 0).any().any()
-    has_negative = (numeric_df < 0).any().any()
+    has_positive = any(col_stats["count"] and col_stats["max"] > 0 for col_stats in numeric_cols)
+    has_negative = any(col_stats["count"] and col_stats["min"] < 0 for col_stats in numeric_cols)
 
     if has_positive and has_negative:
         fname = "mixed.csv"
@@ -161,54 +206,85 @@ def roll_csv() -> Tuple[Path, str]:
         
     return CSV_DIR / fname, "Roll angle CSV"
 
+# ── compiled stage profile (input.csv with durations) ────────────────────────
+def profile_csvs(rate_hz: float | None = None) -> dict | None:
+    # A stage table with durations is compiled into pitch / roll target CSVs,
+    # so the pre-exported CSVs in CSV_DIR are not needed
+    if not INPUT_PATH.exists() or not has_profile(str(INPUT_PATH)):
+        return None
+    profile = compile_profile(str(INPUT_PATH), str(PROFILE_CACHE), rate_hz or 10.0)
+    missing = [channel for channel in ("pitch", "roll") if channel not in profile]
+    if missing:
+        raise ValueError(f"Stage table {INPUT_PATH.name} has no {' / '.join(missing)} targets")
+    print(f"[PROFILE] Compiled {INPUT_PATH.name} → {Path(profile['roll']['targets']).parent}")
+    return {channel: Path(profile[channel]["targets"]) for channel in ("pitch", "roll")}
+
 # ── build pid_targets.csv ────────────────────────────────────────────────────
-def build_pid():
-    roll_path, roll_label = roll_csv()
-
-    # Explicitly check if the determined roll CSV file exists
-    if not roll_path.exists():
-        # This error means roll_csv() gave a path, but the file isn't there.
-        raise FileNotFoundError(
-            f"The chosen roll CSV file ('{roll_path.name}') was not found in '{CSV_DIR}'. "
-            f"Please ensure it exists. (Determined based on {INPUT_PATH.name})"
-        )
-    
-    pitch_csv_path = CSV_DIR / "pitch angle.csv"
-    if not pitch_csv_path.exists():
-        raise FileNotFoundError(f"Required pitch data file 'pitch angle.csv' not found in '{CSV_DIR}'.")
+def _sorted_series(df: pd.DataFrame, tcol: str, col: str) -> Tuple[Iterable[float], Iterable[float]]:
+    clean = df[[tcol, col]].dropna().sort_values(tcol, kind="stable")
+    return clean[tcol].to_numpy(), clean[col].to_numpy()
+
+def build_pid(rate_hz: float | None = None, method: str = RESAMPLE_METHOD,
+              out_dir: Path = OUT_DIR):
+    compiled = profile_csvs(rate_hz)
+    if compiled:
+        roll_path, roll_label = compiled["roll"], "Roll angle CSV"
+        pitch_csv_path = compiled["pitch"]
+    else:
+        roll_path, roll_label = roll_csv()
+
+        # Explicitly check if the determined roll CSV file exists
+        if not roll_path.exists():
+            # This error means roll_csv() gave a path, but the file isn't there.
+            raise FileNotFoundError(
+                f"The chosen roll CSV file ('{roll_path.name}') was not found in '{CSV_DIR}'. "
+                f"Please ensure it exists. (Determined based on {INPUT_PATH.name})"
+            )
+
+        pitch_csv_path = CSV_DIR / "pitch angle.csv"
+        if not pitch_csv_path.exists():
+            raise FileNotFoundError(f"Required pitch data file 'pitch angle.csv' not found in '{CSV_DIR}'.")
 
-    roll_df, roll_col   = normalise(roll_path, symmetric_mode=True,  label=roll_label)
-    pitch_df, pitch_col = normalise(pitch_csv_path, symmetric_mode=False, label="Pitch angle CSV")
+    roll_file, roll_col   = normalise(roll_path, symmetric_mode=True,  label=roll_label, out_dir=out_dir)
+    pitch_file, pitch_col = normalise(pitch_csv_path, symmetric_mode=False, label="Pitch angle CSV", out_dir=out_dir)
+    roll_columns = list(pd.read_csv(roll_file, nrows=0).columns)
+    pitch_columns = list(pd.read_csv(pitch_file, nrows=0).columns)
 
-    # Robustly find time column in roll_df
-    tcol_roll_candidates = [c for c in roll_df.columns if c.lower().startswith("time")]
+    # Robustly find time column in the roll data
+    tcol_roll_candidates = [c for c in roll_columns if c.lower().startswith("time")]
     if not tcol_roll_candidates:
         raise ValueError(
             f"No time column (e.g., 'Time', 'Time - s') found in normalized roll data (from {roll_path.name}). "
-            f"Columns present: {list(roll_df.columns)}"
+            f"Columns present: {roll_columns}"
         )
     tcol = tcol_roll_candidates[0] # Use the first found time column
 
-    # Ensure the same time column name exists in pitch_df or can be found and renamed
-    if tcol not in pitch_df.columns:
-        tcol_pitch_candidates = [c for c in pitch_df.columns if c.lower().startswith("time")]
+    # Ensure the same time column name exists in the pitch data or can be found and renamed
+    pitch_tcol = tcol
+    if tcol not in pitch_columns:
+        tcol_pitch_candidates = [c for c in pitch_columns if c.lower().startswith("time")]
         if not tcol_pitch_candidates:
             raise ValueError(
                 f"No time column found in normalized pitch data (from {pitch_csv_path.name}). "
-                f"Columns present: {list(pitch_df.columns)}"
-            )
-        
-        original_pitch_tcol = tcol_pitch_candidates[0]
-        if original_pitch_tcol != tcol: # Avoid renaming if names already match
-            print(f"[BUILD] Aligning time columns: Renaming '{original_pitch_tcol}' to '{tcol}' in pitch data.")
-            pitch_df.rename(columns={original_pitch_tcol: tcol}, inplace=True)
-        
-        if tcol not in pitch_df.columns: # Double check rename or if it was supposed to be there
-             raise ValueError(
-                 f"Failed to align time column '{tcol}'. Pitch data (from {pitch_csv_path.name}) "
-                 f"does not have a time column named '{tcol}' after attempting alignment. "
-                 f"Original pitch time candidate: '{original_pitch_tcol}'. Roll time column: '{tcol}'."
+                f"Columns present: {pitch_columns}"
             )
+        pitch_tcol = tcol_pitch_candidates[0]
+        print(f"[BUILD] Aligning time columns: Renaming '{pitch_tcol}' to '{tcol}' in pitch data.")
+
+    # only the time and angle columns are read back from the normalised files
+    pitch_df = pd.read_csv(pitch_file, usecols=[pitch_tcol, pitch_col]).rename(columns={pitch_tcol: tcol})
+    roll_df = pd.read_csv(roll_file, usecols=[tcol, roll_col])
+
+    if rate_hz:
+        # fixed-rate grid over the overlap of both sources; header carries t0/dt for O(1) lookup
+        series = {
+            PITCH_ALIAS: _sorted_series(pitch_df, tcol, pitch_col),
+            ROLL_ALIAS:  _sorted_series(roll_df, tcol, roll_col),
+        }
+        rows = write_uniform_csv(str(out_dir / "pid_targets.csv"), series, rate_hz, method,
+                                 time_label=TIME_ALIAS, float_fmt=FLOAT_FMT)
+        print(f"[BUILD] pid_targets.csv written ({rows} rows @ {rate_hz:g} Hz, {method})")
+        return
 
     merged = pd.merge(
         pitch_df[[tcol, pitch_col]],
@@ -225,44 +301,122 @@ def build_pid():
     merged.rename(columns={
         tcol: TIME_ALIAS, pitch_col: PITCH_ALIAS, roll_col: ROLL_ALIAS},
         inplace=True)
-    merged.to_csv(OUT_DIR / "pid_targets.csv",
+    merged.to_csv(out_dir / "pid_targets.csv",
                   index=False, float_format=FLOAT_FMT)
     print("[BUILD] pid_targets.csv written")
 
 # ── pipeline ────────────────────────────────────────────────────────────────
-def pipeline(cfg: str):
+def pipeline(cfg: str, rate_hz: float | None = None, method: str = RESAMPLE_METHOD,
+             retention: str = "failed", tmpfs: bool = False):
+    ws = JobWorkspace(label=Path(cfg).stem, tmpfs=tmpfs, retention=retention)
+    failed = True
     try:
-        run_sim(cfg)
-        build_pid()
+        run_sim(cfg, ws, tmpfs)
+        # only the service's output/ is published; the circuit, compiled model and
+        # results file Amesim leaves in its cwd go away with the workspace
+        ws.promote(str(LAUNCH_DIR / "output"), "sim/output")
+        rotate_logs(str(LAUNCH_DIR / "output" / "logs"))
+        build_pid(rate_hz, method, Path(ws.output_subdir("pid")))
+        ws.promote(str(OUT_DIR), "pid")
+        failed = False
         print("[DONE]", Path(cfg).name)
+    # every failure is reported here and raised again, so the scheduler counts it
+    except LicenseUnavailable:
+        raise  # the scheduler retries these
     except FileNotFoundError as e:
         print(f"[ERR-PIPELINE] File not found: {e}", file=sys.stderr)
+        raise
     except ValueError as e:
         print(f"[ERR-PIPELINE] Value error (likely bad CSV structure or missing columns): {e}", file=sys.stderr)
+        raise
     except RuntimeError as e: # from run_sim
         print(f"[ERR-PIPELINE] Runtime error (simulation failed?): {e}", file=sys.stderr)
+        raise
     except Exception as e: # Catch-all for other unexpected errors in pipeline
         print(f"[ERR-PIPELINE] An unexpected error occurred processing {Path(cfg).name}: {e}", file=sys.stderr)
+        raise
+    finally:
+        ws.close(failed)
 
 
 # ── watch mode ──────────────────────────────────────────────────────────────
-def watch(folder: Path):
+def job_settings(cfg: Path) -> Tuple[dict, dict]:
+    # optional "job": {"priority": "interactive|normal|background",
+    #                  "submitter": "...", "deadline_s": seconds from now}
+    try:
+        data = json.loads(cfg.read_text())
+        job = data.get("job", {})
+    except (OSError, ValueError, AttributeError):
+        data, job = {}, {}
+    # unmarked sweeps, sensitivity studies and optimizations queue as background work
+    batch = isinstance(data, dict) and any(key in data for key in ("sweep", "sensitivity", "optimize"))
+    settings = {"priority": job.get("priority", "background" if batch else "interactive"),
+                "submitter": job.get("submitter", "default"),
+                "deadline_s": job.get("deadline_s")}
+    return settings, config_features(data) if isinstance(data, dict) else {}
+
+def timed_job(cfg: Path, features: dict, estimate: float, predictor: RuntimePredictor,
+              rate_hz: float | None, method: str, retention: str, tmpfs: bool):
+    def run():
+        started = time.perf_counter()
+        try:
+            pipeline(str(cfg), rate_hz, method, retention, tmpfs)
+        except Exception:
+            # a failed job's duration says nothing about the config, so it is not learned from
+            print(f"[SCHED] {cfg.name}: failed after {time.perf_counter() - started:.1f} s")
+            raise
+        seconds = time.perf_counter() - started
+        predictor.observe(features, seconds, estimate, cfg.name)
+        print(f"[SCHED] {cfg.name}: {seconds:.1f} s (predicted {estimate:.1f} s)")
+    return run
+
+def write_metrics(scheduler: JobScheduler, predictor: RuntimePredictor) -> dict:
+    metrics = {**scheduler.metrics(), "predictor": predictor.summary()}
+    if CATALOG_DB.exists():
+        # parsed STDSIM statistics per model, from the shared run catalog
+        catalog = RunCatalog(str(CATALOG_DB))
+        metrics["solver"] = catalog.solver_summary()
+        catalog.close()
+    # replace, never rewrite in place, so readers never see a half-written file
+    tmp = OUT_DIR / (METRICS_FILE + ".tmp")
+    tmp.write_text(json.dumps(metrics, indent=2))
+    os.replace(tmp, OUT_DIR / METRICS_FILE)
+    return metrics
+
+def watch(folder: Path, rate_hz: float | None = None, method: str = RESAMPLE_METHOD,
+          licenses: int = LICENSES, policy: str = "sjf",
+          retention: str = "failed", tmpfs: bool = False):
     seen: Set[Path] = set()
-    print("[WATCH] scanning", folder)
+    scheduler = JobScheduler(LicensePool(licenses), policy=policy)
+    predictor = RuntimePredictor(str(OUT_DIR / HISTORY_FILE))
+    print("[WATCH] scanning", folder, f"({licenses} license(s), {policy})")
+    last = None
     try:
         while True:
-            for fp in folder.glob("*.json"):
+            for fp in sorted(folder.glob("*.json")):
                 if fp not in seen:
-                    # Run pipeline and catch exceptions here so watch mode continues
+                    # queued, not run: the scheduler decides when a license is free
                     try:
-                        print(f"[WATCH] Processing new config: {fp.name}")
-                        pipeline(str(fp))
+                        settings, features = job_settings(fp)
+                        estimate = predictor.predict(features)
+                        scheduler.submit(timed_job(fp, features, estimate, predictor, rate_hz, method,
+                                                   retention, tmpfs),
+                                         name=fp.name, estimate_s=estimate, **settings)
+                        print(f"[WATCH] Queued new config: {fp.name} "
+                              f"({settings['priority']}, {settings['submitter']}, ~{estimate:.1f} s)")
                         seen.add(fp)
-                    except Exception as e: # This catches errors from pipeline not already handled inside it
-                        print(f"[ERR-WATCH] Failed to process {fp.name}: {e}", file=sys.stderr)
+                    except Exception as e:
+                        print(f"[ERR-WATCH] Failed to queue {fp.name}: {e}", file=sys.stderr)
+            metrics = write_metrics(scheduler, predictor)
+            state = (metrics["running"], metrics["queued"], metrics["completed"], metrics["failed"])
+            if state != last:
+                print("[SCHED] running {} · queued {} · done {} · failed {}".format(*state))
+                last = state
             time.sleep(POLL_SECS)
     except KeyboardInterrupt:
-        print("\n[WATCH] stopped by user.")
+        print("\n[WATCH] stopped by user; waiting for running jobs …")
+        scheduler.shutdown(wait=False)
+        write_metrics(scheduler, predictor)
 
 # ── CLI entry ───────────────────────────────────────────────────────────────
 def main():
@@ -272,6 +426,17 @@ def main():
     grp = ap.add_mutually_exclusive_group()
     grp.add_argument("-c", "--config", help=f"Path to config JSON (default: {DEFAULT_CFG})")
     grp.add_argument("--watch", metavar="DIR", help="Directory to watch for new *.json configs")
+    ap.add_argument("--rate", type=float, metavar="HZ",
+                    help="Resample pid_targets.csv onto a fixed-rate grid (e.g. 50, 60, 90)")
+    ap.add_argument("--method", choices=("linear", "cubic", "zoh"), default=RESAMPLE_METHOD,
+                    help="Interpolation used with --rate")
+    ap.add_argument("--keep-workspaces", choices=RETENTION, default="failed",
+                    help="Which per-job workspaces to keep after their outputs are published")
+    ap.add_argument("--tmpfs", action="store_true", help="Create per-job workspaces on tmpfs")
+    ap.add_argument("--licenses", type=int, default=LICENSES, metavar="N",
+                    help="Simulations allowed at once in --watch mode")
+    ap.add_argument("--policy", choices=POLICIES, default="sjf",
+                    help="Queue order in --watch mode: shortest predicted job first, or arrival order")
     # Add a proper help argument if you expand the ArgumentParser
     # ap.add_argument("-h", "--help", action="help", help="Show this help message and exit.")
     args, _ = ap.parse_known_args() # Use parse_args() if you define all args
@@ -282,18 +447,26 @@ def main():
         if not watch_path.is_dir():
             print(f"[ERR] Watch directory '{watch_path}' not found or not a directory.", file=sys.stderr)
             sys.exit(1)
-        watch(watch_path)
+        watch(watch_path, args.rate, args.method, args.licenses, args.policy,
+              args.keep_workspaces, args.tmpfs)
     else:
         config_to_run = args.config or DEFAULT_CFG
         if not Path(config_to_run).exists():
             print(f"[ERR] Config file '{config_to_run}' not found.", file=sys.stderr)
             sys.exit(1)
-        pipeline(config_to_run) # Errors from pipeline are handled inside it or by main's try-finally
+        try:
+            pipeline(config_to_run, args.rate, args.method, args.keep_workspaces, args.tmpfs)
+        except Exception:
+            failed = True  # already reported by pipeline
+        else:
+            failed = False
 
     # pause if launched by double‑click (no tty)
     # Only pause if no specific config was given (implying default run) and not in watch mode
     if not sys.stdin.isatty() and not args.watch and not args.config:
         input("Press Enter to close…")
+    if not args.watch and failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
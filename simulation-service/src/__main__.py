@@ -1,12 +1,27 @@
 import argparse
+import os
 
+from optimize import DEFAULT_TABLE_DIR
 from simulation_service import SimulationService
+from workspace import RETENTION
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-c", "--config", type=str, help="path to the configuration data (.json)", required=True)
+    parser.add_argument("--catalog", type=str, default=os.path.join("output", "catalog", "runs.sqlite"),
+                        help="run catalog database; pass an empty string to disable")
+    parser.add_argument("--no-cache", action="store_true", help="simulate even if the catalog holds an identical run")
+    parser.add_argument("--workspace-root", type=str, default=None,
+                        help="where per-run workspaces are created (default: output/.jobs)")
+    parser.add_argument("--tmpfs", action="store_true", help="create per-run workspaces on tmpfs")
+    parser.add_argument("--keep-workspaces", choices=RETENTION, default="failed",
+                        help="which per-run workspaces to keep after promotion")
+    parser.add_argument("--segment-cache", type=str, default=os.path.join("output", "segments"),
+                        help="cache of simulated legs for segmented runs; pass an empty string to disable")
+    parser.add_argument("--optimize-tables", type=str, default=DEFAULT_TABLE_DIR,
+                        help="where the breakpoint tables of optimization candidates are written")
 
     return parser.parse_args()
 
@@ -16,7 +31,15 @@ def _main():
 
    config_file = args.config
 
-   simulation_service = SimulationService()
+   simulation_service = SimulationService(
+      catalog_path=args.catalog or None,
+      use_cache=not args.no_cache,
+      workspace_root=args.workspace_root,
+      tmpfs=args.tmpfs,
+      retention=args.keep_workspaces,
+      segment_cache=args.segment_cache or None,
+      optimize_tables=args.optimize_tables,
+   )
    
    simulation_service.run_from_config_file(config_file)
    
@@ -0,0 +1,147 @@
+r"""
+Statistics index for the roll/pitch angle CSV library.
+
+Each CSV gets a sidecar ``<name>.manifest.json`` holding its row count, time
+range, per-column min/max/sign class and a SHA-256 of the content. The
+manifest is refreshed only when the file's size or mtime changes, so callers
+can read the statistics without touching the CSV. This matters because the
+library sits on a synced network folder where every read is slow.
+
+    python src/csv_index.py DIR   → (re)index every *.csv in DIR
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+CHUNK_ROWS = 100_000
+
+
+class _HashingReader:
+    """File wrapper that hashes bytes as pandas pulls them, so parsing and
+    hashing share a single read of the file."""
+
+    def __init__(self, file):
+        self._file = file
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self.digest.update(data)
+        return data
+
+    def __iter__(self):
+        return iter(self._file.readline, b"")
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + MANIFEST_SUFFIX)
+
+
+def sign_class(lo: Optional[float], hi: Optional[float]) -> str:
+    if lo is None or (lo == 0 and hi == 0):
+        return "zero"
+    if lo < 0 < hi:
+        return "mixed"
+    return "negative" if hi <= 0 else "positive"
+
+
+def _merge_column(acc: Dict, series: pd.Series) -> None:
+    values = pd.to_numeric(series, errors="coerce")
+    acc["numeric"] = acc["numeric"] and pd.api.types.is_numeric_dtype(series)
+    count = int(values.count())
+    if count:
+        lo, hi = float(values.min()), float(values.max())
+        acc["min"] = lo if acc["min"] is None else min(acc["min"], lo)
+        acc["max"] = hi if acc["max"] is None else max(acc["max"], hi)
+    acc["count"] += count
+
+
+def scan(path: Path) -> Dict:
+    stat = path.stat()
+    columns: Dict[str, Dict] = {}
+    rows = 0
+    with open(path, "rb") as raw:
+        reader = _HashingReader(raw)
+        for chunk in pd.read_csv(reader, chunksize=CHUNK_ROWS):
+            rows += len(chunk)
+            for name in chunk.columns:
+                acc = columns.setdefault(name, {"numeric": True, "count": 0, "min": None, "max": None})
+                _merge_column(acc, chunk[name])
+        # drain anything the parser did not need so the hash covers the whole file
+        while reader.read(1 << 20):
+            pass
+    for acc in columns.values():
+        acc["sign"] = sign_class(acc["min"], acc["max"])
+
+    time_col = next((c for c in columns if c.lower().startswith("time")), None)
+    return {
+        "version": MANIFEST_VERSION,
+        "file": path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": reader.digest.hexdigest(),
+        "rows": rows,
+        "time_column": time_col,
+        "time_min": columns[time_col]["min"] if time_col else None,
+        "time_max": columns[time_col]["max"] if time_col else None,
+        "columns": columns,
+    }
+
+
+def _write_manifest(path: Path, stats: Dict) -> None:
+    target = manifest_path(path)
+    # unique temp name: concurrent jobs may index the same CSV
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w") as file:
+        json.dump(stats, file, indent=2)
+    os.replace(tmp, target)
+
+
+def _read_manifest(path: Path) -> Optional[Dict]:
+    try:
+        with open(manifest_path(path), "r") as file:
+            stats = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+    return stats if stats.get("version") == MANIFEST_VERSION else None
+
+
+def load_stats(path: Path, refresh: bool = False) -> Dict:
+    path = Path(path)
+    stat = path.stat()  # raises FileNotFoundError for a missing CSV
+    stats = None if refresh else _read_manifest(path)
+    if stats and stats["size"] == stat.st_size and stats["mtime_ns"] == stat.st_mtime_ns:
+        return stats
+    stats = scan(path)
+    try:
+        _write_manifest(path, stats)
+    except OSError as e:
+        print(f"[INDEX] Could not write manifest for {path.name}: {e}", file=sys.stderr)
+    return stats
+
+
+def index_directory(folder: Path, pattern: str = "*.csv") -> List[Dict]:
+    indexed = []
+    for path in sorted(Path(folder).glob(pattern)):
+        before = _read_manifest(path)
+        stats = load_stats(path)
+        state = "unchanged" if before == stats else "indexed"
+        print(f"[INDEX] {path.name}: {state} ({stats['rows']} rows)")
+        indexed.append(stats)
+    return indexed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python csv_index.py DIR", file=sys.stderr)
+        sys.exit(2)
+    index_directory(Path(sys.argv[1]))
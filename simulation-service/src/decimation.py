@@ -0,0 +1,84 @@
+r"""
+Peak-preserving decimation of output series for plots and UI previews.
+
+Both algorithms reduce a series to about ``n_out`` points, so drawing cost
+follows the display width instead of the sample count:
+
+• minmax – keeps the minimum and maximum of every bucket (exact envelope)
+• lttb   – Largest-Triangle-Three-Buckets (visually faithful line shape)
+"""
+
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+def _as_arrays(x: Sequence[float], y: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    xa = np.asarray(x, dtype=np.float64)
+    ya = np.asarray(y, dtype=np.float64)
+    if xa.ndim != 1 or xa.shape != ya.shape:
+        raise ValueError(f"x and y must be 1-D and the same length ({xa.shape} vs {ya.shape})")
+    return xa, ya
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    n = y.size
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+    # first and last point are always kept; the rest is split into pairs
+    inner = y[1:-1]
+    n_buckets = (n_out - 2) // 2
+    size = int(math.ceil(inner.size / n_buckets))
+    full = inner.size // size
+    body = inner[: full * size].reshape(full, size)
+    offsets = np.arange(full) * size
+    picks = [offsets + np.argmin(body, axis=1), offsets + np.argmax(body, axis=1)]
+    rest = inner[full * size:]
+    if rest.size:
+        tail = full * size
+        picks.append(np.array([tail + np.argmin(rest), tail + np.argmax(rest)]))
+    idx = np.unique(np.concatenate(picks)) + 1
+    return np.concatenate(([0], idx, [n - 1]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = x.size
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    prev = 0
+    # one iteration per output point; the work inside each bucket is vectorized
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < edges.size else n
+        if nxt_hi <= nxt_lo:
+            nxt_hi = nxt_lo + 1
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        px, py = x[prev], y[prev]
+        area = np.abs((px - avg_x) * (y[lo:hi] - py) - (px - x[lo:hi]) * (avg_y - py))
+        prev = lo + int(np.argmax(area))
+        out[i + 1] = prev
+    return out
+
+
+def decimate(
+    x: Sequence[float],
+    y: Sequence[float],
+    n_out: int,
+    method: str = "minmax",
+) -> Tuple[np.ndarray, np.ndarray]:
+    if method not in METHODS:
+        raise ValueError(f"Unknown decimation method '{method}'. Use one of: {', '.join(METHODS)}")
+    xa, ya = _as_arrays(x, y)
+    if method == "minmax":
+        idx = minmax_indices(ya, n_out)
+    else:
+        idx = lttb_indices(xa, ya, n_out)
+    return xa[idx], ya[idx]
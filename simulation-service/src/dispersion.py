@@ -0,0 +1,274 @@
+r"""
+Streaming statistics over many runs of one config (dispersion studies).
+
+Each finished run's outputs are resampled onto a shared time grid and folded
+into running statistics per variable and time step:
+
+• mean and variance – Welford's update; partial results merge with Chan's formula
+• min / max envelopes
+• approximate percentiles – a merging t-digest per time step, vectorized
+  across the whole grid. New runs are buffered, then every step's centroids
+  are re-binned at once with the arcsine scale function, which keeps the
+  tails finer than the middle.
+
+Memory depends on the grid and the digest size, never on the number of runs.
+Aggregates from different worker processes merge exactly for the moments and
+envelopes and approximately for percentiles.
+
+    python src/dispersion.py collect 'output/sweep_*/data.csv' --out part.npz [--points 500]
+    python src/dispersion.py merge part_1.npz part_2.npz … --out all.npz [--csv envelopes.csv]
+"""
+
+import argparse
+import csv
+import glob
+import json
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from resampling import interpolate
+
+DEFAULT_POINTS = 500
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+COMPRESSION = 100
+
+
+class QuantileDigest:
+    """Merging t-digest for many independent streams (one per time step) at once."""
+
+    def __init__(self, size: int, compression: int = COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros((size, 0))
+        self.weights = np.zeros((size, 0))
+        self._buffer = []
+
+    def add(self, values: np.ndarray) -> None:
+        # NaN marks time steps the run does not cover
+        self._buffer.append(np.asarray(values, dtype=np.float64))
+        if len(self._buffer) >= self.compression:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        added = np.column_stack(self._buffer)
+        self._buffer = []
+        self._compress(np.hstack((self.means, added)),
+                       np.hstack((self.weights, (~np.isnan(added)).astype(np.float64))))
+
+    def merge(self, other: "QuantileDigest") -> None:
+        self.flush()
+        other.flush()
+        self._compress(np.hstack((self.means, other.means)), np.hstack((self.weights, other.weights)))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        rows, delta = means.shape[0], self.compression
+        means = np.where(weights > 0, means, np.inf)
+        order = np.argsort(means, axis=1, kind="stable")
+        means = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        total = weights.sum(axis=1, keepdims=True)
+        q = (np.cumsum(weights, axis=1) - weights / 2) / np.where(total > 0, total, 1.0)
+        # arcsine scale: equal steps in k are narrow in q near 0 and 1
+        k = np.floor(delta * (np.arcsin(np.clip(2 * q - 1, -1, 1)) / np.pi + 0.5)).astype(np.int64)
+        flat = (np.arange(rows)[:, None] * delta + np.clip(k, 0, delta - 1)).ravel()
+        binned_w = np.bincount(flat, weights=weights.ravel(), minlength=rows * delta).reshape(rows, delta)
+        sums = np.bincount(flat, weights=(np.where(weights > 0, means, 0.0) * weights).ravel(),
+                           minlength=rows * delta).reshape(rows, delta)
+        self.weights = binned_w
+        self.means = np.where(binned_w > 0, sums / np.where(binned_w > 0, binned_w, 1.0), 0.0)
+
+    def quantiles(self, qs: Sequence[float], low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        # (len(qs), steps); the exact min and max anchor both ends of every step
+        self.flush()
+        rows = self.means.shape[0]
+        empty = self.weights <= 0
+        order = np.argsort(empty, axis=1, kind="stable")
+        means = np.take_along_axis(self.means, order, axis=1)
+        weights = np.take_along_axis(self.weights, order, axis=1)
+        total = weights.sum(axis=1, keepdims=True)
+        mid = (np.cumsum(weights, axis=1) - weights / 2) / np.where(total > 0, total, 1.0)
+        # empty centroids sit past q = 1 so they are never interpolated between
+        mid = np.where(np.take_along_axis(empty, order, axis=1), 1.5, mid)
+        xs = np.hstack((np.zeros((rows, 1)), mid, np.ones((rows, 1))))
+        ys = np.hstack((low[:, None], means, high[:, None]))
+        order = np.argsort(xs, axis=1, kind="stable")
+        xs = np.take_along_axis(xs, order, axis=1)
+        ys = np.take_along_axis(ys, order, axis=1)
+        # rows shifted apart by 2 form one ascending array, so a single
+        # searchsorted interpolates every step at once
+        columns = xs.shape[1]
+        flat_x = (xs + 2.0 * np.arange(rows)[:, None]).ravel()
+        result = np.empty((len(qs), rows))
+        for i, q in enumerate(qs):
+            target = 2.0 * np.arange(rows) + q
+            right = np.clip(np.searchsorted(flat_x, target, side="right"), 1, rows * columns - 1)
+            left = right - 1
+            x0, x1 = flat_x[left], flat_x[right]
+            y0, y1 = ys.ravel()[left], ys.ravel()[right]
+            t = np.where(x1 > x0, (target - x0) / np.where(x1 > x0, x1 - x0, 1.0), 0.0)
+            result[i] = y0 + np.clip(t, 0.0, 1.0) * (y1 - y0)
+        result[:, total[:, 0] <= 0] = np.nan
+        return result
+
+
+class DispersionStats:
+    def __init__(self, time_grid: Sequence[float], variables: Sequence[str], compression: int = COMPRESSION):
+        self.time = np.asarray(time_grid, dtype=np.float64)
+        self.variables = list(variables)
+        steps = len(self.time)
+        self.runs = 0
+        self.count = {name: np.zeros(steps) for name in self.variables}
+        self.mean = {name: np.zeros(steps) for name in self.variables}
+        self.m2 = {name: np.zeros(steps) for name in self.variables}
+        self.low = {name: np.full(steps, np.inf) for name in self.variables}
+        self.high = {name: np.full(steps, -np.inf) for name in self.variables}
+        self.digest = {name: QuantileDigest(steps, compression) for name in self.variables}
+
+    @classmethod
+    def for_run(cls, run: dict, points: int = DEFAULT_POINTS, **options) -> "DispersionStats":
+        grid = np.linspace(float(run["start_time_s"]), float(run["end_time_s"]), points)
+        return cls(grid, run["outputs"], **options)
+
+    def add_run(self, series: Dict[str, Tuple[Sequence[float], Sequence[float]]]) -> None:
+        # series: variable -> (times, values) of one finished run
+        self.runs += 1
+        for name in self.variables:
+            if name not in series:
+                continue
+            t, v = (np.asarray(a, dtype=np.float64) for a in series[name])
+            x = interpolate(t, v, self.time)
+            # steps outside the run's time span don't count
+            x[(self.time < t[0]) | (self.time > t[-1])] = np.nan
+            valid = ~np.isnan(x)
+            n = self.count[name] + valid
+            delta = np.where(valid, x - self.mean[name], 0.0)
+            self.mean[name] += np.where(valid, delta / np.maximum(n, 1), 0.0)
+            self.m2[name] += np.where(valid, delta * (x - self.mean[name]), 0.0)
+            self.count[name] = n
+            self.low[name] = np.fmin(self.low[name], x)
+            self.high[name] = np.fmax(self.high[name], x)
+            self.digest[name].add(x)
+
+    def merge(self, other: "DispersionStats") -> "DispersionStats":
+        if len(other.time) != len(self.time) or not np.allclose(other.time, self.time):
+            raise ValueError("Dispersion statistics can only be merged on the same time grid")
+        self.runs += other.runs
+        for name in self.variables:
+            if name not in other.variables:
+                continue
+            na, nb = self.count[name], other.count[name]
+            n = na + nb
+            safe = np.maximum(n, 1)
+            delta = other.mean[name] - self.mean[name]
+            self.mean[name] = self.mean[name] + delta * nb / safe
+            self.m2[name] = self.m2[name] + other.m2[name] + delta ** 2 * na * nb / safe
+            self.count[name] = n
+            self.low[name] = np.fmin(self.low[name], other.low[name])
+            self.high[name] = np.fmax(self.high[name], other.high[name])
+            self.digest[name].merge(other.digest[name])
+        return self
+
+    def std(self, name: str) -> np.ndarray:
+        n = self.count[name]
+        return np.sqrt(np.where(n > 1, self.m2[name] / np.maximum(n - 1, 1), np.nan))
+
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Dict[str, np.ndarray]]:
+        result = {}
+        for name in self.variables:
+            covered = self.count[name] > 0
+            low = np.where(covered, self.low[name], np.nan)
+            high = np.where(covered, self.high[name], np.nan)
+            stats = {"count": self.count[name], "mean": np.where(covered, self.mean[name], np.nan),
+                     "std": self.std(name), "min": low, "max": high}
+            for q, values in zip(quantiles, self.digest[name].quantiles(quantiles, low, high)):
+                stats[f"p{q * 100:g}"] = values
+            result[name] = stats
+        return result
+
+    def write_csv(self, path: str, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> None:
+        summary = self.summary(quantiles)
+        columns = [(f"{name} {stat}", values) for name, stats in summary.items() for stat, values in stats.items()]
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["time"] + [label for label, _ in columns])
+            for i, t in enumerate(self.time):
+                writer.writerow([f"{t:.6f}"] + [f"{values[i]:.6g}" for _, values in columns])
+
+    def save(self, path: str) -> None:
+        arrays = {"time": self.time}
+        for i, name in enumerate(self.variables):
+            digest = self.digest[name]
+            digest.flush()
+            for field in ("count", "mean", "m2", "low", "high"):
+                arrays[f"{field}_{i}"] = getattr(self, field)[name]
+            arrays[f"centroid_mean_{i}"], arrays[f"centroid_weight_{i}"] = digest.means, digest.weights
+        meta = {"variables": self.variables, "runs": self.runs,
+                "compression": self.digest[self.variables[0]].compression if self.variables else COMPRESSION}
+        np.savez_compressed(path, meta=json.dumps(meta), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "DispersionStats":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            stats = cls(data["time"], meta["variables"], meta["compression"])
+            stats.runs = meta["runs"]
+            for i, name in enumerate(stats.variables):
+                for field in ("count", "mean", "m2", "low", "high"):
+                    getattr(stats, field)[name] = data[f"{field}_{i}"]
+                stats.digest[name].means = data[f"centroid_mean_{i}"]
+                stats.digest[name].weights = data[f"centroid_weight_{i}"]
+        return stats
+
+
+def read_columns(path: str) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    with open(path, "r", newline="") as file:
+        rows = [row for row in csv.reader(file) if row and not row[0].startswith("#")]
+    header, data = rows[0], np.array(rows[1:], dtype=np.float64).reshape(-1, len(rows[0]))
+    return {name: (data[:, 0], data[:, i]) for i, name in enumerate(header) if i > 0}
+
+
+def collect(paths: Iterable[str], points: int = DEFAULT_POINTS, variables: Optional[Sequence[str]] = None) -> DispersionStats:
+    # one data.csv at a time; the grid spans the first file's time range
+    stats = None
+    for path in paths:
+        series = read_columns(path)
+        if stats is None:
+            t = next(iter(series.values()))[0]
+            stats = DispersionStats(np.linspace(t[0], t[-1], points), variables or list(series))
+        stats.add_run(series)
+    if stats is None:
+        raise ValueError("No result files to aggregate")
+    return stats
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Aggregate run outputs into dispersion statistics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gather = commands.add_parser("collect")
+    gather.add_argument("patterns", nargs="+", help="data.csv files or glob patterns")
+    gather.add_argument("--out", required=True)
+    gather.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    gather.add_argument("--csv")
+    combine = commands.add_parser("merge")
+    combine.add_argument("parts", nargs="+")
+    combine.add_argument("--out", required=True)
+    combine.add_argument("--csv")
+    args = parser.parse_args()
+
+    if args.command == "collect":
+        paths = (path for pattern in args.patterns for path in sorted(glob.glob(pattern)) or [pattern])
+        stats = collect(paths, args.points)
+    else:
+        stats = DispersionStats.load(args.parts[0])
+        for part in args.parts[1:]:
+            stats.merge(DispersionStats.load(part))
+    stats.save(args.out)
+    if args.csv:
+        stats.write_csv(args.csv)
+    print(f"Aggregated {stats.runs} runs of {', '.join(stats.variables)} into {args.out}")
+
+
+if __name__ == "__main__":
+    _main()
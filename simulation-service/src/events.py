@@ -0,0 +1,299 @@
+r"""
+Event detection over run outputs: threshold crossings, extrema and rate limits.
+
+A run with ``"events"`` gets an event table after it finishes. Each spec
+names a variable and an event type:
+
+    "events": [
+        {"name": "roll_zero", "variable": "eulerangles_1@aero_fd_6dof_body", "type": "crossing",
+         "level": 0, "hysteresis": 0.5, "direction": "both"},
+        {"name": "stall", "variable": "alpha@aero_fd_6dof_body", "type": "threshold", "above": 15, "hysteresis": 1},
+        {"name": "max_g", "variable": "nz@aero_fd_6dof_body", "type": "extremum", "kind": "max", "top": 1},
+        {"name": "pitch_rate", "variable": "eulerangles_2@aero_fd_6dof_body", "type": "rate", "limit": 10,
+         "hysteresis": 2}
+    ]
+
+• crossing   – the variable crosses ``level`` (``rising``, ``falling`` or
+               ``both``). With ``hysteresis`` a crossing only counts once the
+               variable is that far past the level, so noise near the level
+               is not reported. Value: the slope at the crossing.
+• threshold  – the variable goes ``above`` (or ``below``) a bound: ``enter``
+               and ``exit`` rows. ``exit`` needs ``hysteresis`` of margin
+               back. Value: the slope at the bound.
+• extremum   – local ``max`` / ``min`` (or ``both``), refined by a parabola
+               through the neighbouring samples. ``prominence`` drops wiggles
+               that swing less than that, ``top`` keeps the N most extreme.
+               Value: the peak.
+• rate       – |dy/dt| above ``limit``: ``enter`` and ``exit`` rows, value
+               is the interval's peak |dy/dt|. As for thresholds, ``exit``
+               needs |dy/dt| to drop ``hysteresis`` below the limit.
+
+Event times are interpolated between samples. Every type is a fixed number of
+array passes over the series, with no per-sample Python loop. The table has
+the columns event, variable, kind, time and value, sorted by time.
+
+    python src/events.py SPECS.json 'output/sweep_*/data.csv' [--out events.csv]
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+EVENT_TYPES = ("crossing", "threshold", "extremum", "rate")
+DIRECTIONS = ("rising", "falling", "both")
+EXTREMA = ("max", "min", "both")
+COLUMNS = ("event", "variable", "kind", "time", "value")
+
+Table = Dict[str, np.ndarray]
+
+
+def parse_specs(specs) -> List[dict]:
+    if not isinstance(specs, list) or not specs:
+        raise RuntimeError("Error: 'events' must be a non-empty list in the JSON config file")
+    parsed = []
+    for i, spec in enumerate(specs):
+        kind = spec.get("type")
+        if kind not in EVENT_TYPES or "variable" not in spec:
+            raise RuntimeError(f"Error: event {i + 1} needs a 'variable' and a 'type' of: {', '.join(EVENT_TYPES)}")
+        if kind == "crossing" and spec.get("direction", "both") not in DIRECTIONS:
+            raise RuntimeError(f"Error: event {i + 1}: 'direction' must be one of: {', '.join(DIRECTIONS)}")
+        if kind == "threshold" and ("above" in spec) == ("below" in spec):
+            raise RuntimeError(f"Error: event {i + 1}: a threshold needs exactly one of 'above' or 'below'")
+        if kind == "extremum" and spec.get("kind", "both") not in EXTREMA:
+            raise RuntimeError(f"Error: event {i + 1}: 'kind' must be one of: {', '.join(EXTREMA)}")
+        if kind == "rate" and "limit" not in spec:
+            raise RuntimeError(f"Error: event {i + 1}: a rate event needs a 'limit'")
+        parsed.append({**spec, "name": str(spec.get("name", f"{kind}_{i + 1}"))})
+    return parsed
+
+
+def variables(specs: Sequence[dict]) -> List[str]:
+    return list(dict.fromkeys(spec["variable"] for spec in specs))
+
+
+def _cross_time(t: np.ndarray, y: np.ndarray, after: np.ndarray, level) -> np.ndarray:
+    # time y reaches level between samples after-1 and after
+    t0, t1, y0, y1 = t[after - 1], t[after], y[after - 1], y[after]
+    span = y1 - y0
+    fraction = np.clip((level - y0) / np.where(span != 0, span, 1.0), 0.0, 1.0)
+    return t0 + fraction * (t1 - t0)
+
+
+def _slope(t: np.ndarray, y: np.ndarray, after: np.ndarray) -> np.ndarray:
+    dt = t[after] - t[after - 1]
+    return (y[after] - y[after - 1]) / np.where(dt != 0, dt, np.inf)
+
+
+def _schmitt(y: np.ndarray, high: float, low: float, initial: bool) -> np.ndarray:
+    # on at or above high, off at or below low, unchanged in between
+    code = np.where(y >= high, 1, np.where(y <= low, 0, -1))
+    last = np.maximum.accumulate(np.where(code >= 0, np.arange(len(y)), -1))
+    return np.where(last >= 0, code[np.maximum(last, 0)] == 1, initial)
+
+
+def _flips(state: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # first sample of each new state: (turned on, turned off)
+    flips = np.flatnonzero(state[1:] != state[:-1]) + 1
+    return flips[state[flips]], flips[~state[flips]]
+
+
+def _rows(spec: dict, kinds, times, values) -> Table:
+    times = np.asarray(times, dtype=np.float64)
+    return {
+        "event": np.full(len(times), spec["name"], dtype=object),
+        "variable": np.full(len(times), spec["variable"], dtype=object),
+        "kind": np.broadcast_to(np.asarray(kinds, dtype=object), times.shape).copy(),
+        "time": times,
+        "value": np.asarray(values, dtype=np.float64),
+    }
+
+
+def _concat(parts: Sequence[Table]) -> Table:
+    if not parts:
+        return {column: np.empty(0, dtype=object if column in ("event", "variable", "kind") else np.float64)
+                for column in COLUMNS}
+    return {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+
+
+def _crossings(spec: dict, t: np.ndarray, y: np.ndarray) -> Table:
+    level = float(spec.get("level", 0.0))
+    half = float(spec.get("hysteresis", 0.0)) / 2
+    state = _schmitt(y, level + half, level - half, bool(y[0] >= level))
+    rising, falling = _flips(state)
+    # the reported time is the last crossing of the level itself before the band was cleared
+    raw = np.flatnonzero((y[1:] >= level) != (y[:-1] >= level)) + 1
+    parts = []
+    direction = spec.get("direction", "both")
+    for kind, flips in (("rising", rising), ("falling", falling)):
+        if direction not in (kind, "both") or not flips.size or not raw.size:
+            continue
+        after = raw[np.maximum(np.searchsorted(raw, flips, side="right") - 1, 0)]
+        parts.append(_rows(spec, kind, _cross_time(t, y, after, level), _slope(t, y, after)))
+    return _concat(parts)
+
+
+def _intervals(spec: dict, t: np.ndarray, signal: np.ndarray, high: float, low: float) -> Tuple[np.ndarray, ...]:
+    # enter/exit sample indices and interpolated times; a run that starts inside enters at t[0]
+    state = _schmitt(signal, high, low, bool(signal[0] >= high))
+    enters, exits = _flips(state)
+    enter_times = _cross_time(t, signal, enters, high)
+    exit_times = _cross_time(t, signal, exits, low)
+    if state[0]:
+        enters = np.concatenate(([0], enters))
+        enter_times = np.concatenate(([t[0]], enter_times))
+    return enters, enter_times, exits, exit_times
+
+
+def _thresholds(spec: dict, t: np.ndarray, y: np.ndarray) -> Table:
+    hysteresis = float(spec.get("hysteresis", 0.0))
+    # "below" is "above" on the negated series
+    sign = 1.0 if "above" in spec else -1.0
+    bound = sign * float(spec["above"] if "above" in spec else spec["below"])
+    signal = sign * y
+    enters, enter_times, exits, exit_times = _intervals(spec, t, signal, bound, bound - hysteresis)
+    enter_slopes = np.where(enters > 0, _slope(t, y, np.maximum(enters, 1)), np.nan)
+    return _concat([_rows(spec, "enter", enter_times, enter_slopes),
+                    _rows(spec, "exit", exit_times, _slope(t, y, exits))])
+
+
+def _rates(spec: dict, t: np.ndarray, y: np.ndarray) -> Table:
+    limit = float(spec["limit"])
+    hysteresis = float(spec.get("hysteresis", 0.0))
+    rate = np.abs(np.gradient(y, t))
+    enters, enter_times, exits, exit_times = _intervals(spec, t, rate, limit, limit - hysteresis)
+    # peak over each [enter, exit) interval in one reduceat; an open interval runs to the end
+    ends = np.concatenate((exits, np.full(len(enters) - len(exits), len(t), dtype=exits.dtype)))
+    bounds = np.column_stack((enters, ends)).ravel()
+    peaks = np.maximum.reduceat(np.concatenate((rate, [0.0])), bounds)[::2] if len(enters) else np.empty(0)
+    return _concat([_rows(spec, "enter", enter_times, peaks),
+                    _rows(spec, "exit", exit_times, peaks[:len(exits)])])
+
+
+def _significant(values: np.ndarray, prominence: float) -> np.ndarray:
+    # Extrema alternate max/min. A max/min pair whose swing is smaller than both
+    # neighbouring swings is nested inside them, so it is noise on the way and
+    # both go. Repeats over the (short) extrema list until every swing is large.
+    keep = np.arange(len(values))
+    while keep.size > 1:
+        swing = np.abs(np.diff(values[keep]))
+        left = np.concatenate(([np.inf], swing[:-1]))
+        right = np.concatenate((swing[1:], [np.inf]))
+        drop = np.flatnonzero((swing < prominence) & (swing <= left) & (swing < right))
+        if not drop.size:
+            break
+        mask = np.ones(keep.size, dtype=bool)
+        mask[drop] = mask[drop + 1] = False
+        keep = keep[mask]
+    return keep
+
+
+def _extrema(spec: dict, t: np.ndarray, y: np.ndarray) -> Table:
+    steps = np.diff(y)
+    moving = np.flatnonzero(steps != 0)
+    if moving.size < 2:
+        return _concat([])
+    direction = np.sign(steps[moving])
+    turns = np.flatnonzero(direction[1:] != direction[:-1])
+    first, last = moving[turns] + 1, moving[turns + 1]  # plateau of the extremum, inclusive
+    is_max = direction[turns] > 0
+    # parabola through the samples around a sharp peak; plateaus sit at their middle
+    x0, x1, x2 = t[first - 1], t[first], t[np.minimum(first + 1, len(t) - 1)]
+    y0, y1, y2 = y[first - 1], y[first], y[np.minimum(first + 1, len(t) - 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d01 = (y1 - y0) / (x1 - x0)
+        curvature = ((y2 - y1) / (x2 - x1) - d01) / (x2 - x0)
+        vertex = np.clip((x0 + x1) / 2 - d01 / (2 * curvature), x0, x2)
+        peak = y0 + (vertex - x0) * d01 + curvature * (vertex - x0) * (vertex - x1)
+    sharp = (first == last) & np.isfinite(vertex) & (curvature != 0)
+    times = np.where(sharp, vertex, (t[first] + t[last]) / 2)
+    values = np.where(sharp, peak, y[first])
+
+    prominence = float(spec.get("prominence", 0.0))
+    if prominence > 0:
+        keep = _significant(values, prominence)
+        times, values, is_max = times[keep], values[keep], is_max[keep]
+    parts = []
+    wanted = spec.get("kind", "both")
+    for kind, mask in (("max", is_max), ("min", ~is_max)):
+        if wanted not in (kind, "both"):
+            continue
+        kind_times, kind_values = times[mask], values[mask]
+        if "top" in spec:
+            order = np.argsort(-kind_values if kind == "max" else kind_values, kind="stable")[:int(spec["top"])]
+            kind_times, kind_values = kind_times[order], kind_values[order]
+        parts.append(_rows(spec, kind, kind_times, kind_values))
+    return _concat(parts)
+
+
+DETECTORS = {"crossing": _crossings, "threshold": _thresholds, "extremum": _extrema, "rate": _rates}
+
+
+def detect(series: Dict[str, Tuple[Sequence[float], Sequence[float]]], specs: Sequence[dict]) -> Table:
+    # series: variable -> (times, values); specs as parsed by parse_specs
+    parts = []
+    for spec in specs:
+        if spec["variable"] not in series:
+            continue
+        t, y = (np.asarray(a, dtype=np.float64) for a in series[spec["variable"]])
+        if len(t) < 2:
+            continue
+        parts.append(DETECTORS[spec["type"]](spec, t, y))
+    table = _concat(parts)
+    order = np.argsort(table["time"], kind="stable")
+    return {column: values[order] for column, values in table.items()}
+
+
+def rows(table: Table) -> List[tuple]:
+    return list(zip(*(table[column].tolist() for column in COLUMNS)))
+
+
+def write_csv(path: str, table: Table, run: str = None) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow((["run"] if run is not None else []) + list(COLUMNS))
+        for row in rows(table):
+            writer.writerow(([run] if run is not None else []) + list(row[:3]) + [f"{row[3]:.9g}", f"{row[4]:.9g}"])
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Detect events in finished runs' data.csv files")
+    parser.add_argument("specs", help="JSON list of event specs, or a config with an 'events' list")
+    parser.add_argument("patterns", nargs="+", help="data.csv files or glob patterns")
+    parser.add_argument("--out", help="write every run's events to one CSV")
+    args = parser.parse_args()
+
+    # imported here: dispersion pulls in the resampling helpers only the batch CLI needs
+    from dispersion import read_columns
+
+    with open(args.specs, "r") as file:
+        specs = json.load(file)
+    specs = parse_specs(specs["events"] if isinstance(specs, dict) else specs)
+    paths = [path for pattern in args.patterns for path in sorted(glob.glob(pattern)) or [pattern]]
+    started = time.perf_counter()
+    out = open(args.out, "w", newline="") if args.out else None
+    writer = csv.writer(out) if out else None
+    if writer:
+        writer.writerow(["run"] + list(COLUMNS))
+    total = 0
+    for path in paths:
+        table = detect(read_columns(path), specs)
+        total += len(table["time"])
+        run = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        for row in rows(table):
+            if writer:
+                writer.writerow([run] + list(row[:3]) + [f"{row[3]:.9g}", f"{row[4]:.9g}"])
+            else:
+                print(run, *row)
+    if out:
+        out.close()
+    print(f"{total} events in {len(paths)} runs ({time.perf_counter() - started:.2f} s)")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,232 @@
+r"""
+Nearest-neighbour lookup of stored trajectories for new parameter points.
+
+Cataloged runs of one model are indexed by their parameter vectors,
+standardized so that every parameter counts equally, in a KD-tree. A query
+returns the closest stored runs. It can also return an inverse-distance
+blend of the k nearest trajectories on the shared time grid. Blends and
+inexact matches are flagged approximate. ``lookup_or_simulate`` also queues the real
+simulation in the background (on the job scheduler at "background"
+priority, or on a plain thread) so an exact result follows the preview.
+
+    python src/nearest_runs.py build CATALOG OUTPUT INDEX.npz
+    python src/nearest_runs.py query INDEX.npz veGxbinit@aero_fd_6dof_body=5 … [-k 4]
+    python src/nearest_runs.py bench INDEX.npz [--queries 1000]
+"""
+
+import argparse
+import heapq
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from run_catalog import RunCatalog
+from surrogate import DEFAULT_POINTS, cataloged_trajectories
+
+LEAF_SIZE = 16
+DEFAULT_K = 4
+# standardized distance below which a stored run counts as the same point
+EXACT_DISTANCE = 1e-9
+
+
+class KDTree:
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.leaf_size = max(int(leaf_size), 1)
+        self.order = np.arange(len(self.points))
+        # node arrays: slice of self.order, split dimension (-1 for a leaf), split value, children
+        self.start, self.end, self.dim, self.split, self.left, self.right = [], [], [], [], [], []
+        if len(self.points):
+            self._build()
+
+    def _node(self, start: int, end: int) -> int:
+        for field, value in ((self.start, start), (self.end, end), (self.dim, -1),
+                             (self.split, 0.0), (self.left, -1), (self.right, -1)):
+            field.append(value)
+        return len(self.start) - 1
+
+    def _build(self) -> None:
+        stack = [self._node(0, len(self.points))]
+        while stack:
+            node = stack.pop()
+            start, end = self.start[node], self.end[node]
+            if end - start <= self.leaf_size:
+                continue
+            members = self.order[start:end]
+            spread = np.ptp(self.points[members], axis=0)
+            dim = int(np.argmax(spread))
+            if spread[dim] == 0:
+                continue
+            # median split: the left half gets the smaller coordinates
+            middle = (end - start) // 2
+            members = members[np.argpartition(self.points[members, dim], middle)]
+            self.order[start:end] = members
+            self.dim[node], self.split[node] = dim, float(self.points[members[middle], dim])
+            self.left[node] = self._node(start, start + middle)
+            self.right[node] = self._node(start + middle, end)
+            stack += [self.left[node], self.right[node]]
+
+    def query(self, x: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        # (distances, point indices) of the k nearest points, closest first
+        x = np.asarray(x, dtype=np.float64)
+        k = min(k, len(self.points))
+        best_d2, best_i = np.empty(0), np.empty(0, dtype=int)
+        heap = [(0.0, 0)] if k else []
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if len(best_d2) == k and bound >= best_d2[-1]:
+                break
+            dim = self.dim[node]
+            if dim < 0:
+                members = self.order[self.start[node]:self.end[node]]
+                d2 = np.sum((self.points[members] - x) ** 2, axis=1)
+                best_d2 = np.concatenate((best_d2, d2))
+                best_i = np.concatenate((best_i, members))
+                keep = np.argsort(best_d2, kind="stable")[:k]
+                best_d2, best_i = best_d2[keep], best_i[keep]
+                continue
+            gap = x[dim] - self.split[node]
+            near, far = (self.left[node], self.right[node]) if gap < 0 else (self.right[node], self.left[node])
+            heapq.heappush(heap, (bound, near))
+            heapq.heappush(heap, (max(bound, gap * gap), far))
+        return np.sqrt(best_d2), best_i
+
+
+class TrajectoryIndex:
+    def __init__(self, run_ids: Sequence[int], x: np.ndarray, time_grid: np.ndarray, y: np.ndarray,
+                 parameter_names: Sequence[str], output: str, leaf_size: int = LEAF_SIZE):
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape[0] != len(run_ids) or x.shape[0] != len(y):
+            raise ValueError("Every indexed run needs one parameter vector and one trajectory")
+        self.run_ids = np.asarray(run_ids, dtype=np.int64)
+        self.x = x
+        self.time = np.asarray(time_grid, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.parameter_names, self.output = list(parameter_names), output
+        self.x_mean, self.x_scale = x.mean(axis=0), x.std(axis=0)
+        self.x_scale[self.x_scale == 0] = 1.0
+        self.tree = KDTree((x - self.x_mean) / self.x_scale, leaf_size)
+
+    @classmethod
+    def from_catalog(cls, catalog: RunCatalog, output: str, **options) -> "TrajectoryIndex":
+        return cls(*cataloged_trajectories(catalog, output, **options), output)
+
+    def _point(self, parameters) -> np.ndarray:
+        if isinstance(parameters, dict):
+            missing = [name for name in self.parameter_names if name not in parameters]
+            if missing:
+                raise ValueError(f"Missing index parameter(s): {', '.join(missing)}")
+            parameters = [float(parameters[name]) for name in self.parameter_names]
+        return (np.asarray(parameters, dtype=np.float64) - self.x_mean) / self.x_scale
+
+    def nearest(self, parameters, k: int = DEFAULT_K) -> List[dict]:
+        distances, rows = self.tree.query(self._point(parameters), k)
+        return [{"run_id": int(self.run_ids[row]), "distance": float(d),
+                 "parameters": dict(zip(self.parameter_names, self.x[row].tolist()))}
+                for d, row in zip(distances, rows)]
+
+    def lookup(self, parameters, k: int = DEFAULT_K, blend: bool = True) -> dict:
+        started = time.perf_counter()
+        distances, rows = self.tree.query(self._point(parameters), k)
+        if distances[0] <= EXACT_DISTANCE or not blend:
+            values, exact = self.y[rows[0]], distances[0] <= EXACT_DISTANCE
+            weights = np.zeros(len(rows))
+            weights[0] = 1.0
+        else:
+            # inverse-distance weights; a run twice as far counts a quarter as much
+            weights = 1.0 / distances ** 2
+            weights /= weights.sum()
+            values, exact = weights @ self.y[rows], False
+        return {
+            "output": self.output,
+            "time": self.time.tolist(),
+            "values": values.tolist(),
+            "neighbours": [{"run_id": int(self.run_ids[row]), "distance": float(d), "weight": float(w)}
+                           for d, row, w in zip(distances, rows, weights)],
+            "approximate": not exact,
+            "elapsed_ms": (time.perf_counter() - started) * 1e3,
+        }
+
+    def save(self, path: str) -> None:
+        meta = {"parameter_names": self.parameter_names, "output": self.output, "leaf_size": self.tree.leaf_size}
+        np.savez(path, meta=json.dumps(meta), run_ids=self.run_ids, x=self.x, time=self.time, y=self.y)
+
+    @classmethod
+    def load(cls, path: str) -> "TrajectoryIndex":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["run_ids"], data["x"], data["time"], data["y"],
+                       meta["parameter_names"], meta["output"], meta["leaf_size"])
+
+
+def lookup_or_simulate(
+    index: TrajectoryIndex,
+    parameters: Dict[str, float],
+    k: int = DEFAULT_K,
+    simulate: Optional[Callable[[Dict[str, float]], object]] = None,
+    scheduler=None,
+) -> dict:
+    # the approximate answer is returned at once; the real run, if any, is queued behind it
+    result = index.lookup(parameters, k)
+    result["background_job"] = None
+    if result["approximate"] and simulate is not None:
+        job = lambda: simulate(parameters)
+        if scheduler is not None:
+            result["background_job"] = scheduler.submit(job, name="nearest-run-refine", priority="background").id
+        else:
+            threading.Thread(target=job, daemon=True).start()
+            result["background_job"] = "thread"
+    return result
+
+
+def benchmark(index: TrajectoryIndex, queries: int = 1000, k: int = DEFAULT_K, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    low, high = index.x.min(axis=0), index.x.max(axis=0)
+    points = rng.uniform(low, high, size=(queries, len(index.parameter_names)))
+    elapsed = []
+    for point in points:
+        started = time.perf_counter()
+        index.lookup(point, k)
+        elapsed.append((time.perf_counter() - started) * 1e3)
+    elapsed = np.array(elapsed)
+    return {"runs": len(index.run_ids), "queries": queries, "k": k,
+            "p50_ms": float(np.percentile(elapsed, 50)), "p95_ms": float(np.percentile(elapsed, 95)),
+            "max_ms": float(elapsed.max())}
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Look up stored trajectories near a parameter point")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build")
+    build.add_argument("catalog")
+    build.add_argument("output")
+    build.add_argument("index")
+    build.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    query = commands.add_parser("query")
+    query.add_argument("index")
+    query.add_argument("parameters", nargs="+", help="name=value")
+    query.add_argument("-k", type=int, default=DEFAULT_K)
+    bench = commands.add_parser("bench")
+    bench.add_argument("index")
+    bench.add_argument("--queries", type=int, default=1000)
+    bench.add_argument("-k", type=int, default=DEFAULT_K)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        catalog = RunCatalog(args.catalog)
+        index = TrajectoryIndex.from_catalog(catalog, args.output, points=args.points)
+        catalog.close()
+        index.save(args.index)
+        print(f"Indexed {len(index.run_ids)} runs of {args.output} over {', '.join(index.parameter_names)}")
+    elif args.command == "query":
+        parameters = dict(item.split("=", 1) for item in args.parameters)
+        print(json.dumps(TrajectoryIndex.load(args.index).lookup(parameters, args.k)))
+    else:
+        print(json.dumps(benchmark(TrajectoryIndex.load(args.index), args.queries, args.k)))
+
+
+if __name__ == "__main__":
+    _main()
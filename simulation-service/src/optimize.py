@@ -0,0 +1,408 @@
+r"""
+Optimization driver: fit model parameters or throttle breakpoints to target outputs.
+
+A config with an ``"optimize"`` block is not run as written. Its decision
+variables are searched for the values whose outputs best match the targets.
+
+    "optimize": {
+        "variables": {
+            "maxThrust@aero_fd_6dof_thrust": {"range": [1.2e5, 1.8e5]},
+            "throttle": {"table": "dynamic_time_table", "times": [0, 2, 5, 10], "range": [0, 1]}
+        },
+        "objective": [
+            {"output": "eulerangles_2@aero_fd_6dof_body", "target": "data/pitch_target.csv", "metric": "rmse"}
+        ],
+        "method": "cmaes",
+        "population": 8,
+        "max_evaluations": 200,
+        "licenses": 4
+    }
+
+A variable is either a model parameter with a ``range``, or a table: one
+value per breakpoint time, written as an Amesim "time value" table. A target
+is a two-column CSV (time, value) or ``{"time": [...], "value": [...]}``.
+The objective is the weighted sum of each term's error (``rmse``, ``mae`` or
+``max``) at the target's times.
+
+The search runs in the unit cube spanned by the ranges:
+
+• cmaes        – CMA-ES; each generation is a population evaluated at once
+• nelder-mead  – Nelder-Mead that evaluates its reflect, expand and both
+                 contraction moves together, so an iteration takes one batch
+
+Every batch is spread over the loaded circuits, never more at once than
+``licenses``. Points seen before in the same search are not evaluated again,
+and the run catalog replays configs simulated in earlier sessions.
+``max_evaluations`` is checked between batches.
+
+    python src/optimize.py [--method cmaes|nelder-mead] [--dims 6]   → search a test function
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from resampling import interpolate
+
+METHODS = ("cmaes", "nelder-mead")
+METRICS = ("rmse", "mae", "max")
+DEFAULT_MAX_EVALUATIONS = 200
+# candidate tables, named by content; shared so a best config can refer to them after its search
+DEFAULT_TABLE_DIR = os.path.join("output", "optimize", "tables")
+DEFAULT_SIGMA = 0.3       # CMA-ES initial step, as a fraction of each range
+DEFAULT_SIMPLEX_STEP = 0.1
+TOLERANCE = 1e-6
+RUN_PREFIX = "opt_"
+
+
+def _reflect(points: np.ndarray) -> np.ndarray:
+    # mirror points back into [0, 1] at the bounds
+    folded = np.mod(points, 2.0)
+    return np.where(folded > 1.0, 2.0 - folded, folded)
+
+
+class NelderMead:
+    def __init__(self, x0: np.ndarray, step: float = DEFAULT_SIMPLEX_STEP, tolerance: float = TOLERANCE):
+        x0 = np.asarray(x0, dtype=np.float64)
+        # step away from the nearer bound
+        offsets = np.diag(np.where(x0 + step <= 1.0, step, -step))
+        self.simplex = np.vstack([x0, x0 + offsets])
+        self.values = None
+        self.tolerance = tolerance
+        self.shrinking = False
+
+    def _sort(self) -> None:
+        order = np.argsort(self.values, kind="stable")
+        self.simplex, self.values = self.simplex[order], self.values[order]
+
+    def ask(self) -> np.ndarray:
+        if self.values is None:
+            return self.simplex.copy()
+        best = self.simplex[0]
+        if self.shrinking:
+            return best + 0.5 * (self.simplex[1:] - best)
+        centroid = self.simplex[:-1].mean(axis=0)
+        direction = centroid - self.simplex[-1]
+        # reflect, expand, outside contraction, inside contraction
+        return centroid + np.array([1.0, 2.0, 0.5, -0.5])[:, None] * direction
+
+    def tell(self, points: np.ndarray, values: np.ndarray) -> None:
+        if self.values is None:
+            self.simplex, self.values = np.array(points), np.array(values, dtype=np.float64)
+        elif self.shrinking:
+            self.simplex[1:], self.values[1:] = points, values
+            self.shrinking = False
+        else:
+            reflect, expand, outside, inside = values
+            worst, second_worst = self.values[-1], self.values[-2]
+            if reflect < self.values[0]:
+                chosen = 1 if expand < reflect else 0
+            elif reflect < second_worst:
+                chosen = 0
+            elif reflect < worst:
+                chosen = 2 if outside <= reflect else None
+            else:
+                chosen = 3 if inside < worst else None
+            if chosen is None:
+                self.shrinking = True
+            else:
+                self.simplex[-1], self.values[-1] = points[chosen], values[chosen]
+        self._sort()
+
+    @property
+    def done(self) -> bool:
+        if self.values is None or self.shrinking:
+            return False
+        spread = np.max(np.abs(self.values - self.values[0]))
+        size = np.max(np.abs(self.simplex - self.simplex[0]))
+        return bool(spread <= self.tolerance and size <= self.tolerance)
+
+    @property
+    def best(self) -> Tuple[np.ndarray, float]:
+        return self.simplex[0], float(self.values[0])
+
+
+class CMAES:
+    def __init__(self, x0: np.ndarray, sigma: float = DEFAULT_SIGMA, population: Optional[int] = None,
+                 seed: Optional[int] = None, tolerance: float = TOLERANCE):
+        n = len(x0)
+        self.n = n
+        self.mean = np.asarray(x0, dtype=np.float64).copy()
+        self.sigma = float(sigma)
+        self.tolerance = tolerance
+        self.rng = np.random.default_rng(seed)
+        self.population = int(population or 4 + int(3 * np.log(n)))
+        mu = self.population // 2
+        weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+        # standard strategy parameters (Hansen, "The CMA Evolution Strategy: A Tutorial")
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+        self.pc, self.ps = np.zeros(n), np.zeros(n)
+        self.B, self.D = np.eye(n), np.ones(n)
+        self.C = np.eye(n)
+        self.generation = 0
+        self._best = (self.mean.copy(), np.inf)
+
+    def ask(self) -> np.ndarray:
+        z = self.rng.standard_normal((self.population, self.n))
+        return self.mean + self.sigma * (z * self.D) @ self.B.T
+
+    def tell(self, points: np.ndarray, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(values, kind="stable")
+        if values[order[0]] < self._best[1]:
+            self._best = (np.array(points[order[0]]), float(values[order[0]]))
+        mu = len(self.weights)
+        selected = (np.asarray(points)[order[:mu]] - self.mean) / self.sigma
+        step = self.weights @ selected
+        self.mean = self.mean + self.sigma * step
+        self.generation += 1
+
+        inv_sqrt_c = (self.B / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ step
+        norm_ps = np.linalg.norm(self.ps)
+        hsig = norm_ps / np.sqrt(1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < 1.4 + 2 / (self.n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+        rank_mu = (selected * self.weights[:, None]).T @ selected
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * rank_mu)
+        self.sigma *= np.exp((self.cs / self.damps) * (norm_ps / self.chi_n - 1))
+        eigenvalues, self.B = np.linalg.eigh((self.C + self.C.T) / 2)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+    @property
+    def done(self) -> bool:
+        return bool(self.sigma * self.D.max() < self.tolerance)
+
+    @property
+    def best(self) -> Tuple[np.ndarray, float]:
+        return self._best
+
+
+def make_optimizer(settings: dict, x0: np.ndarray):
+    method = settings.get("method", "cmaes")
+    tolerance = float(settings.get("tolerance", TOLERANCE))
+    if method == "cmaes":
+        return CMAES(x0, float(settings.get("sigma", DEFAULT_SIGMA)), settings.get("population"),
+                     settings.get("seed"), tolerance)
+    if method == "nelder-mead":
+        return NelderMead(x0, float(settings.get("step", DEFAULT_SIMPLEX_STEP)), tolerance)
+    raise RuntimeError(f"Error: unknown optimization method '{method}'. Use one of: {', '.join(METHODS)}")
+
+
+def minimize(
+    optimizer,
+    evaluate: Callable[[np.ndarray], Sequence[float]],
+    max_evaluations: int = DEFAULT_MAX_EVALUATIONS,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> Tuple[np.ndarray, float, List[dict]]:
+    # evaluate(points) scores a batch of unit-cube points; repeated points are served from memory
+    memo: Dict[bytes, float] = {}
+    evaluations, batches, history = 0, 0, []
+    started = time.perf_counter()
+    while evaluations < max_evaluations and not optimizer.done:
+        points = _reflect(optimizer.ask())
+        keys = [np.round(point, 12).tobytes() for point in points]
+        fresh = list({key: i for i, key in enumerate(keys) if key not in memo}.values())
+        if fresh:
+            scores = evaluate(points[fresh])
+            for i, score in zip(fresh, scores):
+                memo[keys[i]] = float(score)
+        values = np.array([memo[key] for key in keys])
+        optimizer.tell(points, values)
+        evaluations += len(fresh)
+        batches += 1
+        best_point, best_value = optimizer.best
+        record = {
+            "batch": batches,
+            "evaluations": evaluations,
+            "reused": len(points) - len(fresh),
+            "batch_best": float(values.min()),
+            "best": best_value,
+            "best_point": best_point.tolist(),
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+        history.append(record)
+        if on_progress is not None:
+            on_progress(record)
+    best_point, best_value = optimizer.best
+    return best_point, best_value, history
+
+
+def read_target(target, config_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(target, dict):
+        return np.asarray(target["time"], dtype=np.float64), np.asarray(target["value"], dtype=np.float64)
+    path = os.path.join(config_dir, target)
+    with open(path, "r", newline="") as file:
+        rows = [row for row in csv.reader(file) if row and not row[0].startswith("#")]
+    try:
+        float(rows[0][0])
+    except ValueError:
+        rows = rows[1:]
+    data = np.array([row[:2] for row in rows], dtype=np.float64)
+    return data[:, 0], data[:, 1]
+
+
+class Objective:
+    def __init__(self, terms, config_dir: str):
+        terms = terms if isinstance(terms, list) else [terms]
+        if not terms:
+            raise RuntimeError("Error: 'optimize' needs at least one 'objective' term")
+        self.terms = []
+        for term in terms:
+            metric = term.get("metric", "rmse")
+            if metric not in METRICS:
+                raise RuntimeError(f"Error: unknown objective metric '{metric}'. Use one of: {', '.join(METRICS)}")
+            time_points, target = read_target(term["target"], config_dir)
+            self.terms.append((term["output"], metric, float(term.get("weight", 1.0)), time_points, target))
+
+    @property
+    def outputs(self) -> List[str]:
+        return list(dict.fromkeys(term[0] for term in self.terms))
+
+    def score(self, series: Dict[str, Tuple[Sequence[float], Sequence[float]]]) -> float:
+        total = 0.0
+        for output, metric, weight, time_points, target in self.terms:
+            if output not in series:
+                return np.inf
+            t, v = (np.asarray(a, dtype=np.float64) for a in series[output])
+            error = interpolate(t, v, time_points) - target
+            # a run that stopped early cannot match the rest of the target
+            error[(time_points < t[0]) | (time_points > t[-1])] = np.inf
+            if metric == "rmse":
+                total += weight * np.sqrt(np.mean(error ** 2))
+            elif metric == "mae":
+                total += weight * np.mean(np.abs(error))
+            else:
+                total += weight * np.max(np.abs(error))
+        return float(total) if np.isfinite(total) else np.inf
+
+
+class DecisionSpace:
+    def __init__(self, variables: dict):
+        if not isinstance(variables, dict) or not variables:
+            raise RuntimeError("Error: 'optimize' needs a non-empty 'variables' mapping")
+        self.variables = []
+        low, high, initial = [], [], []
+        for name, spec in variables.items():
+            if "range" not in spec:
+                raise RuntimeError(f"Error: optimization variable '{name}' needs a 'range'")
+            size = len(spec["times"]) if "table" in spec else 1
+            lo, hi = (float(bound) for bound in spec["range"])
+            if not hi > lo:
+                raise RuntimeError(f"Error: optimization variable '{name}' has an empty range")
+            start = np.broadcast_to(np.asarray(spec.get("initial", (lo + hi) / 2), dtype=np.float64), (size,))
+            low += [lo] * size
+            high += [hi] * size
+            initial += list(start)
+            self.variables.append((name, spec, size))
+        self.low, self.high = np.array(low), np.array(high)
+        self.initial = np.clip((np.array(initial) - self.low) / (self.high - self.low), 0.0, 1.0)
+
+    def values(self, point: np.ndarray) -> Dict[str, object]:
+        # variable name -> value (parameters) or breakpoint values (tables)
+        x = self.low + np.asarray(point) * (self.high - self.low)
+        result, i = {}, 0
+        for name, spec, size in self.variables:
+            result[name] = x[i:i + size].tolist() if "table" in spec else float(x[i])
+            i += size
+        return result
+
+    def run_settings(self, point: np.ndarray, table_dir: str) -> dict:
+        # parameters and time-series tables of one candidate, as a "runs" entry
+        parameters, tables = {}, {}
+        for (name, spec, _), value in zip(self.variables, self.values(point).values()):
+            if "table" in spec:
+                tables[spec["table"]] = {"file": write_table(table_dir, spec["times"], value)}
+            else:
+                parameters[name] = repr(value)
+        return {"parameters": parameters, "time_series_data": tables}
+
+
+def write_table(folder: str, times: Sequence[float], values: Sequence[float]) -> str:
+    # named by content, so an identical candidate hashes to the same cataloged config
+    lines = "".join(f"{t:.9g} {v:.9g}\n" for t, v in zip(times, values))
+    path = os.path.join(os.path.abspath(folder), hashlib.sha256(lines.encode("utf-8")).hexdigest()[:16] + ".csv")
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, "w") as file:
+            file.write(lines)
+        os.replace(staging, path)
+    return path
+
+
+class Optimization:
+    def __init__(self, settings: dict, config_dir: str, table_dir: str):
+        self.settings = settings
+        self.space = DecisionSpace(settings.get("variables"))
+        self.objective = Objective(settings.get("objective", []), config_dir)
+        self.optimizer = make_optimizer(settings, self.space.initial)
+        self.max_evaluations = int(settings.get("max_evaluations", DEFAULT_MAX_EVALUATIONS))
+        self.table_dir = table_dir
+        self.count = 0
+        # run name -> outputs of a candidate that finished but is not scored yet
+        self.results = {}
+        self.pending = set()
+
+    def candidate_runs(self, points: np.ndarray, outputs: Sequence[str]) -> List[dict]:
+        runs = []
+        for point in points:
+            self.count += 1
+            name = f"{RUN_PREFIX}{self.count:06d}"
+            self.pending.add(name)
+            runs.append({"name": name, "outputs": list(dict.fromkeys(list(outputs) + self.objective.outputs)),
+                         **self.space.run_settings(point, self.table_dir)})
+        return runs
+
+    def add_run(self, run_name: str, series: dict) -> None:
+        if run_name in self.pending:
+            self.results[run_name] = {name: series[name] for name in self.objective.outputs if name in series}
+
+    def score(self, run_name: str) -> float:
+        # candidates that failed or left no outputs never win
+        self.pending.discard(run_name)
+        series = self.results.pop(run_name, None)
+        return np.inf if series is None else self.objective.score(series)
+
+    def run(self, evaluate: Callable[[np.ndarray], Sequence[float]],
+            on_progress: Optional[Callable[[dict], None]] = None) -> Tuple[np.ndarray, float, List[dict]]:
+        return minimize(self.optimizer, evaluate, self.max_evaluations, on_progress)
+
+
+def _test_function(points: np.ndarray) -> np.ndarray:
+    # shifted, badly scaled quadratic with its minimum inside the unit cube
+    n = points.shape[1]
+    scales = np.logspace(0, 2, n)
+    return np.sum(scales * (points - np.linspace(0.2, 0.8, n)) ** 2, axis=1)
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Run the optimizer on a test function, without Amesim")
+    parser.add_argument("--method", choices=METHODS, default="cmaes")
+    parser.add_argument("--dims", type=int, default=6)
+    parser.add_argument("--max-evaluations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    optimizer = make_optimizer({"method": args.method, "seed": args.seed, "tolerance": 1e-8}, np.full(args.dims, 0.5))
+    point, value, history = minimize(optimizer, _test_function, args.max_evaluations)
+    print(f"{args.method}: f = {value:.3g} after {history[-1]['evaluations']} evaluations "
+          f"in {len(history)} batches ({sum(record['reused'] for record in history)} reused)")
+    print("x =", np.round(point, 4).tolist())
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,181 @@
+r"""
+Vectorized orientation conversions for the 6-DOF attitude outputs.
+
+Every function works on whole output arrays at once, shaped (N,) for angles
+and (N, 4) for quaternions. Conventions:
+
+• quaternions are scalar-first (w, x, y, z) and rotate body → reference frame
+• Euler orders name intrinsic Tait-Bryan sequences, e.g. "ZYX" is
+  yaw → pitch → roll, and angles come back in that same order
+• NED is the aero body/earth convention; Unity is left-handed with
+  x = right/East, y = Up, z = forward/North
+
+    python src/orientation.py [N]   → time the conversions on N samples
+"""
+
+import sys
+import time
+from typing import Sequence, Tuple
+
+import numpy as np
+
+ORDERS = ("XYZ", "XZY", "YXZ", "YZX", "ZXY", "ZYX")
+_AXIS = {"X": 0, "Y": 1, "Z": 2}
+DEFAULT_CHUNK = 1 << 18
+
+# NED → Unity basis change (x = E, y = -D, z = N); it is a reflection (det = -1)
+NED_TO_UNITY = np.array([[0.0, 1.0, 0.0], [0.0, 0.0, -1.0], [1.0, 0.0, 0.0]])
+
+
+def _check_order(order: str) -> Tuple[int, int, int, float]:
+    order = order.upper()
+    if order not in ORDERS:
+        raise ValueError(f"Unknown rotation order '{order}'. Use one of: {', '.join(ORDERS)}")
+    i, j, k = (_AXIS[a] for a in order)
+    # +1 for cyclic sequences (XYZ, YZX, ZXY), -1 otherwise
+    parity = 1.0 if (j - i) % 3 == 1 else -1.0
+    return i, j, k, parity
+
+
+def as_quaternions(q: Sequence, scalar_first: bool = True) -> np.ndarray:
+    q = np.asarray(q, dtype=np.float64)
+    if q.ndim != 2 or q.shape[1] != 4:
+        raise ValueError(f"Quaternions must be shaped (N, 4), got {q.shape}")
+    return q if scalar_first else q[:, [3, 0, 1, 2]]
+
+
+def quat_normalize(q: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(q, axis=1, keepdims=True)
+    return q / np.where(norm == 0.0, 1.0, norm)
+
+
+def _multiply_components(p: Sequence[np.ndarray], q: Sequence[np.ndarray]) -> Tuple[np.ndarray, ...]:
+    # works on per-component arrays, which keeps every operation contiguous
+    pw, px, py, pz = p
+    qw, qx, qy, qz = q
+    return (
+        pw * qw - px * qx - py * qy - pz * qz,
+        pw * qx + px * qw + py * qz - pz * qy,
+        pw * qy - px * qz + py * qw + pz * qx,
+        pw * qz + px * qy - py * qx + pz * qw,
+    )
+
+
+def quat_multiply(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    return np.column_stack(_multiply_components(p.T, q.T))
+
+
+def _rotation_entry(q: np.ndarray, row: int, col: int) -> np.ndarray:
+    # single entry of the rotation matrix, so no (N, 3, 3) temporary is built
+    w, v = q[:, 0], q[:, 1:]
+    if row == col:
+        others = [a for a in range(3) if a != row]
+        return 1.0 - 2.0 * (v[:, others[0]] ** 2 + v[:, others[1]] ** 2)
+    third = 3 - row - col
+    sign = 1.0 if (col - row) % 3 == 1 else -1.0
+    return 2.0 * (v[:, row] * v[:, col] - sign * w * v[:, third])
+
+
+def quat_to_euler(q: Sequence, order: str = "ZYX", degrees: bool = True, scalar_first: bool = True) -> np.ndarray:
+    i, j, k, e = _check_order(order)
+    q = quat_normalize(as_quaternions(q, scalar_first))
+    middle = np.arcsin(np.clip(e * _rotation_entry(q, i, k), -1.0, 1.0))
+    first = np.arctan2(-e * _rotation_entry(q, j, k), _rotation_entry(q, k, k))
+    last = np.arctan2(-e * _rotation_entry(q, i, j), _rotation_entry(q, i, i))
+    angles = np.column_stack((first, middle, last))
+    return np.rad2deg(angles) if degrees else angles
+
+
+def _axis_components(angle: np.ndarray, axis: int) -> Tuple[np.ndarray, ...]:
+    zero = np.zeros_like(angle)
+    half = angle / 2.0
+    components = [np.cos(half), zero, zero, zero]
+    components[1 + axis] = np.sin(half)
+    return tuple(components)
+
+
+def euler_to_quat(angles: Sequence, order: str = "ZYX", degrees: bool = True) -> np.ndarray:
+    i, j, k, _ = _check_order(order)
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 3)
+    if degrees:
+        angles = np.deg2rad(angles)
+    angles = np.ascontiguousarray(angles.T)
+    q = _multiply_components(_axis_components(angles[0], i), _axis_components(angles[1], j))
+    return np.column_stack(_multiply_components(q, _axis_components(angles[2], k)))
+
+
+def ned_to_unity_vectors(v: Sequence) -> np.ndarray:
+    return np.asarray(v, dtype=np.float64).reshape(-1, 3) @ NED_TO_UNITY.T
+
+
+def ned_quat_to_unity(q: Sequence, scalar_first: bool = True) -> np.ndarray:
+    # R' = M R M^T with an improper M keeps w and maps the axis to -M v.
+    # Returned as Unity's (x, y, z, w) component order.
+    q = as_quaternions(q, scalar_first)
+    axis = -(q[:, 1:] @ NED_TO_UNITY.T)
+    return np.column_stack((axis, q[:, 0]))
+
+
+def ned_euler_to_unity(roll: np.ndarray, pitch: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    # Unity applies Z → X → Y about local axes, the same yaw → pitch → roll
+    # chain as ZYX aero angles, so only the signs change. Degrees in and out;
+    # "0.0 -" keeps negated zeros from printing as -0.000000.
+    return np.column_stack((0.0 - pitch, yaw, 0.0 - roll))
+
+
+def unwrap_angles(angles: Sequence, degrees: bool = True) -> np.ndarray:
+    angles = np.asarray(angles, dtype=np.float64)
+    return np.unwrap(angles, period=360.0 if degrees else 2.0 * np.pi, axis=0)
+
+
+def slerp(t_src: Sequence, q_src: Sequence, t_out: Sequence, chunk_size: int = DEFAULT_CHUNK) -> np.ndarray:
+    t_src = np.asarray(t_src, dtype=np.float64)
+    q_src = quat_normalize(as_quaternions(q_src))
+    t_out = np.asarray(t_out, dtype=np.float64)
+    if t_src.size != q_src.shape[0]:
+        raise ValueError("slerp needs one time stamp per quaternion")
+    if t_src.size == 1:
+        return np.repeat(q_src, t_out.size, axis=0)
+    out = np.empty((t_out.size, 4))
+    for first in range(0, t_out.size, chunk_size):
+        part = slice(first, first + chunk_size)
+        t_q = np.clip(t_out[part], t_src[0], t_src[-1])
+        idx = np.clip(np.searchsorted(t_src, t_q, side="right") - 1, 0, t_src.size - 2)
+        h = t_src[idx + 1] - t_src[idx]
+        s = np.zeros_like(t_q)
+        np.divide(t_q - t_src[idx], h, out=s, where=h != 0)
+        q0, q1 = q_src[idx], q_src[idx + 1]
+        dot = np.einsum("ij,ij->i", q0, q1)
+        # take the short way round
+        q1 = np.where(dot[:, None] < 0.0, -q1, q1)
+        dot = np.abs(dot)
+        theta = np.arccos(np.clip(dot, -1.0, 1.0))
+        sin_theta = np.sin(theta)
+        close = sin_theta < 1e-9
+        safe = np.where(close, 1.0, sin_theta)
+        w0 = np.where(close, 1.0 - s, np.sin((1.0 - s) * theta) / safe)
+        w1 = np.where(close, s, np.sin(s * theta) / safe)
+        out[part] = quat_normalize(w0[:, None] * q0 + w1[:, None] * q1)
+    return out
+
+
+def benchmark(n: int = 10_000_000) -> None:
+    rng = np.random.default_rng(0)
+    q = quat_normalize(rng.normal(size=(n, 4)))
+    t = np.linspace(0.0, n / 1000.0, n)
+    euler = quat_to_euler(q)
+    steps = [
+        ("quat_to_euler ZYX", lambda: quat_to_euler(q)),
+        ("euler_to_quat ZYX", lambda: euler_to_quat(euler)),
+        ("ned_quat_to_unity", lambda: ned_quat_to_unity(q)),
+        ("unwrap_angles", lambda: unwrap_angles(rng.uniform(-180, 180, n))),
+        ("slerp 60 Hz", lambda: slerp(t, q, np.arange(t[0], t[-1], 1.0 / 60.0))),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        print(f"[BENCH] {name:<20} {n:>10} samples  {time.perf_counter() - started:7.3f} s")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,145 @@
+r"""
+Flight-path exporter: 6-DOF body outputs → Unity ``PlanePath.csv``.
+
+Geodetic position (latitude, longitude, altitude) is converted to ECEF, then
+to a local East-North-Up frame anchored at the first sample, then to Unity's
+left-handed frame (x = East, y = Up, z = North). Aerospace Euler angles
+(roll, pitch, yaw, applied yaw → pitch → roll) become Unity Euler angles
+through ``orientation.ned_euler_to_unity`` (rx = -pitch, ry = yaw, rz = -roll).
+
+Everything is vectorized and processed in chunks. Optional thinning
+(Ramer-Douglas-Peucker) drops waypoints while keeping every sample within
+``max_error`` metres of the exported polyline.
+"""
+
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from orientation import ned_euler_to_unity
+
+# WGS84, same ellipsoid as the aero_env component of the plane model
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+
+PATH_HEADER = ("x", "y", "z", "rx", "ry", "rz")
+DEFAULT_CHUNK = 1 << 18
+
+# 6-DOF body outputs used for the path, in the order export_plane_path expects them
+PATH_VARIABLES = (
+    "latitude@aero_fd_6dof_body",
+    "longitude@aero_fd_6dof_body",
+    "altitude@aero_fd_6dof_body",
+    "eulerangles_1@aero_fd_6dof_body",
+    "eulerangles_2@aero_fd_6dof_body",
+    "eulerangles_3@aero_fd_6dof_body",
+)
+
+
+def geodetic_to_ecef(lat: np.ndarray, lon: np.ndarray, alt: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # lat / lon in radians, alt in metres
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    n = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat * sin_lat)
+    x = (n + alt) * cos_lat * np.cos(lon)
+    y = (n + alt) * cos_lat * np.sin(lon)
+    z = (n * (1.0 - WGS84_E2) + alt) * sin_lat
+    return x, y, z
+
+
+def ecef_to_enu(
+    x: np.ndarray, y: np.ndarray, z: np.ndarray,
+    lat0: float, lon0: float, alt0: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    x0, y0, z0 = geodetic_to_ecef(np.float64(lat0), np.float64(lon0), np.float64(alt0))
+    dx, dy, dz = x - x0, y - y0, z - z0
+    sin_lat, cos_lat = np.sin(lat0), np.cos(lat0)
+    sin_lon, cos_lon = np.sin(lon0), np.cos(lon0)
+    east = -sin_lon * dx + cos_lon * dy
+    north = -sin_lat * cos_lon * dx - sin_lat * sin_lon * dy + cos_lat * dz
+    up = cos_lat * cos_lon * dx + cos_lat * sin_lon * dy + sin_lat * dz
+    return east, north, up
+
+
+def enu_to_unity(east: np.ndarray, north: np.ndarray, up: np.ndarray) -> np.ndarray:
+    return np.column_stack((east, up, north))
+
+
+def _segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    direction = end - start
+    length2 = float(direction @ direction)
+    rel = points - start
+    if length2 == 0.0:
+        return np.sqrt(np.einsum("ij,ij->i", rel, rel))
+    s = np.clip(rel @ direction / length2, 0.0, 1.0)
+    offset = rel - s[:, None] * direction
+    return np.sqrt(np.einsum("ij,ij->i", offset, offset))
+
+
+def thin_path(points: np.ndarray, max_error: float) -> np.ndarray:
+    """Indices of the waypoints kept by Ramer-Douglas-Peucker."""
+    n = points.shape[0]
+    if n <= 2 or max_error <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    # explicit stack instead of recursion; each segment's distances are one vector op
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dist = _segment_distances(points[first + 1:last], points[first], points[last])
+        worst = int(np.argmax(dist))
+        if dist[worst] > max_error:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def iter_path_rows(
+    lat: Sequence[float], lon: Sequence[float], alt: Sequence[float],
+    roll: Sequence[float], pitch: Sequence[float], yaw: Sequence[float],
+    degrees: bool = True,
+    max_error: Optional[float] = None,
+    scale: float = 1.0,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> Iterator[np.ndarray]:
+    columns = [np.asarray(c, dtype=np.float64) for c in (lat, lon, alt, roll, pitch, yaw)]
+    n = columns[0].size
+    if any(c.size != n for c in columns):
+        raise ValueError("Path inputs must all have the same length")
+    if n == 0:
+        return
+    lat, lon, alt, roll, pitch, yaw = columns
+    to_rad = np.deg2rad if degrees else (lambda a: a)
+    to_deg = (lambda a: a) if degrees else np.rad2deg
+    lat0, lon0, alt0 = float(to_rad(lat[0])), float(to_rad(lon[0])), float(alt[0])
+
+    for first in range(0, n, chunk_size):
+        # overlap by one sample so thinning keeps the chunk joints
+        stop = min(first + chunk_size + 1, n)
+        part = slice(first, stop)
+        x, y, z = geodetic_to_ecef(to_rad(lat[part]), to_rad(lon[part]), alt[part])
+        position = enu_to_unity(*ecef_to_enu(x, y, z, lat0, lon0, alt0)) * scale
+        rotation = ned_euler_to_unity(to_deg(roll[part]), to_deg(pitch[part]), to_deg(yaw[part]))
+        rows = np.hstack((position, rotation))
+        if max_error:
+            rows = rows[thin_path(position, max_error * scale)]
+        if first > 0:
+            rows = rows[1:]  # first row repeats the previous chunk's last row
+        yield rows
+        if stop == n:
+            break
+
+
+def export_plane_path(path: str, *columns: Sequence[float], float_fmt: str = "%.6f", **options) -> int:
+    rows = 0
+    with open(path, "w", newline="") as file:
+        file.write(",".join(PATH_HEADER) + "\n")
+        for block in iter_path_rows(*columns, **options):
+            np.savetxt(file, block, fmt=float_fmt, delimiter=",")
+            rows += block.shape[0]
+    return rows
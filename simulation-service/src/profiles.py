@@ -0,0 +1,178 @@
+r"""
+Stage profile compiler: a table of flight stages → dense time-series tables.
+
+A stage table (``example/data/stages.csv``) lists the mission one stage per
+row. Each row gives a duration, a target per channel (throttle, pitch, roll;
+``Angle`` is read as roll) and how the channel moves from the previous
+stage's value to the new target: ``step``, ``linear``, ``smooth``
+(smoothstep) or ``cosine``, over ``ramp_s`` seconds at the start of the stage.
+A blank target holds the previous value. Stage 1 starts at its own targets.
+
+    stages,duration_s,throttle,pitch,Angle,ramp,ramp_s
+    1,10,0.3,-1,0,linear,
+    2,20,0.6,2,0,smooth,5
+
+Every channel is generated in one vectorized pass over a fixed-rate grid and
+written as an Amesim table (``<channel>_table.csv``, "time value" lines,
+the format of ``dynamic_time_table``). Pitch and roll are also written as
+target CSVs (``pitch angle.csv``, ``roll angle.csv``) for the PID target
+builder. Compiled profiles are cached under the hash of the stage table's
+content and the rate, so an unchanged table compiles once.
+
+    python src/profiles.py STAGES.csv [--rate 10] [--cache output/profiles]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+CHANNELS = ("throttle", "pitch", "roll")
+# channels that also get a target CSV for the PID target builder
+ANGLE_CHANNELS = ("pitch", "roll")
+ALIASES = {"angle": "roll", "duration": "duration_s", "stage": "stages"}
+RAMPS = ("step", "linear", "smooth", "cosine")
+DEFAULT_RATE_HZ = 10.0
+DEFAULT_STAGE_S = 10.0
+DEFAULT_RAMP_S = 2.0
+DEFAULT_CACHE = os.path.join("output", "profiles")
+# bump when the generated tables change for the same stage table
+COMPILER_VERSION = 1
+
+_SHAPES = {
+    "step": lambda u: (u > 0).astype(np.float64),
+    "linear": lambda u: u,
+    "smooth": lambda u: u * u * (3.0 - 2.0 * u),
+    "cosine": lambda u: 0.5 - 0.5 * np.cos(np.pi * u),
+}
+
+
+def _number(text: Optional[str]) -> Optional[float]:
+    text = (text or "").strip()
+    return float(text) if text else None
+
+
+def read_stages(path: str) -> List[dict]:
+    with open(path, "r", newline="") as file:
+        rows = list(csv.DictReader(file))
+    stages = []
+    for i, row in enumerate(rows):
+        row = {ALIASES.get(key.strip().lower(), key.strip().lower()): value for key, value in row.items() if key}
+        ramp = (row.get("ramp") or "linear").strip().lower()
+        if ramp not in RAMPS:
+            raise ValueError(f"Stage {i + 1}: unknown ramp '{ramp}'. Use one of: {', '.join(RAMPS)}")
+        duration = _number(row.get("duration_s"))
+        duration = DEFAULT_STAGE_S if duration is None else duration
+        if duration <= 0:
+            raise ValueError(f"Stage {i + 1}: duration_s must be positive")
+        ramp_s = _number(row.get("ramp_s"))
+        stages.append({
+            "duration_s": duration,
+            "ramp": ramp,
+            "ramp_s": min(DEFAULT_RAMP_S if ramp_s is None else ramp_s, duration),
+            "targets": {channel: _number(row.get(channel)) for channel in CHANNELS},
+        })
+    if not stages:
+        raise ValueError(f"No stages in {path}")
+    return stages
+
+
+def has_profile(path: str) -> bool:
+    # only tables that say how long each stage lasts describe a profile
+    with open(path, "r", newline="") as file:
+        header = next(csv.reader(file), [])
+    names = {ALIASES.get(name.strip().lower(), name.strip().lower()) for name in header}
+    return "duration_s" in names
+
+
+def compile_stages(stages: List[dict], rate_hz: float = DEFAULT_RATE_HZ) -> Dict[str, np.ndarray]:
+    starts = np.concatenate(([0.0], np.cumsum([stage["duration_s"] for stage in stages])))
+    total = starts[-1]
+    time = np.arange(int(np.floor(total * rate_hz + 1e-9)) + 1) / rate_hz
+    # stage of every sample; the final sample belongs to the last stage
+    index = np.minimum(np.searchsorted(starts, time, side="right") - 1, len(stages) - 1)
+    ramp_s = np.array([stage["ramp_s"] for stage in stages])
+    progress = np.clip((time - starts[index]) / np.maximum(ramp_s[index], 1e-12), 0.0, 1.0)
+    shaped = np.empty_like(progress)
+    ramps = np.array([stage["ramp"] for stage in stages])
+    for ramp in RAMPS:
+        mask = ramps[index] == ramp
+        if mask.any():
+            shaped[mask] = _SHAPES[ramp](progress[mask])
+
+    tables = {"time": time}
+    for channel in CHANNELS:
+        # blank targets hold the previous stage's value
+        targets = np.array([np.nan if stage["targets"][channel] is None else stage["targets"][channel]
+                            for stage in stages])
+        if np.all(np.isnan(targets)):
+            continue
+        filled = targets.copy()
+        first = int(np.argmax(~np.isnan(filled)))
+        filled[:first] = filled[first]
+        for i in range(first + 1, len(filled)):
+            if np.isnan(filled[i]):
+                filled[i] = filled[i - 1]
+        previous = np.concatenate(([filled[0]], filled[:-1]))
+        tables[channel] = previous[index] + (filled - previous)[index] * shaped
+    return tables
+
+
+def profile_hash(path: str, rate_hz: float) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        digest.update(file.read())
+    digest.update(json.dumps({"rate_hz": float(rate_hz), "version": COMPILER_VERSION}).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_tables(folder: str, tables: Dict[str, np.ndarray]) -> None:
+    time = tables["time"]
+    for channel in CHANNELS:
+        if channel not in tables:
+            continue
+        pairs = np.column_stack((time, tables[channel]))
+        np.savetxt(os.path.join(folder, f"{channel}_table.csv"), pairs, fmt="%.6g", delimiter=" ")
+        if channel in ANGLE_CHANNELS:
+            np.savetxt(os.path.join(folder, f"{channel} angle.csv"), pairs, fmt="%.6f", delimiter=",",
+                       header=f"Time - s,{channel.capitalize()} angle", comments="")
+
+
+def compile_profile(stage_path: str, cache_root: str = DEFAULT_CACHE, rate_hz: float = DEFAULT_RATE_HZ) -> Dict[str, dict]:
+    # channel -> {"table": Amesim table, "targets": target CSV or None}; compiled once per content hash
+    key = profile_hash(stage_path, rate_hz)
+    folder = os.path.join(os.path.abspath(cache_root), key[:16])
+    if not os.path.isdir(folder):
+        tables = compile_stages(read_stages(stage_path), rate_hz)
+        staging = f"{folder}.{uuid.uuid4().hex[:8]}.tmp"
+        os.makedirs(staging)
+        _write_tables(staging, tables)
+        try:
+            os.rename(staging, folder)
+        except OSError:
+            # compiled concurrently by another job; the contents are the same
+            shutil.rmtree(staging, ignore_errors=True)
+    return {
+        channel: {"table": os.path.join(folder, f"{channel}_table.csv"),
+                  "targets": os.path.join(folder, f"{channel} angle.csv") if channel in ANGLE_CHANNELS else None}
+        for channel in CHANNELS if os.path.exists(os.path.join(folder, f"{channel}_table.csv"))
+    }
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a stage table into time-series tables")
+    parser.add_argument("stages")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_HZ, help="samples per second")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="where compiled profiles are kept")
+    args = parser.parse_args()
+    print(json.dumps(compile_profile(args.stages, args.cache, args.rate), indent=2))
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,175 @@
+r"""
+Uniform-rate resampling of simulation outputs.
+
+Maps irregularly sampled series onto a fixed ``t0 + k*dt`` grid so consumers
+(Unity's CsvReader) can look a frame up by index instead of searching rows.
+The output grid is produced in chunks, so memory stays bounded no matter how
+long the source series are.
+"""
+
+import math
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+METHODS = ("linear", "cubic", "zoh")
+DEFAULT_CHUNK = 1 << 18
+HEADER_PREFIX = "#"
+
+Series = Tuple[Sequence[float], Sequence[float]]
+
+
+def uniform_grid(t_start: float, t_end: float, rate_hz: float) -> Tuple[float, float, int]:
+    if rate_hz <= 0:
+        raise ValueError(f"Resample rate must be positive, got {rate_hz}")
+    if t_end < t_start:
+        raise ValueError(f"Resample window is empty: [{t_start}, {t_end}]")
+    dt = 1.0 / rate_hz
+    # small tolerance so a window that is an exact multiple of dt keeps its last frame
+    n = int(math.floor((t_end - t_start) / dt + 1e-9)) + 1
+    return float(t_start), dt, n
+
+
+def _as_arrays(time: Sequence[float], values: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    t = np.asarray(time, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+    if t.ndim != 1 or t.shape != y.shape:
+        raise ValueError(f"Time and value arrays must be 1-D and the same length ({t.shape} vs {y.shape})")
+    if t.size == 0:
+        raise ValueError("Cannot resample an empty series")
+    return t, y
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(num)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def _slopes(t: np.ndarray, y: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # Catmull-Rom style slopes on a non-uniform grid, one-sided at both ends.
+    # Only evaluated at the indices a chunk touches, never over the whole series.
+    last = t.size - 1
+    lo = np.maximum(idx - 1, 0)
+    hi = np.minimum(idx + 1, last)
+    return _safe_div(y[hi] - y[lo], t[hi] - t[lo])
+
+
+def interpolate(t: np.ndarray, y: np.ndarray, t_out: np.ndarray, method: str = "linear") -> np.ndarray:
+    if method not in METHODS:
+        raise ValueError(f"Unknown resample method '{method}'. Use one of: {', '.join(METHODS)}")
+    if t.size == 1:
+        return np.full(t_out.shape, y[0])
+
+    # values outside the source span are held at the end points
+    t_q = np.clip(t_out, t[0], t[-1])
+    idx = np.searchsorted(t, t_q, side="right") - 1
+
+    if method == "zoh":
+        return y[np.clip(idx, 0, t.size - 1)]
+
+    idx = np.clip(idx, 0, t.size - 2)
+    t0, t1 = t[idx], t[idx + 1]
+    y0, y1 = y[idx], y[idx + 1]
+    h = t1 - t0
+    s = _safe_div(t_q - t0, h)
+
+    if method == "linear":
+        return y0 + s * (y1 - y0)
+
+    m0 = _slopes(t, y, idx)
+    m1 = _slopes(t, y, idx + 1)
+    s2 = s * s
+    s3 = s2 * s
+    h00 = 2 * s3 - 3 * s2 + 1
+    h10 = s3 - 2 * s2 + s
+    h01 = -2 * s3 + 3 * s2
+    h11 = s3 - s2
+    return h00 * y0 + h10 * h * m0 + h01 * y1 + h11 * h * m1
+
+
+def _common_window(series: Mapping[str, Tuple[np.ndarray, np.ndarray]]) -> Tuple[float, float]:
+    starts = [t[0] for t, _ in series.values()]
+    ends = [t[-1] for t, _ in series.values()]
+    return max(starts), min(ends)
+
+
+def iter_resampled(
+    series: Mapping[str, Series],
+    rate_hz: float,
+    method: str = "linear",
+    t0: Optional[float] = None,
+    t_end: Optional[float] = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    if not series:
+        raise ValueError("No series given to resample")
+    arrays = {name: _as_arrays(t, y) for name, (t, y) in series.items()}
+    win_start, win_end = _common_window(arrays)
+    start, dt, n = uniform_grid(
+        win_start if t0 is None else t0,
+        win_end if t_end is None else t_end,
+        rate_hz,
+    )
+    for first in range(0, n, chunk_size):
+        k = np.arange(first, min(first + chunk_size, n), dtype=np.float64)
+        # index * dt rather than a running sum, so long grids don't drift
+        t_out = start + k * dt
+        block = np.empty((t_out.size, len(arrays)))
+        for col, (t, y) in enumerate(arrays.values()):
+            block[:, col] = interpolate(t, y, t_out, method)
+        yield t_out, block
+
+
+def resample(
+    series: Mapping[str, Series],
+    rate_hz: float,
+    method: str = "linear",
+    t0: Optional[float] = None,
+    t_end: Optional[float] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    times: List[np.ndarray] = []
+    blocks: List[np.ndarray] = []
+    for t_out, block in iter_resampled(series, rate_hz, method, t0, t_end):
+        times.append(t_out)
+        blocks.append(block)
+    values = np.concatenate(blocks)
+    return np.concatenate(times), {name: values[:, i] for i, name in enumerate(series)}
+
+
+def format_grid_header(t0: float, dt: float, rate_hz: float, method: str) -> str:
+    return f"{HEADER_PREFIX} t0={t0!r},dt={dt!r},rate_hz={rate_hz!r},method={method}"
+
+
+def read_grid_header(path: str) -> Dict[str, str]:
+    with open(path, "r") as file:
+        first = file.readline().strip()
+    if not first.startswith(HEADER_PREFIX):
+        raise ValueError(f"'{path}' has no uniform grid header")
+    fields = {}
+    for item in first[len(HEADER_PREFIX):].split(","):
+        key, _, value = item.strip().partition("=")
+        fields[key] = value
+    return fields
+
+
+def write_uniform_csv(
+    path: str,
+    series: Mapping[str, Series],
+    rate_hz: float,
+    method: str = "linear",
+    time_label: str = "Time",
+    float_fmt: str = "%.6f",
+    t0: Optional[float] = None,
+    t_end: Optional[float] = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> int:
+    rows = 0
+    with open(path, "w", newline="") as file:
+        for t_out, block in iter_resampled(series, rate_hz, method, t0, t_end, chunk_size):
+            if rows == 0:
+                file.write(format_grid_header(float(t_out[0]), 1.0 / rate_hz, rate_hz, method) + "\n")
+                file.write(",".join([time_label] + list(series)) + "\n")
+            np.savetxt(file, np.column_stack((t_out, block)), fmt=float_fmt, delimiter=",")
+            rows += t_out.size
+    return rows
@@ -0,0 +1,147 @@
+r"""
+License-free reader for Amesim ``.results`` / ``.results.N`` files.
+
+The file is memory-mapped and any subset of variables comes back as NumPy
+arrays, so post-processing, caching and archival can run on workers that
+have no Amesim API session. Layout (little-endian), as read by Amesim's own
+``ameloadt`` helpers:
+
+    int32  n          number of saved variables; negative when only a
+                      subset of the model's variables is saved
+    int32  idx[|n|]   only when n < 0: 1-based model indices of those variables
+    float64 record[]  repeated (time, v_1 … v_|n|) rows until end of file
+
+A trailing partial record (a file still being written by a running solver)
+is ignored. Variable names are not stored in the file. They come from a
+``<results>.vars.json`` sidecar (a list of data paths, one per saved column),
+from an explicit ``names`` argument, or they default to column positions.
+The simulation service writes the sidecar next to the results file after
+every run.
+
+    python src/results_reader.py FILE VAR|COLUMN [VAR|COLUMN …]   → CSV on stdout
+
+A COLUMN is the 0-based position of a saved variable, for files without names.
+"""
+
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+HEADER_DTYPE = np.dtype("<i4")
+VALUE_DTYPE = np.dtype("<f8")
+NAMES_SUFFIX = ".vars.json"
+
+
+def results_path(circuit_dir: str, circuit_name: str, dataset: Optional[str] = None) -> str:
+    name = f"{circuit_name}_.results"
+    if dataset and dataset != "ref":
+        name += f".{dataset}"
+    return os.path.join(circuit_dir, name)
+
+
+class ResultsFile:
+    def __init__(self, path: str, names: Optional[Sequence[str]] = None):
+        self.path = path
+        with open(path, "rb") as file:
+            head = np.frombuffer(file.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)
+            if head.size != 1:
+                raise ValueError(f"'{path}' is too short to be a results file")
+            declared = int(head[0])
+            count = abs(declared)
+            if declared < 0:
+                self.model_indices = np.frombuffer(file.read(count * HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE).copy()
+                if self.model_indices.size != count:
+                    raise ValueError(f"'{path}' has a truncated variable index list")
+            else:
+                self.model_indices = np.arange(1, count + 1, dtype=HEADER_DTYPE)
+            self.offset = file.tell()
+        self.columns = count + 1
+        self.names = list(names) if names is not None else self._sidecar_names()
+        if self.names is not None and len(self.names) != count:
+            raise ValueError(f"'{path}' saves {count} variables but {len(self.names)} names were given")
+        self._positions = {name: i + 1 for i, name in enumerate(self.names or [])}
+
+    def _sidecar_names(self) -> Optional[List[str]]:
+        try:
+            with open(self.path + NAMES_SUFFIX, "r") as file:
+                return list(json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def records(self) -> np.ndarray:
+        # re-stat every call so a file that is still growing shows its new rows
+        size = os.path.getsize(self.path) - self.offset
+        rows = max(size, 0) // (self.columns * VALUE_DTYPE.itemsize)
+        if rows == 0:
+            return np.empty((0, self.columns), dtype=VALUE_DTYPE)
+        return np.memmap(self.path, dtype=VALUE_DTYPE, mode="r", offset=self.offset, shape=(rows, self.columns))
+
+    def _column(self, variable) -> int:
+        if isinstance(variable, (int, np.integer)):
+            if not 0 <= variable < self.columns - 1:
+                raise ValueError(f"Variable position {variable} is out of range")
+            return int(variable) + 1
+        if self.names is None:
+            raise ValueError(f"'{self.path}' has no {NAMES_SUFFIX} sidecar; use a column position instead of {variable}")
+        if variable not in self._positions:
+            raise ValueError(f"Invalid variable: {variable}")
+        return self._positions[variable]
+
+    def read(self, variables: Sequence, start_time: Optional[float] = None) -> Tuple[np.ndarray, Dict]:
+        data = self.records()
+        first = 0
+        if start_time is not None and data.shape[0]:
+            # only the time column is touched to find where the tail starts
+            first = int(np.searchsorted(data[:, 0], start_time, side="right"))
+        block = data[first:]
+        columns = [self._column(variable) for variable in variables]
+        return np.array(block[:, 0]), {variable: np.array(block[:, col]) for variable, col in zip(variables, columns)}
+
+
+def load_results(path: str, variables: Sequence, names: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, Dict]:
+    return ResultsFile(path, names).read(variables)
+
+
+def write_results(
+    path: str,
+    time: Sequence[float],
+    columns: Dict[str, Sequence[float]],
+    model_indices: Optional[Sequence[int]] = None,
+) -> None:
+    """Synthetic writer producing the same layout, for tests and fixtures."""
+    t = np.asarray(time, dtype=VALUE_DTYPE)
+    block = np.column_stack([t] + [np.asarray(v, dtype=VALUE_DTYPE) for v in columns.values()])
+    with open(path, "wb") as file:
+        if model_indices is None:
+            file.write(np.array([len(columns)], dtype=HEADER_DTYPE).tobytes())
+        else:
+            if len(model_indices) != len(columns):
+                raise ValueError("model_indices needs one entry per column")
+            file.write(np.array([-len(columns)], dtype=HEADER_DTYPE).tobytes())
+            file.write(np.asarray(model_indices, dtype=HEADER_DTYPE).tobytes())
+        file.write(block.astype(VALUE_DTYPE).tobytes())
+    write_names(path, list(columns))
+
+
+def write_names(path: str, names: Sequence[str]) -> None:
+    # the sidecar ResultsFile reads names from, one data path per saved column
+    with open(path + NAMES_SUFFIX, "w") as file:
+        json.dump(list(names), file)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python results_reader.py FILE VAR|COLUMN [VAR|COLUMN ...]", file=sys.stderr)
+        sys.exit(2)
+    results = ResultsFile(sys.argv[1])
+    # a bare number is a column position unless the sidecar has a variable of that name
+    variables = [int(arg) if arg.isdigit() and arg not in (results.names or ()) else arg for arg in sys.argv[2:]]
+    time_values, values = results.read(variables)
+    np.savetxt(
+        sys.stdout,
+        np.column_stack([time_values] + [values[variable] for variable in variables]),
+        fmt="%.6f", delimiter=",", header=",".join(["time"] + sys.argv[2:]), comments="",
+    )
@@ -0,0 +1,317 @@
+r"""
+Indexed catalog of archived simulation runs (SQLite).
+
+Every run is recorded with the hash of its resolved config, its parameters,
+run settings, timings and the archived copies of its output files. The
+parameter table is indexed on (name, value), so range queries such as
+"veGxbinit@aero_fd_6dof_body in [4, 6]" stay fast with many runs. A completed
+run whose config hash matches a new request can be served from the archive
+instead of being simulated again. Solver statistics parsed from the run's
+STDSIM log are stored with it, and ``solver_summary()`` compares them per
+model. A run stopped early by its termination rules keeps the reason.
+Detected events go to an ``events`` table indexed on (event, kind, time),
+so ``events()`` finds e.g. every stall in a sweep without opening its files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY,
+    config_hash   TEXT NOT NULL,
+    name          TEXT,
+    model_file    TEXT,
+    start_time_s  REAL,
+    end_time_s    REAL,
+    interval_s    REAL,
+    status        TEXT NOT NULL,
+    created_at    REAL NOT NULL,
+    duration_s    REAL,
+    timings       TEXT,
+    config        TEXT,
+    archive_dir   TEXT,
+    solver        TEXT,
+    termination   TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_config_hash ON runs (config_hash, status);
+CREATE TABLE IF NOT EXISTS params (
+    run_id  INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name    TEXT NOT NULL,
+    value   REAL,
+    text    TEXT
+);
+CREATE INDEX IF NOT EXISTS params_name_value ON params (name, value, run_id);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id  INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    kind    TEXT NOT NULL,
+    path    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts (run_id);
+CREATE TABLE IF NOT EXISTS events (
+    run_id    INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    event     TEXT NOT NULL,
+    variable  TEXT,
+    kind      TEXT,
+    time      REAL,
+    value     REAL
+);
+CREATE INDEX IF NOT EXISTS events_event_time ON events (event, kind, time, run_id);
+"""
+
+# columns added after the first release, created on open for older databases
+MIGRATIONS = (("runs", "solver", "TEXT"), ("runs", "termination", "TEXT"))
+
+# resample and plane_path shape the artifacts written (rate, method, max_error_m), so they count too
+RUN_KEYS = ("start_time_s", "end_time_s", "interval_s", "outputs", "resample", "plane_path", "terminate", "events")
+
+# written only when a termination rule fired, so a cached run may lack it
+OPTIONAL_ARTIFACTS = ("termination.json",)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _table_digests(time_series_data: dict, config_dir: str) -> Dict[str, Optional[str]]:
+    tables = {}
+    for table_name, table_info in time_series_data.items():
+        data_file = os.path.join(config_dir, table_info.get("file", table_info.get("stages", "")))
+        tables[table_name] = _file_digest(data_file) if os.path.isfile(data_file) else None
+        if "stages" in table_info and tables[table_name]:
+            # a compiled stage table also depends on the channel and rate it is compiled for
+            settings = {key: table_info[key] for key in ("channel", "rate_hz") if key in table_info}
+            tables[table_name] += json.dumps(settings, sort_keys=True)
+    return tables
+
+
+def config_hash(run: dict, config_dir: str) -> str:
+    # Hash of everything that changes the results: model and table *contents*,
+    # parameter values and run settings. Run names and output flags don't count.
+    resolved = {key: run[key] for key in RUN_KEYS if key in run}
+    resolved["model"] = _file_digest(os.path.join(config_dir, run["model_file"]))
+    resolved["parameters"] = {name: str(value) for name, value in run["parameters"].items()}
+    resolved["time_series_data"] = _table_digests(run.get("time_series_data", {}), config_dir)
+    if "segments" in run:
+        resolved["warm_start"] = run.get("warm_start")
+        resolved["segments"] = [
+            {
+                "end_time_s": segment.get("end_time_s"),
+                "parameters": {name: str(value) for name, value in segment.get("parameters", {}).items()},
+                "time_series_data": _table_digests(segment.get("time_series_data", {}), config_dir),
+            }
+            for segment in run["segments"]
+        ]
+    canonical = json.dumps(resolved, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def artifact_names(run: dict) -> List[str]:
+    # Files a completed run publishes. They depend on output settings the config
+    # hash leaves out, so a cached run only serves a request whose files it has.
+    names = []
+    if run.get("generate_output_files"):
+        names.append("data.csv")
+        names += [f"{name}.pdf" for name in run["outputs"]]
+    if "resample" in run:
+        names.append("resampled.csv")
+    if "plane_path" in run:
+        names.append("PlanePath.csv")
+    if "streaming" in run:
+        names.append("stream.csv")
+    if "events" in run:
+        names.append("events.csv")
+    if "terminate" in run:
+        names.append("termination.json")
+    return names
+
+
+def _as_number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RunCatalog:
+    def __init__(self, db_path: str, archive_root: str = None):
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self.archive_root = archive_root or db_dir
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        for table, column, kind in MIGRATIONS:
+            columns = {row["name"] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                with self.connection:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    def record_run(
+        self,
+        run: dict,
+        config_hash: str,
+        status: str,
+        timings: Dict[str, float],
+        artifacts: Iterable[str] = (),
+        solver: Optional[dict] = None,
+        termination: Optional[dict] = None,
+        events: Iterable[tuple] = (),
+    ) -> int:
+        archive_dir = os.path.join(self.archive_root, config_hash)
+        archived = self._archive(archive_dir, artifacts)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (config_hash, name, model_file, start_time_s, end_time_s, interval_s,"
+                " status, created_at, duration_s, timings, config, archive_dir, solver, termination)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    config_hash, run.get("name"), run.get("model_file"),
+                    _as_number(run.get("start_time_s")), _as_number(run.get("end_time_s")),
+                    _as_number(run.get("interval_s")), status, time.time(),
+                    sum(timings.values()), json.dumps(timings), json.dumps(run, sort_keys=True),
+                    archive_dir if archived else None,
+                    json.dumps(solver) if solver else None,
+                    json.dumps(termination) if termination else None,
+                ),
+            )
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO params (run_id, name, value, text) VALUES (?, ?, ?, ?)",
+                [(run_id, name, _as_number(value), str(value)) for name, value in run.get("parameters", {}).items()],
+            )
+            self.connection.executemany(
+                "INSERT INTO artifacts (run_id, kind, path) VALUES (?, ?, ?)",
+                [(run_id, os.path.basename(path), path) for path in archived],
+            )
+            # (event, variable, kind, time, value) rows from events.detect
+            self.connection.executemany(
+                "INSERT INTO events (run_id, event, variable, kind, time, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in events],
+            )
+        return run_id
+
+    def _archive(self, archive_dir: str, artifacts: Iterable[str]) -> List[str]:
+        archived = []
+        for path in artifacts:
+            if not os.path.isfile(path):
+                continue
+            os.makedirs(archive_dir, exist_ok=True)
+            target = os.path.join(archive_dir, os.path.basename(path))
+            shutil.copy2(path, target)
+            archived.append(target)
+        return archived
+
+    def find_cached(self, config_hash: str, expected: Iterable[str] = ()) -> Optional[sqlite3.Row]:
+        # latest completed run for this config whose archived files are all still on disk
+        # and include every file named in expected (see artifact_names)
+        expected = set(expected) - set(OPTIONAL_ARTIFACTS)
+        rows = self.connection.execute(
+            "SELECT * FROM runs WHERE config_hash = ? AND status = 'completed' ORDER BY id DESC",
+            (config_hash,),
+        ).fetchall()
+        for row in rows:
+            paths = self.artifacts(row["id"])
+            if (paths and all(os.path.isfile(path) for path in paths)
+                    and expected <= {os.path.basename(path) for path in paths}):
+                return row
+        return None
+
+    def artifacts(self, run_id: int) -> List[str]:
+        rows = self.connection.execute("SELECT path FROM artifacts WHERE run_id = ?", (run_id,))
+        return [row["path"] for row in rows]
+
+    def restore_artifacts(self, run_id: int, output_dir: str) -> List[str]:
+        os.makedirs(output_dir, exist_ok=True)
+        restored = []
+        for path in self.artifacts(run_id):
+            target = os.path.join(output_dir, os.path.basename(path))
+            shutil.copy2(path, target)
+            restored.append(target)
+        return restored
+
+    def query(
+        self,
+        param_ranges: Dict[str, Tuple[float, float]] = None,
+        status: str = "completed",
+        limit: int = 100,
+    ) -> List[sqlite3.Row]:
+        # one indexed range scan per parameter, intersected on run id
+        clauses, args = [], []
+        for name, (low, high) in (param_ranges or {}).items():
+            clauses.append("SELECT run_id FROM params WHERE name = ? AND value BETWEEN ? AND ?")
+            args += [name, low, high]
+        sql = "SELECT * FROM runs WHERE status = ?"
+        args = [status] + args
+        if clauses:
+            sql += " AND id IN (" + " INTERSECT ".join(clauses) + ")"
+        sql += " ORDER BY id DESC LIMIT ?"
+        return self.connection.execute(sql, args + [limit]).fetchall()
+
+    def parameters(self, run_id: int) -> Dict[str, str]:
+        rows = self.connection.execute("SELECT name, text FROM params WHERE run_id = ?", (run_id,))
+        return {row["name"]: row["text"] for row in rows}
+
+    def events(
+        self,
+        event: str,
+        kind: str = None,
+        time_range: Tuple[float, float] = None,
+        limit: int = 1000,
+    ) -> List[sqlite3.Row]:
+        # e.g. every run that stalled in its first 5 s, across a whole sweep
+        sql = ("SELECT events.*, runs.name AS run_name, runs.config_hash FROM events"
+               " JOIN runs ON runs.id = events.run_id WHERE event = ?")
+        args = [event]
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        if time_range is not None:
+            sql += " AND time BETWEEN ? AND ?"
+            args += list(time_range)
+        sql += " ORDER BY time LIMIT ?"
+        return self.connection.execute(sql, args + [limit]).fetchall()
+
+    def solver_summary(self, limit: int = 1000) -> Dict[str, dict]:
+        # per model over the latest runs: which solver settings cost the most
+        rows = self.connection.execute(
+            "SELECT model_file, status, solver FROM runs WHERE solver IS NOT NULL ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        totals: Dict[str, dict] = {}
+        for row in rows:
+            solver = json.loads(row["solver"])
+            entry = totals.setdefault(row["model_file"] or "?", {"runs": 0, "failed": 0, "warnings": 0, "sums": {}, "counts": {}})
+            entry["runs"] += 1
+            entry["failed"] += row["status"] == "failed"
+            entry["warnings"] += solver.get("warnings", 0)
+            for key in ("cpu_s", "integration_steps", "discontinuities", "jacobian_evaluations"):
+                if solver.get(key) is not None:
+                    entry["sums"][key] = entry["sums"].get(key, 0) + solver[key]
+                    entry["counts"][key] = entry["counts"].get(key, 0) + 1
+        return {
+            model: {
+                "runs": entry["runs"],
+                "failed": entry["failed"],
+                "warnings": entry["warnings"],
+                **{f"mean_{key}": entry["sums"][key] / entry["counts"][key] for key in entry["sums"]},
+            }
+            for model, entry in totals.items()
+        }
+
+    def close(self) -> None:
+        self.connection.close()
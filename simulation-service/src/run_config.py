@@ -0,0 +1,40 @@
+r"""
+Resolution of a config file into concrete runs.
+
+A config without ``"runs"`` is a single run. Otherwise every entry in
+``"runs"``, and every run a sweep, sensitivity study or optimization
+generates, inherits the top-level settings and overrides what it names.
+``parameters`` and ``time_series_data`` are merged key by key. The simulation
+service and ``sweep.py`` both resolve runs here, so a run gets the same
+catalog hash whichever of them resolved it.
+"""
+
+import os
+from typing import Iterable, Iterator
+
+from events import parse_specs as parse_event_specs
+
+# blocks that generate runs rather than settings the runs inherit
+RUN_BLOCKS = ("runs", "sweep", "sensitivity", "optimize")
+REQUIRED_KEYS = ("start_time_s", "end_time_s", "interval_s", "parameters", "outputs", "generate_output_files")
+
+
+def iter_runs(data: dict, overrides: Iterable[dict]) -> Iterator[dict]:
+    shared = {key: value for key, value in data.items() if key not in RUN_BLOCKS}
+    named = any(key in data for key in RUN_BLOCKS)
+    for i, override in enumerate(overrides):
+        run = {**shared, **override}
+        for merged_key in ("parameters", "time_series_data"):
+            run[merged_key] = {**shared.get(merged_key, {}), **override.get(merged_key, {})}
+        if named:
+            run["name"] = str(override.get("name", f"run_{i + 1:03d}"))
+            if os.path.basename(run["name"]) != run["name"]:
+                raise RuntimeError(f"Error: run name '{run['name']}' cannot contain a path")
+        for key in REQUIRED_KEYS:
+            if key not in run:
+                where = f" (run '{run['name']}')" if "name" in run else ""
+                raise RuntimeError(f"Error: '{key}' is missing in the JSON config file{where}")
+        if "events" in run:
+            # checked before the run rather than after it has been simulated
+            run["events"] = parse_event_specs(run["events"])
+        yield run
@@ -0,0 +1,119 @@
+r"""
+Runtime predictor for simulation jobs, fitted from past run timings.
+
+A config is reduced to a handful of cost features (solver samples, samples ×
+outputs, PDF pages, run count) and a ridge regression on those features maps
+it to wall-clock seconds. Every finished job is appended to a JSON-lines
+history together with the prediction made before it ran, so the predictor's
+accuracy is measured on jobs it had not yet seen.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from optimize import DEFAULT_MAX_EVALUATIONS
+from sensitivity import run_count as sensitivity_run_count
+from sweep import design_size
+
+FEATURES = ("samples", "sample_outputs", "pdf_outputs", "runs")
+MIN_FIT_SAMPLES = len(FEATURES) + 3
+RIDGE = 1e-6
+DEFAULT_ESTIMATE_S = 60.0
+
+
+def config_features(config: dict) -> Dict[str, float]:
+    # mirrors SimulationService._resolve_runs: each run inherits the top-level settings
+    runs = config.get("runs") or [{}]
+    features = dict.fromkeys(FEATURES, 0.0)
+    for run in runs:
+        merged = {**config, **run}
+        try:
+            duration = float(merged["end_time_s"]) - float(merged["start_time_s"])
+            samples = max(duration, 0.0) / float(merged["interval_s"])
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            samples = 0.0
+        outputs = len(merged.get("outputs", []))
+        features["samples"] += samples
+        features["sample_outputs"] += samples * outputs
+        features["pdf_outputs"] += outputs if merged.get("generate_output_files") else 0
+        features["runs"] += 1
+    if "sweep" in config:
+        # every run of a sweep has the shape of the template
+        size = design_size(config)
+        features = {name: value * size for name, value in features.items()}
+    elif "sensitivity" in config:
+        # a base run plus one or two perturbed runs per parameter
+        size = sensitivity_run_count(config["sensitivity"])
+        features = {name: value * size for name, value in features.items()}
+    elif "optimize" in config:
+        # the search may stop early, so this is its upper bound
+        size = int(config["optimize"].get("max_evaluations", DEFAULT_MAX_EVALUATIONS))
+        features = {name: value * size for name, value in features.items()}
+    return features
+
+
+def _row(features: Dict[str, float]) -> np.ndarray:
+    return np.array([1.0] + [float(features.get(name, 0.0)) for name in FEATURES])
+
+
+class RuntimePredictor:
+    def __init__(self, history_path: Optional[str] = None):
+        self.history_path = history_path
+        self.history: List[dict] = []
+        self.coefficients = None
+        # scheduler workers report finished jobs concurrently
+        self._lock = threading.Lock()
+        if history_path and os.path.exists(history_path):
+            with open(history_path, "r") as file:
+                self.history = [json.loads(line) for line in file if line.strip()]
+        self.fit()
+
+    def fit(self) -> None:
+        if len(self.history) < MIN_FIT_SAMPLES:
+            self.coefficients = None
+            return
+        x = np.array([_row(record["features"]) for record in self.history])
+        y = np.array([record["seconds"] for record in self.history])
+        # column scaling keeps the ridge term meaningful when features differ by orders of magnitude
+        scale = np.abs(x).max(axis=0)
+        scale[scale == 0] = 1.0
+        xs = x / scale
+        coefficients = np.linalg.solve(xs.T @ xs + RIDGE * len(y) * np.eye(xs.shape[1]), xs.T @ y)
+        self.coefficients = coefficients / scale
+
+    def predict(self, features: Dict[str, float]) -> float:
+        if self.coefficients is not None:
+            return max(float(_row(features) @ self.coefficients), 0.0)
+        if self.history:
+            # too little data for a fit: scale by the typical seconds per sample
+            rates = [r["seconds"] / r["features"]["samples"] for r in self.history if r["features"].get("samples")]
+            if rates and features.get("samples"):
+                return float(np.median(rates)) * features["samples"]
+            return float(np.median([r["seconds"] for r in self.history]))
+        return DEFAULT_ESTIMATE_S
+
+    def observe(self, features: Dict[str, float], seconds: float, predicted: Optional[float] = None, name: str = None) -> None:
+        record = {"name": name, "features": features, "seconds": seconds, "predicted": predicted}
+        with self._lock:
+            self.history.append(record)
+            if self.history_path:
+                with open(self.history_path, "a") as file:
+                    file.write(json.dumps(record) + "\n")
+            self.fit()
+
+    def summary(self) -> dict:
+        scored = [(r["predicted"], r["seconds"]) for r in self.history if r.get("predicted") is not None]
+        errors = np.array([abs(p - s) for p, s in scored])
+        relative = np.array([abs(p - s) / s for p, s in scored if s > 0])
+        return {
+            "observations": len(self.history),
+            "fitted": self.coefficients is not None,
+            "coefficients": None if self.coefficients is None else dict(zip(("intercept",) + FEATURES, self.coefficients.tolist())),
+            "scored": len(scored),
+            "mae_s": float(errors.mean()) if errors.size else None,
+            "mape": float(relative.mean()) if relative.size else None,
+        }
@@ -0,0 +1,367 @@
+r"""
+License-aware job scheduler for simulation runs.
+
+Every Amesim session holds a license for as long as it runs, so at most
+``capacity`` jobs may execute at once. Jobs wait in a queue ordered by
+priority class (interactive UI requests before background sweeps). Within a
+class, the submitter with the least license time used so far goes next, so
+one large sweep cannot starve everyone else. Each job records when it was
+submitted, started and finished, and ``metrics()`` reports queue waits per
+class.
+
+With the "sjf" policy, a submitter's own jobs run shortest predicted runtime
+first (aged by their wait so long jobs still get through). A job with a
+deadline whose latest start time is near jumps ahead of the whole class,
+earliest latest-start first.
+
+``LicensePool`` is an in-process counting budget. ``SimulatedLicensePool``
+adds an optional checkout failure rate and records peak usage, so the
+scheduler can be exercised without Amesim:
+
+    python src/scheduler.py [JOBS] [LICENSES]   → simulated burst + metrics
+"""
+
+import itertools
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+PRIORITIES = {"interactive": 0, "normal": 5, "background": 10}
+POLICIES = ("fifo", "sjf")
+LICENSE_RETRY_S = 2.0
+AGING = 0.5             # SJF: each second waited counts as this many seconds shorter
+DEADLINE_SLACK_S = 5.0  # a deadline job is urgent once its latest start is this close
+
+
+class LicenseUnavailable(RuntimeError):
+    """Raised by a pool (or by a job) when a license checkout is refused."""
+
+
+class LicensePool:
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"License capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.in_use = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_use < self.capacity, timeout):
+                return False
+            self._checkout()
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            return True
+
+    def _checkout(self) -> None:
+        pass
+
+    def release(self) -> None:
+        with self._condition:
+            if self.in_use == 0:
+                raise RuntimeError("License released more often than acquired")
+            self.in_use -= 1
+            self._condition.notify()
+
+
+class SimulatedLicensePool(LicensePool):
+    """Pool that refuses a fraction of checkouts, like a busy license server."""
+
+    def __init__(self, capacity: int, failure_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(capacity)
+        self.failure_rate = failure_rate
+        self.checkouts = 0
+        self.refusals = 0
+        self._random = random.Random(seed)
+
+    def _checkout(self) -> None:
+        self.checkouts += 1
+        if self._random.random() < self.failure_rate:
+            self.refusals += 1
+            raise LicenseUnavailable("simulated license checkout refused")
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        fn: Callable[[], object],
+        name: str,
+        priority: int,
+        submitter: str,
+        estimate_s: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+    ):
+        self.id = next(Job._ids)
+        self.fn = fn
+        self.name = name
+        self.priority = priority
+        self.submitter = submitter
+        self.estimate_s = estimate_s
+        self.status = "queued"
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        # deadline_s is relative to submission
+        self.deadline = None if deadline_s is None else self.submitted_at + deadline_s
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def wait_s(self) -> Optional[float]:
+        return None if self.started_at is None else self.started_at - self.submitted_at
+
+    @property
+    def run_s(self) -> Optional[float]:
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    @property
+    def met_deadline(self) -> Optional[bool]:
+        return None if self.deadline is None or self.finished_at is None else self.finished_at <= self.deadline
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+
+def priority_value(priority) -> int:
+    if isinstance(priority, str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+        return PRIORITIES[priority]
+    return int(priority)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class JobScheduler:
+    def __init__(self, pool: LicensePool, retry_s: float = LICENSE_RETRY_S, max_attempts: int = 5, policy: str = "fifo"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy '{policy}'. Use one of: {', '.join(POLICIES)}")
+        self.pool = pool
+        self.policy = policy
+        self.retry_s = retry_s
+        self.max_attempts = max_attempts
+        # priority -> submitter -> queued jobs
+        self._queues: Dict[int, Dict[str, deque]] = {}
+        # license seconds consumed per submitter, for fair share
+        self.usage: Dict[str, float] = {}
+        self.jobs: List[Job] = []
+        self._lock = threading.Condition()
+        self._closed = False
+        self._running = 0
+        # one worker per license; a worker only picks a job once it holds a license
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(pool.capacity)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        fn: Callable[[], object],
+        name: str = None,
+        priority="interactive",
+        submitter: str = "default",
+        estimate_s: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+    ) -> Job:
+        job = Job(fn, name or getattr(fn, "__name__", "job"), priority_value(priority), submitter, estimate_s, deadline_s)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._enqueue(job)
+            self.jobs.append(job)
+            self.usage.setdefault(submitter, 0.0)
+            self._lock.notify()
+        return job
+
+    def _enqueue(self, job: Job, front: bool = False) -> None:
+        queue = self._queues.setdefault(job.priority, {}).setdefault(job.submitter, deque())
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+
+    def _shortest(self, queue: deque, now: float) -> Job:
+        if self.policy == "fifo":
+            return queue[0]
+        # jobs without an estimate sort by wait alone
+        return min(queue, key=lambda job: (job.estimate_s or 0.0) - AGING * (now - job.submitted_at))
+
+    def _next_job(self) -> Optional[Job]:
+        # highest class first; inside it any deadline job about to miss its
+        # latest start, else the submitter with the least usage (ties broken
+        # by whose next job has waited longest)
+        now = time.perf_counter()
+        for priority in sorted(self._queues):
+            by_submitter = self._queues[priority]
+            urgent = [
+                (job.deadline - (job.estimate_s or 0.0), job.id, job)
+                for queue in by_submitter.values() for job in queue
+                if job.deadline is not None and job.deadline - (job.estimate_s or 0.0) - now <= DEADLINE_SLACK_S
+            ]
+            if urgent:
+                job = min(urgent)[2]
+            else:
+                heads = {s: self._shortest(q, now) for s, q in by_submitter.items() if q}
+                if not heads:
+                    continue
+                submitter = min(heads, key=lambda s: (self.usage[s], heads[s].submitted_at))
+                job = heads[submitter]
+            by_submitter[job.submitter].remove(job)
+            return job
+        return None
+
+    def _has_work(self) -> bool:
+        return any(q for by_submitter in self._queues.values() for q in by_submitter.values())
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._closed or self._has_work())
+                if not self._has_work():
+                    return
+            try:
+                if not self.pool.acquire(timeout=self.retry_s):
+                    continue
+            except LicenseUnavailable:
+                time.sleep(self.retry_s)
+                continue
+            with self._lock:
+                job = self._next_job()
+                if job is not None:
+                    self._running += 1
+            if job is None:
+                self.pool.release()
+                continue
+            try:
+                self._run(job)
+            finally:
+                self.pool.release()
+                with self._lock:
+                    self._running -= 1
+                    self._lock.notify_all()
+
+    def _run(self, job: Job) -> None:
+        job.attempts += 1
+        job.status = "running"
+        job.started_at = job.started_at or time.perf_counter()
+        started = time.perf_counter()
+        try:
+            job.result = job.fn()
+            job.status = "completed"
+        except LicenseUnavailable as e:
+            # the real license server said no: put the job back at the head of its line
+            if job.attempts < self.max_attempts:
+                print(f"[SCHED] {job.name}: license refused, retrying ({job.attempts}/{self.max_attempts})")
+                job.status = "queued"
+                with self._lock:
+                    self.usage[job.submitter] += time.perf_counter() - started
+                    self._enqueue(job, front=True)
+                time.sleep(self.retry_s)
+                return
+            job.status, job.error = "failed", e
+        except Exception as e:
+            job.status, job.error = "failed", e
+            traceback.print_exc()
+        job.finished_at = time.perf_counter()
+        with self._lock:
+            self.usage[job.submitter] += job.finished_at - started
+        job._done.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(q) for by_submitter in self._queues.values() for q in by_submitter.values()) + self._running
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._has_work() and self._running == 0, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._closed = True
+            if not wait:
+                self._queues.clear()
+            self._lock.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            jobs = list(self.jobs)
+            usage = dict(self.usage)
+            running = self._running
+        now = time.perf_counter()
+        by_class = {}
+        for priority in sorted({job.priority for job in jobs}):
+            waits = [job.wait_s for job in jobs if job.priority == priority and job.wait_s is not None]
+            queued = [now - job.submitted_at for job in jobs if job.priority == priority and job.status == "queued"]
+            by_class[str(priority)] = {
+                "jobs": sum(job.priority == priority for job in jobs),
+                "queued": len(queued),
+                "oldest_queued_s": max(queued, default=None),
+                "wait_p50_s": _percentile(waits, 0.5),
+                "wait_p95_s": _percentile(waits, 0.95),
+                "wait_max_s": max(waits, default=None),
+            }
+        statuses = [job.status for job in jobs]
+        finished = [job for job in jobs if job.finished_at is not None]
+        latencies = [job.finished_at - job.submitted_at for job in finished]
+        deadlines = [job.met_deadline for job in finished if job.met_deadline is not None]
+        return {
+            "policy": self.policy,
+            "licenses": self.pool.capacity,
+            "licenses_in_use": self.pool.in_use,
+            "licenses_peak": self.pool.peak,
+            "running": running,
+            "queued": statuses.count("queued"),
+            "completed": statuses.count("completed"),
+            "failed": statuses.count("failed"),
+            "mean_latency_s": sum(latencies) / len(latencies) if latencies else None,
+            "deadlines_met": sum(deadlines),
+            "deadlines_missed": len(deadlines) - sum(deadlines),
+            "priorities": by_class,
+            "usage_s": usage,
+        }
+
+
+def simulate(jobs: int = 40, licenses: int = 3, failure_rate: float = 0.1, seed: int = 0, policy: str = "fifo") -> dict:
+    rng = random.Random(seed)
+    pool = SimulatedLicensePool(licenses, failure_rate, seed)
+    scheduler = JobScheduler(pool, retry_s=0.01, policy=policy)
+    for i in range(jobs):
+        # heavy-tailed job costs, estimated to within ±30 %
+        duration = rng.choice((0.005, 0.01, 0.02, 0.2))
+        interactive = rng.random() < 0.25
+        scheduler.submit(
+            lambda d=duration: time.sleep(d),
+            name=f"job_{i:03d}",
+            priority="interactive" if interactive else "background",
+            submitter="ui" if interactive else f"sweep_{i % 3}",
+            estimate_s=duration * rng.uniform(0.7, 1.3),
+        )
+    scheduler.join()
+    scheduler.shutdown()
+    metrics = scheduler.metrics()
+    metrics["checkouts"], metrics["refusals"] = pool.checkouts, pool.refusals
+    return metrics
+
+
+if __name__ == "__main__":
+    import json
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    licenses = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    for policy in POLICIES:
+        print(policy, json.dumps(simulate(jobs, licenses, policy=policy), indent=2))
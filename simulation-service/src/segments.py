@@ -0,0 +1,167 @@
+r"""
+Warm-started mission segments: a long run split into legs that chain their state.
+
+A run with ``"segments"`` is simulated leg by leg. Each leg starts where the
+previous one ended: the final body state (position, velocity, attitude,
+angular rates) is read from the solver and written into the 6-DOF body's
+``*init`` parameters before the next leg starts. A leg's cache key chains the
+key of the leg before it with the leg's own settings. An unchanged prefix of
+legs is therefore replayed from the segment cache (final state plus
+trajectory), and only the legs from the first edit onward are simulated.
+
+    "segments": [
+        {"end_time_s": 1200},
+        {"end_time_s": 2400, "parameters": {"throttle@engine": 0.8}},
+        {"end_time_s": 3600, "time_series_data": {...}}
+    ],
+    "warm_start": {"veGxbinit@aero_fd_6dof_body": "veGb_1@aero_fd_6dof_body"}
+
+Every leg inherits the run's settings. A leg's own ``parameters`` win over
+the carried state, so a leg can still reset e.g. its altitude. ``warm_start``
+adds to or replaces entries of the default state map, and a variable of
+``null`` drops that entry.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from run_catalog import config_hash
+
+BODY = "aero_fd_6dof_body"
+# *init parameter of the 6-DOF body -> solver variable holding that state at the end of a leg
+DEFAULT_STATE_MAP = {
+    f"latitudeinit@{BODY}": f"latitude@{BODY}",
+    f"longitudeinit@{BODY}": f"longitude@{BODY}",
+    f"altitudeinit@{BODY}": f"altitude@{BODY}",
+    f"rollinit@{BODY}": f"eulerangles_1@{BODY}",
+    f"pitchinit@{BODY}": f"eulerangles_2@{BODY}",
+    f"yawinit@{BODY}": f"eulerangles_3@{BODY}",
+    f"veGxbinit@{BODY}": f"veGb_1@{BODY}",
+    f"veGybinit@{BODY}": f"veGb_2@{BODY}",
+    f"veGzbinit@{BODY}": f"veGb_3@{BODY}",
+    f"angrateXbinit@{BODY}": f"angrateb_1@{BODY}",
+    f"angrateYbinit@{BODY}": f"angrateb_2@{BODY}",
+    f"angrateZbinit@{BODY}": f"angrateb_3@{BODY}",
+}
+
+Trajectory = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+
+def state_map(run: dict) -> Dict[str, str]:
+    overrides = run.get("warm_start") or {}
+    merged = {**DEFAULT_STATE_MAP, **overrides}
+    return {param: variable for param, variable in merged.items() if variable}
+
+
+def resolve_segments(run: dict) -> List[dict]:
+    # Same inheritance as SimulationService._resolve_runs, one level down: every
+    # leg is a complete run covering [previous end, its own end_time_s]
+    if "streaming" in run:
+        raise RuntimeError("Error: a run cannot both stream and use segments")
+    if "terminate" in run:
+        raise RuntimeError("Error: a run cannot both use segments and 'terminate' rules")
+    overrides = run["segments"]
+    if not isinstance(overrides, list) or not overrides:
+        raise RuntimeError("Error: 'segments' must be a non-empty list in the JSON config file")
+    shared = {key: value for key, value in run.items() if key != "segments"}
+    segments = []
+    start = float(run["start_time_s"])
+    for i, override in enumerate(overrides):
+        segment = {**shared, **override}
+        for merged_key in ("parameters", "time_series_data"):
+            segment[merged_key] = {**shared.get(merged_key, {}), **override.get(merged_key, {})}
+        end = float(override.get("end_time_s", run["end_time_s"] if i == len(overrides) - 1 else "nan"))
+        if not end > start:
+            raise RuntimeError(f"Error: segment {i + 1} needs an 'end_time_s' after {start}")
+        segment.update(start_time_s=start, end_time_s=end, index=i + 1,
+                       pinned=sorted(override.get("parameters", {})))
+        segments.append(segment)
+        start = end
+    return segments
+
+
+def segment_key(previous_key: Optional[str], segment: dict, config_dir: str) -> str:
+    # outputs only decide what is read back, not the state a leg ends in
+    settings = {key: value for key, value in segment.items() if key not in ("outputs", "resample")}
+    own = config_hash(settings, config_dir)
+    extra = json.dumps(state_map(segment), sort_keys=True)
+    return hashlib.sha256(f"{previous_key or ''}|{own}|{extra}".encode("utf-8")).hexdigest()
+
+
+def warm_parameters(segment: dict, carried: Dict[str, float]) -> dict:
+    # the carried state replaces inherited values but not the leg's own parameters
+    parameters = dict(segment["parameters"])
+    parameters.update({name: value for name, value in carried.items() if name not in segment["pinned"]})
+    return {**segment, "parameters": parameters}
+
+
+def capture_state(final_value: Callable[[str], float], mapping: Dict[str, str]) -> Dict[str, float]:
+    return {param: float(final_value(variable)) for param, variable in mapping.items()}
+
+
+def join_trajectories(parts: Sequence[Trajectory]) -> Trajectory:
+    # a leg's first sample repeats the previous leg's last one
+    joined = {}
+    for name in parts[0]:
+        times, values = [], []
+        for part in parts:
+            t, v = (np.asarray(a, dtype=np.float64) for a in part[name])
+            if times and len(t) and t[0] <= times[-1][-1]:
+                t, v = t[1:], v[1:]
+            times.append(t)
+            values.append(v)
+        joined[name] = (np.concatenate(times), np.concatenate(values))
+    return joined
+
+
+class SegmentCache:
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def load(self, key: str, variables: Sequence[str]) -> Optional[Tuple[Dict[str, float], Trajectory]]:
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        with open(os.path.join(path, "state.json"), "r") as file:
+            final_state = json.load(file)
+        with np.load(os.path.join(path, "trajectory.npz")) as data:
+            # a leg cached for other outputs cannot serve this run
+            if any(f"t:{name}" not in data.files for name in variables):
+                return None
+            trajectory = {name: (data[f"t:{name}"], data[f"v:{name}"]) for name in variables}
+        return final_state, trajectory
+
+    def store(self, key: str, final_state: Dict[str, float], trajectory: Trajectory) -> None:
+        path = self._path(key)
+        # legs cached earlier for the same key may hold variables this run did not read
+        previous = self.load(key, [])
+        if previous is not None:
+            with np.load(os.path.join(path, "trajectory.npz")) as data:
+                kept = {name[2:]: (data[name], data["v:" + name[2:]]) for name in data.files if name.startswith("t:")}
+            trajectory = {**kept, **trajectory}
+        # written next to the final location and renamed, so readers never see half a leg
+        staging = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        os.makedirs(staging)
+        with open(os.path.join(staging, "state.json"), "w") as file:
+            json.dump(final_state, file)
+        arrays = {}
+        for name, (t, v) in trajectory.items():
+            arrays[f"t:{name}"], arrays[f"v:{name}"] = np.asarray(t, dtype=np.float64), np.asarray(v, dtype=np.float64)
+        np.savez(os.path.join(staging, "trajectory.npz"), **arrays)
+        if previous is not None:
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # another job stored the same leg first; both are identical
+            shutil.rmtree(staging, ignore_errors=True)
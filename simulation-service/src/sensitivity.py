@@ -0,0 +1,231 @@
+r"""
+Finite-difference sensitivity of run outputs to model parameters.
+
+A config with a ``"sensitivity"`` block is run once at its own parameter
+values and once more per listed parameter with that parameter nudged
+(forward differences), or twice per parameter nudged both ways (central
+differences). The same perturbed runs serve every output, so a study costs
+one run per parameter plus the base run. The runs go through the usual
+scheduling, so ``parallel_circuits`` keeps that many warm models busy, and
+runs the catalog already holds are not simulated again.
+
+    "sensitivity": {
+        "parameters": ["mass@aero_fd_6dof_body", {"maxThrust@aero_fd_6dof_thrust": {"relative_step": 0.05}}],
+        "method": "forward",
+        "relative_step": 0.01,
+        "points": 500
+    }
+
+A parameter takes either a ``relative_step`` (fraction of its base value)
+or an absolute ``step``. Base values come from the config's ``parameters``
+or, failing that, from the loaded model.
+
+Every output is resampled onto a shared time grid, and all derivatives are
+taken in one array operation over (parameter, output, time):
+
+• Jacobian       ∂y(t)/∂p
+• index          RMS over time of ∂y/∂p · p / RMS(y), the relative change in
+                 the output per relative change in the parameter
+
+    python src/sensitivity.py output/sensitivity/plane_config.npz [--top 10]
+"""
+
+import argparse
+import csv
+import json
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from resampling import interpolate
+
+METHODS = ("forward", "central")
+DEFAULT_RELATIVE_STEP = 0.01
+DEFAULT_POINTS = 500
+BASE_RUN = "sens_base"
+
+
+def parameter_steps(settings: dict) -> Dict[str, dict]:
+    # "parameters" may list names, {name: options} entries, or be one {name: options} mapping
+    entries = settings.get("parameters")
+    if isinstance(entries, dict):
+        entries = [{name: options} for name, options in entries.items()]
+    if not isinstance(entries, list) or not entries:
+        raise RuntimeError("Error: 'sensitivity' needs a non-empty 'parameters' list in the JSON config file")
+    steps = {}
+    for entry in entries:
+        for name, options in (entry.items() if isinstance(entry, dict) else [(entry, {})]):
+            options = options or {}
+            if "step" not in options:
+                options = {"relative_step": float(options.get("relative_step", settings.get("relative_step", DEFAULT_RELATIVE_STEP)))}
+            steps[str(name)] = options
+    return steps
+
+
+def difference_method(settings: dict) -> str:
+    chosen = settings.get("method", "forward")
+    if chosen not in METHODS:
+        raise RuntimeError(f"Error: unknown sensitivity method '{chosen}'. Use one of: {', '.join(METHODS)}")
+    return chosen
+
+
+def run_count(settings: dict) -> int:
+    per_parameter = 2 if difference_method(settings) == "central" else 1
+    return 1 + per_parameter * len(parameter_steps(settings))
+
+
+def _rms(values: np.ndarray) -> np.ndarray:
+    # over the last axis, ignoring grid points outside a run's time span
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=-1)
+    total = np.where(valid, values, 0.0) ** 2
+    return np.where(count > 0, np.sqrt(total.sum(axis=-1) / np.maximum(count, 1)), np.nan)
+
+
+class SensitivityStudy:
+    def __init__(
+        self,
+        time_grid: Sequence[float],
+        variables: Sequence[str],
+        base_values: Dict[str, float],
+        steps: Dict[str, float],
+        method: str = "forward",
+    ):
+        self.time = np.asarray(time_grid, dtype=np.float64)
+        self.variables = list(variables)
+        self.parameters = list(steps)
+        self.base = np.array([base_values[name] for name in self.parameters], dtype=np.float64)
+        self.steps = np.array([steps[name] for name in self.parameters], dtype=np.float64)
+        if np.any(self.steps == 0):
+            zero = [name for name, step in zip(self.parameters, self.steps) if step == 0]
+            raise ValueError(f"Zero perturbation step for: {', '.join(zero)}. Give these an absolute 'step'")
+        self.method = method
+        # row 0 is the base run, then one (forward) or two (central: +, −) rows per parameter
+        self.run_names = [BASE_RUN]
+        for i in range(len(self.parameters)):
+            self.run_names.append(f"sens_{i + 1:03d}_plus")
+            if method == "central":
+                self.run_names.append(f"sens_{i + 1:03d}_minus")
+        self.values = np.full((len(self.run_names), len(self.variables), len(self.time)), np.nan)
+        self.done = np.zeros(len(self.run_names), dtype=bool)
+
+    @classmethod
+    def for_config(cls, data: dict, model_value, points: int = None) -> "SensitivityStudy":
+        # model_value(name) reads a parameter the config does not set from the loaded model
+        settings = data["sensitivity"]
+        base_values, steps = {}, {}
+        for name, options in parameter_steps(settings).items():
+            raw = data.get("parameters", {}).get(name)
+            try:
+                base_values[name] = float(model_value(name) if raw is None else raw)
+            except (TypeError, ValueError):
+                raise RuntimeError(f"Error: sensitivity parameter '{name}' needs a numeric base value")
+            steps[name] = float(options["step"]) if "step" in options else options["relative_step"] * abs(base_values[name])
+        points = int(points or settings.get("points", DEFAULT_POINTS))
+        grid = np.linspace(float(data["start_time_s"]), float(data["end_time_s"]), points)
+        return cls(grid, data["outputs"], base_values, steps, difference_method(settings))
+
+    def overrides(self) -> List[dict]:
+        # run entries in the shape of a config's "runs" list
+        runs = [{"name": BASE_RUN}]
+        for i, name in enumerate(self.parameters):
+            signs = (1.0, -1.0) if self.method == "central" else (1.0,)
+            for sign, suffix in zip(signs, ("plus", "minus")):
+                value = self.base[i] + sign * self.steps[i]
+                runs.append({"name": f"sens_{i + 1:03d}_{suffix}", "parameters": {name: repr(float(value))}})
+        return runs
+
+    def add_run(self, run_name: str, series: Dict[str, Tuple[Sequence[float], Sequence[float]]]) -> None:
+        if run_name not in self.run_names:
+            return
+        row = self.run_names.index(run_name)
+        for j, name in enumerate(self.variables):
+            if name not in series:
+                continue
+            t, v = (np.asarray(a, dtype=np.float64) for a in series[name])
+            x = interpolate(t, v, self.time)
+            x[(self.time < t[0]) | (self.time > t[-1])] = np.nan
+            self.values[row, j] = x
+        self.done[row] = True
+
+    def missing(self) -> List[str]:
+        return [name for name, done in zip(self.run_names, self.done) if not done]
+
+    def jacobian(self) -> np.ndarray:
+        # (parameter, output, time)
+        h = self.steps[:, None, None]
+        if self.method == "central":
+            return (self.values[1::2] - self.values[2::2]) / (2.0 * h)
+        return (self.values[1:] - self.values[0]) / h
+
+    def normalized(self) -> np.ndarray:
+        # ∂y/∂p · p / RMS(y_base): dimensionless, comparable across parameters and outputs
+        scale = _rms(self.values[0])
+        scale = np.where(scale > 0, scale, 1.0)
+        return self.jacobian() * self.base[:, None, None] / scale[None, :, None]
+
+    def indices(self) -> Dict[str, np.ndarray]:
+        # (parameter, output) summaries of the time-resolved sensitivities
+        normalized = self.normalized()
+        return {
+            "index": _rms(normalized),
+            "peak_index": np.max(np.abs(np.nan_to_num(normalized)), axis=-1),
+            "rms_jacobian": _rms(self.jacobian()),
+        }
+
+    def ranking(self) -> Dict[str, List[Tuple[str, float]]]:
+        # output -> [(parameter, index)], most influential first
+        index = self.indices()["index"]
+        result = {}
+        for j, name in enumerate(self.variables):
+            order = np.argsort(-np.nan_to_num(index[:, j], nan=-1.0), kind="stable")
+            result[name] = [(self.parameters[i], float(index[i, j])) for i in order]
+        return result
+
+    def write_csv(self, path: str) -> None:
+        indices = self.indices()
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["output", "parameter", "base_value", "step"] + list(indices))
+            for name, ranked in self.ranking().items():
+                j = self.variables.index(name)
+                for parameter, _ in ranked:
+                    i = self.parameters.index(parameter)
+                    writer.writerow([name, parameter, f"{self.base[i]:.6g}", f"{self.steps[i]:.6g}"]
+                                    + [f"{values[i, j]:.6g}" for values in indices.values()])
+
+    def save(self, path: str) -> None:
+        meta = {"variables": self.variables, "parameters": self.parameters, "method": self.method,
+                "run_names": self.run_names}
+        np.savez_compressed(path, meta=json.dumps(meta), time=self.time, base=self.base, steps=self.steps,
+                            values=self.values, done=self.done, jacobian=self.jacobian())
+
+    @classmethod
+    def load(cls, path: str) -> "SensitivityStudy":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            base = dict(zip(meta["parameters"], data["base"].tolist()))
+            steps = dict(zip(meta["parameters"], data["steps"].tolist()))
+            study = cls(data["time"], meta["variables"], base, steps, meta["method"])
+            study.values = data["values"]
+            study.done = data["done"]
+        return study
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Rank parameters by their influence on each output")
+    parser.add_argument("study", help=".npz written by a config with a 'sensitivity' block")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    study = SensitivityStudy.load(args.study)
+    if study.missing():
+        print(f"Warning: runs missing from the study: {', '.join(study.missing())}")
+    for name, ranked in study.ranking().items():
+        print(name)
+        for parameter, index in ranked[:args.top]:
+            print(f"  {index:10.4g}  {parameter}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -1,9 +1,32 @@
 import csv
 import json
+import math
 import matplotlib.pyplot as plt
 import os
+import re
+import time
 from typing import List, Tuple
 
+from decimation import decimate
+from dispersion import DEFAULT_POINTS as DISPERSION_POINTS, DEFAULT_QUANTILES, DispersionStats, read_columns
+from events import (detect as detect_events, rows as event_rows, variables as event_variables,
+                    write_csv as write_events_csv)
+from optimize import DEFAULT_TABLE_DIR, Optimization
+from path_export import PATH_VARIABLES, export_plane_path
+from profiles import DEFAULT_CACHE as PROFILE_CACHE, DEFAULT_RATE_HZ, compile_profile
+from resampling import write_uniform_csv
+from results_reader import ResultsFile, results_path, write_names
+from run_catalog import RunCatalog, artifact_names, config_hash
+from run_config import iter_runs
+from sensitivity import SensitivityStudy, run_count as sensitivity_run_count
+from segments import (SegmentCache, capture_state, join_trajectories, resolve_segments,
+                      segment_key, state_map, warm_parameters)
+from solver_log import list_logs, move_logs, new_logs, parse_log, rotate_logs, summarize
+from sweep import expand as expand_sweep, skip_cached
+from streaming import ChunkPublisher, CsvChunkSink, WallClockPacer
+from termination import TerminationMonitor, poll_interval
+from workspace import JobWorkspace, prune_workspaces
+
 try:
     from amesim import *
 except ImportError:
@@ -18,26 +41,87 @@ except ImportError:
 
 ##############################################################################################
 
+# Plots never need more points than a page is wide; long runs are decimated first
+PLOT_MAX_POINTS = 4000
+
+
+def _partial_reader() -> dict:
+    # where a polling loop's last read of a running simulation ended
+    return {"last_time": None, "offset": 0, "results": None}
+
+
 class SimulationService:
-    def __init__(self):
+    def __init__(
+        self,
+        catalog_path: str = None,
+        use_cache: bool = True,
+        workspace_root: str = None,
+        tmpfs: bool = False,
+        retention: str = "failed",
+        segment_cache: str = None,
+        optimize_tables: str = None,
+    ):
         self._initialize_amesim()
         self.temp_files = []
+        self.parameter_defaults = {}
+        # name -> Amesim circuit id, one entry per loaded model copy
+        self.circuits = {}
+        # name -> directory holding that copy's .ame, compiled model, results file and solver logs
+        self.circuit_dirs = {}
+        # circuit id -> {"default": {variable: saved}, "current": {variable: saved}}
+        self.saved_variables = {}
+        # Optional run catalog: records every run and serves repeated configs from its archive
+        self.catalog = RunCatalog(catalog_path) if catalog_path else None
+        self.use_cache = use_cache
+        # Every run writes into its own workspace and only promotes finished files to output/
+        self.workspace_settings = {"root": workspace_root, "tmpfs": tmpfs, "retention": retention}
+        self.workspace = None
+        prune_workspaces(workspace_root, tmpfs=tmpfs)
+        # Legs of segmented runs, keyed by their settings and everything before them
+        self.segment_cache = SegmentCache(segment_cache) if segment_cache else None
+        # content-addressed tables of optimization candidates, shared by every search
+        self.optimize_tables = os.path.abspath(optimize_tables or DEFAULT_TABLE_DIR)
+        # set while a segmented run's outputs are written: variable -> joined (times, values)
+        self.segment_trajectory = None
+        # running statistics over every run of a config with a "dispersion" block
+        self.dispersion = None
+        # finite-difference study of a config with a "sensitivity" block, filled as its runs finish
+        self.sensitivity = None
+        # search of a config with an "optimize" block; scores candidate runs as they finish
+        self.optimization = None
+        # solver logs left in the working directory by earlier sessions get compressed
+        rotate_logs(os.getcwd(), keep_plain=0)
 
     def _initialize_amesim(self) -> None:
         AMEInitAPI(False)
         AMEGetAPIVersion()
 
     def _create_temporary_file(self, time_col, data_col, file_name):
-        file_path = os.path.join(os.getcwd(), file_name)
+        if self.workspace is not None:
+            file_path = self.workspace.scratch_file(file_name)
+        else:
+            file_path = os.path.join(os.getcwd(), file_name)
         self.temp_files.append(file_path)
         with open(file_path, 'w', newline='') as temp_data_file:
             csv_writer = csv.writer(temp_data_file, delimiter=' ')
             for row in zip(time_col, data_col):
                 csv_writer.writerow(row)
 
+    def _output_file(self, output_path: str, file_name: str) -> str:
+        # explicit directory, else the active run's workspace, else ./output
+        if output_path is None and self.workspace is not None:
+            return self.workspace.output_file(file_name)
+        if output_path is None:
+            output_path = os.path.join(os.getcwd(), "output")
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
+        return os.path.join(output_path, file_name)
+
     def _delete_temporary_files(self):
         for file_path in self.temp_files:
-            os.remove(file_path)
+            # scratch files go away with their workspace
+            if os.path.exists(file_path):
+                os.remove(file_path)
         self.temp_files = []
 
     def _trim_amesim_model(self, code: str) -> str:
@@ -56,22 +140,56 @@ class SimulationService:
         trimmed_code = '\n'.join(lines)
         return trimmed_code
 
-    def load_model(self, model_file: str) -> None:
+    def load_model(self, model_file: str, circuit_name: str = None, circuit_dir: str = None) -> str:
+        # The generated code creates its circuit under a fixed name in the working
+        # directory; copies loaded side by side each get their own circuit_dir so
+        # they never share a .ame, compiled model or results file
         print(f"Loading model")
         file_extension = model_file.split('.')[-1]
         if file_extension.lower() != "py":
             raise ValueError("Error: Model file must have correct file extension: .py")
         with open(model_file, "r") as file:
             code = file.read()
+        launch_dir = os.getcwd()
+        circuit_dir = circuit_dir or launch_dir
+        os.makedirs(circuit_dir, exist_ok=True)
+        os.chdir(circuit_dir)
         try:
             exec(self._trim_amesim_model(code))
         except Exception as e:
             print(f"Error loading model: {e}")
             raise
+        finally:
+            os.chdir(launch_dir)
+        # the generated code leaves its new circuit active
+        circuit_id = AMEGetActiveCircuit()
+        self.circuits[circuit_name or circuit_id] = circuit_id
+        self.circuit_dirs[circuit_name or circuit_id] = circuit_dir
+        return circuit_name or circuit_id
+
+    def _circuit_dir(self) -> str:
+        # directory of the active circuit, or the working directory before any model is loaded
+        active = AMEGetActiveCircuit() if self.circuits else None
+        for circuit_name, circuit_id in self.circuits.items():
+            if circuit_id == active:
+                return self.circuit_dirs[circuit_name]
+        return os.getcwd()
+
+    def use_circuit(self, circuit_name: str) -> None:
+        if circuit_name not in self.circuits:
+            raise ValueError(f"Unknown circuit: {circuit_name}. Loaded: {', '.join(self.circuits)}")
+        AMESetActiveCircuit(self.circuits[circuit_name])
+
+    def _qualify(self, data_path: str) -> str:
+        # pin a data path to the active circuit so it stays valid after switching
+        return data_path if ":" in data_path else f"{data_path}:{AMEGetActiveCircuit()}"
 
     def set_model_parameter(self, param_name: str, param_value: str) -> None:
 
         try:
+            qualified_name = self._qualify(param_name)
+            if qualified_name not in self.parameter_defaults:
+                self.parameter_defaults[qualified_name] = AMEGetParameterValue(param_name)[0]
             AMESetParameterValue(param_name, param_value)
         except Exception as e:
             print(f"Error setting parameter {param_name}: {e}")
@@ -102,58 +220,655 @@ class SimulationService:
             print(f"Error setting runtime parameters: {e}")
             raise
 
+    def _saved_variable_state(self) -> dict:
+        circuit_id = AMEGetActiveCircuit()
+        if circuit_id not in self.saved_variables:
+            # one pass over the model to learn its default save flags
+            default = {name: bool(AMEIsSavedVariable(name)) for name in self._circuit_variables()}
+            self.saved_variables[circuit_id] = {"default": default, "current": dict(default)}
+        return self.saved_variables[circuit_id]
+
+    def _circuit_variables(self) -> List[str]:
+        # data paths of every variable in the active circuit, supercomponents included
+        names = []
+        for alias_path in AMEGetComponentsAndLines(True):
+            names += [path for path in AMEGetParametersAndVariables(alias_path) if AMEIsVariable(path)]
+        return names
+
+    def _apply_saved_variables(self, wanted: dict) -> int:
+        # only flags that differ from the circuit's current state cost an API call
+        state = self._saved_variable_state()
+        changed = 0
+        for variable_name, save in wanted.items():
+            if state["current"].get(variable_name) != save:
+                AMESaveVariable(variable_name, save)
+                state["current"][variable_name] = save
+                changed += 1
+        return changed
+
+    def save_only_variables(self, variable_names: List[str]) -> int:
+        # Marks just these variables as saved on the active circuit, so the
+        # results file only holds what the run's outputs need
+        state = self._saved_variable_state()
+        keep = set(variable_names)
+        unknown = keep - set(state["default"])
+        if unknown:
+            raise ValueError(f"Invalid variable(s) to save: {', '.join(sorted(unknown))}")
+        changed = self._apply_saved_variables({name: name in keep for name in state["default"]})
+        print(f"Saving {len(keep)} of {len(state['default'])} variables ({changed} flags changed)")
+        return len(keep)
+
+    def restore_saved_variables(self) -> None:
+        circuit_id = AMEGetActiveCircuit()
+        if circuit_id in self.saved_variables:
+            self._apply_saved_variables(self.saved_variables[circuit_id]["default"])
+
+    def _run_saved_variables(self, run: dict) -> List[str]:
+        # the configured outputs plus whatever later stages of this run read back
+        names = list(run["outputs"]) + list(run.get("save_variables", []))
+        if "plane_path" in run:
+            names += PATH_VARIABLES
+        if "events" in run:
+            names += event_variables(run["events"])
+        return list(dict.fromkeys(names))
+
+    def _saved_names(self) -> List[str]:
+        # the variables the results file holds, one column each, in model order
+        return [name for name, saved in self._saved_variable_state()["current"].items() if saved]
+
+    def results_file(self) -> str:
+        # the circuit id carries an instance suffix ('plane(1)'); the file next to the .ame does not
+        circuit_file = re.sub(r"\(\d+\)$", "", AMEGetActiveCircuit())
+        return results_path(self._circuit_dir(), circuit_file)
+
+    def results_file_size(self) -> int:
+        path = self.results_file()
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def write_results_names(self, check_variables: List[str]) -> bool:
+        # Amesim stores no names in the results file. The saved variables, in model
+        # order, go to a sidecar so results_reader can read it by data path without
+        # an API session. The final values of check_variables must match first.
+        path = self.results_file()
+        if not os.path.exists(path):
+            return False
+        names = self._saved_names()
+        try:
+            _, values = ResultsFile(path, names).read(check_variables)
+            for name in check_variables:
+                final = AMEGetVariableFinalValue(name)[1]
+                if len(values[name]) and not math.isclose(values[name][-1], float(final), rel_tol=1e-6, abs_tol=1e-9):
+                    raise ValueError(f"{name} is not where the variable list puts it")
+        except ValueError as e:
+            print(f"Warning: no variable names written for {path}: {e}")
+            return False
+        write_names(path, names)
+        return True
+
     def _parse_config_file(self, config_file: str) -> dict:
         with open(config_file, 'r') as file:
             data = json.load(file)
-            required_keys = [
-                "model_file", "start_time_s", "end_time_s",
-                "interval_s", "parameters", "outputs",
-                "generate_output_files"
-            ]
-            for key in required_keys:
-                if key not in data:
-                    raise RuntimeError(f"Error: '{key}' is missing in the JSON config file")
+            if "model_file" not in data:
+                raise RuntimeError("Error: 'model_file' is missing in the JSON config file")
+            if "runs" in data:
+                if not isinstance(data["runs"], list) or not data["runs"]:
+                    raise RuntimeError("Error: 'runs' must be a non-empty list in the JSON config file")
+                if "sweep" in data:
+                    raise RuntimeError("Error: a config cannot have both 'runs' and 'sweep'")
+            if "sensitivity" in data and ("runs" in data or "sweep" in data):
+                raise RuntimeError("Error: a 'sensitivity' config generates its own runs; remove 'runs' and 'sweep'")
+            if "optimize" in data and ("runs" in data or "sweep" in data or "sensitivity" in data):
+                raise RuntimeError("Error: an 'optimize' config generates its own runs; remove 'runs', 'sweep' and 'sensitivity'")
             return data
 
+    def _resolve_runs(self, data: dict) -> List[dict]:
+        # A config without "runs" is a single run; otherwise every entry in "runs"
+        # inherits the top-level settings and overrides what it names
+        runs = list(iter_runs(data, data.get("runs", [{}])))
+        names = [run["name"] for run in runs if "name" in run]
+        if len(names) != len(set(names)):
+            raise RuntimeError("Error: run names must be unique in the JSON config file")
+        return runs
+
+    def _sweep_runs(self, data: dict, config_dir: str):
+        # Expanded one run at a time; runs the catalog already holds are skipped
+        # here rather than restored one by one
+        skipped = []
+
+        def on_cached(run, row):
+            skipped.append(run["name"])
+            self._aggregate_archived(run, row["id"])
+
+        runs = iter_runs(data, expand_sweep(data))
+        if self.use_cache:
+            runs = skip_cached(runs, self.catalog, config_dir, on_cached)
+        for run in runs:
+            self._report_skipped(skipped)
+            yield run
+        self._report_skipped(skipped)
+
+    def _report_skipped(self, skipped: List[str]) -> None:
+        if skipped:
+            print(f"Skipped {len(skipped)} cataloged sweep run(s)")
+            skipped.clear()
+
+    def _set_time_series_data(self, time_series_data: dict, config_dir: str) -> None:
+        for table_name, table_info in time_series_data.items():
+            # Assuming config structure like: { "table_name": { "file": "relative/path/to/data.csv", ... } }
+            if "file" in table_info:
+                data_file_relative = table_info["file"]
+                data_file_absolute = os.path.join(config_dir, data_file_relative)
+                # Check if the data file exists before setting the parameter
+                if os.path.exists(data_file_absolute):
+                    self.set_model_parameter_timeseries(table_name, data_file_absolute)
+                else:
+                    print(f"Warning: Time series data file not found at {data_file_absolute}")
+            elif "stages" in table_info:
+                # { "table_name": { "stages": "data/input.csv", "channel": "throttle", "rate_hz": 10 } }
+                stage_file = os.path.join(config_dir, table_info["stages"])
+                channel = table_info.get("channel", "throttle")
+                profile = compile_profile(stage_file, PROFILE_CACHE, float(table_info.get("rate_hz", DEFAULT_RATE_HZ)))
+                if channel not in profile:
+                    raise RuntimeError(f"Error: stage table {stage_file} has no '{channel}' column")
+                self.set_model_parameter_timeseries(table_name, profile[channel]["table"])
+            else:
+                # Fallback or error handling if 'file' key is missing?
+                # For now, let's just print a warning.
+                print(f"Warning: 'file' or 'stages' key missing for time_series_data table '{table_name}' in config.")
+
+    def _restore_model_parameters(self, keep: List[str]) -> None:
+        # Parameters changed by an earlier run in the same session go back to the
+        # model value unless the current run sets them again
+        circuit_suffix = f":{AMEGetActiveCircuit()}"
+        keep = {self._qualify(param_name) for param_name in keep}
+        for param_name, default_value in self.parameter_defaults.items():
+            if param_name.endswith(circuit_suffix) and param_name not in keep:
+                AMESetParameterValue(param_name, default_value)
+
+    def _run_artifacts(self, run: dict, output_dir: str) -> List[str]:
+        # termination.json is only written when a rule fired; missing files are not archived
+        return [os.path.join(output_dir, name) for name in artifact_names(run)]
+
+    def _begin_run(self, run: dict, config_dir: str):
+        # Applies the run's settings to the active circuit. Returns the run state,
+        # or None when the catalog already holds an identical run.
+        output_dir = os.path.join(os.getcwd(), "output")
+        if "name" in run:
+            print(f"Starting run '{run['name']}'")
+            output_dir = os.path.join(output_dir, run["name"])
+
+        run_hash = None
+        if self.catalog is not None:
+            run_hash = config_hash(run, config_dir)
+            cached = self.catalog.find_cached(run_hash, artifact_names(run)) if self.use_cache else None
+            if cached is not None:
+                print(f"Serving cataloged run {cached['id']} ({run_hash[:12]}) without simulating")
+                with JobWorkspace(**self.workspace_settings) as workspace:
+                    self.catalog.restore_artifacts(cached["id"], workspace.output_dir)
+                    workspace.promote(output_dir)
+                self._aggregate_archived(run, cached["id"])
+                return None
+
+        log_dir = self._circuit_dir()
+        state = {
+            "output_dir": output_dir,
+            "hash": run_hash,
+            "timings": {},
+            "workspace": JobWorkspace(**self.workspace_settings),
+            # the solver drops its STDSIM log next to the circuit it runs
+            "log_dir": log_dir,
+            "logs_before": list_logs(log_dir),
+            "solver": None,
+            "monitor": TerminationMonitor(run["terminate"]) if "terminate" in run else None,
+        }
+        started = time.perf_counter()
+        try:
+            state["saved_variables"] = self._apply_run_settings(run, config_dir)
+        except Exception:
+            self._fail_run(run, state)
+            raise
+        state["timings"]["setup_s"] = time.perf_counter() - started
+        return state
+
+    def _apply_run_settings(self, run: dict, config_dir: str):
+        self._restore_model_parameters(
+            list(run["parameters"]) + [f"filename@{table_name}" for table_name in run["time_series_data"]]
+        )
+        for param_name, value in run["parameters"].items():
+            self.set_model_parameter(param_name, str(value))
+        self._set_time_series_data(run["time_series_data"], config_dir)
+        saved_variables = None
+        if run.get("save_only_outputs"):
+            saved_variables = self.save_only_variables(self._run_saved_variables(run))
+        else:
+            self.restore_saved_variables()
+        self.set_runtime_parameters(
+            str(run["start_time_s"]),
+            str(run["end_time_s"]),
+            str(run["interval_s"]),
+        )
+        return saved_variables
+
+    def _capture_solver_logs(self, state: dict) -> dict:
+        if state["solver"] is not None:
+            return state["solver"]
+        paths = new_logs(state["log_dir"], state["logs_before"])
+        moved = move_logs(paths, state["workspace"].output_subdir("logs"))
+        state["solver"] = summarize(parse_log(path) for path in moved)
+        if state["solver"]:
+            solver = state["solver"]
+            print(f"Solver: {solver['status']}, CPU {solver['cpu_s']} s, "
+                  f"{solver['warnings']} warning(s), {solver['errors']} error(s)")
+        return state["solver"]
+
+    def _fail_run(self, run: dict, state: dict) -> None:
+        self.workspace = None
+        solver = self._capture_solver_logs(state)
+        # the logs are what explains a failure, so they are published even then
+        logs_dir = os.path.join(state["output_dir"], "logs")
+        state["workspace"].promote(logs_dir, "logs")
+        rotate_logs(logs_dir)
+        state["workspace"].close(failed=True)
+        if self.catalog is not None:
+            self.catalog.record_run(run, state["hash"], "failed", state["timings"], solver=solver)
+
+    def _finish_run(self, run: dict, state: dict) -> None:
+        started = time.perf_counter()
+        self.workspace = state["workspace"]
+        try:
+            plt.clf()
+            for output_param in run["outputs"]:
+                self.plot_variable(output_param)
+            if run["generate_output_files"]:
+                self.save_all_output_files(run["outputs"])
+            if "resample" in run:
+                self.save_resampled_csv(
+                    run["outputs"],
+                    float(run["resample"]["rate_hz"]),
+                    run["resample"].get("method", "linear"),
+                )
+            if "plane_path" in run:
+                self.save_plane_path(max_error_m=run["plane_path"].get("max_error_m"))
+            if "events" in run:
+                self._detect_events(run, state)
+            termination = state["monitor"].summary() if state["monitor"] else None
+            if termination is not None:
+                print(f"Run stopped at {termination['stopped_at_s']:.6g} s: {termination['reason']} "
+                      f"({termination['variable']} = {termination['value']:.6g} at {termination['time_s']:.6g} s)")
+                with open(self._output_file(None, "termination.json"), "w") as file:
+                    json.dump(termination, file, indent=2)
+            self._capture_solver_logs(state)
+            results_bytes = self.results_file_size()
+            if results_bytes is not None:
+                print(f"Results file: {results_bytes / 1e6:.2f} MB")
+                state["solver"]["results_bytes"] = results_bytes
+                state["solver"]["saved_variables"] = state.get("saved_variables")
+                self.write_results_names(run["outputs"])
+            state["workspace"].promote(state["output_dir"])
+            rotate_logs(os.path.join(state["output_dir"], "logs"))
+            if any(study is not None for study in (self.dispersion, self.sensitivity, self.optimization)):
+                self._aggregate(run, {name: self.get_output_values(name) for name in run["outputs"]})
+        except Exception:
+            self._fail_run(run, state)
+            raise
+        self.workspace = None
+        state["workspace"].close()
+        state["timings"]["outputs_s"] = time.perf_counter() - started
+        if self.catalog is not None:
+            artifacts = self._run_artifacts(run, state["output_dir"])
+            run_id = self.catalog.record_run(
+                run, state["hash"], "completed", state["timings"], artifacts, solver=state["solver"],
+                termination=state["monitor"].summary() if state["monitor"] else None,
+                events=state.get("events", ()),
+            )
+            print(f"Cataloged run {run_id} ({state['hash'][:12]})")
+
+    def _detect_events(self, run: dict, state: dict) -> None:
+        series = {name: self.get_output_values(name) for name in event_variables(run["events"])}
+        table = detect_events(series, run["events"])
+        write_events_csv(self._output_file(None, "events.csv"), table)
+        state["events"] = event_rows(table)
+        counts = {}
+        for name in table["event"]:
+            counts[name] = counts.get(name, 0) + 1
+        print(f"Detected {len(state['events'])} event(s)" + (": " + ", ".join(f"{name} ({n})" for name, n in counts.items()) if counts else ""))
+
+    def _aggregate(self, run: dict, series: dict) -> None:
+        # series: output -> (times, values) of a finished run
+        if self.dispersion is not None:
+            self.dispersion.add_run(series)
+        if self.sensitivity is not None:
+            self.sensitivity.add_run(run.get("name"), series)
+        if self.optimization is not None:
+            self.optimization.add_run(run.get("name"), series)
+
+    def _aggregate_archived(self, run: dict, run_id: int) -> None:
+        # cataloged runs count towards the statistics through their archived data.csv
+        if all(study is None for study in (self.dispersion, self.sensitivity, self.optimization)):
+            return
+        paths = [path for path in self.catalog.artifacts(run_id) if os.path.basename(path) == "data.csv"]
+        if not paths:
+            print(f"Warning: cataloged run {run_id} has no data.csv; left out of the aggregated statistics")
+            return
+        self._aggregate(run, read_columns(paths[0]))
+
+    def _save_dispersion(self, config_file: str, quantiles) -> None:
+        # one file per config, so parts of a split sweep can be merged afterwards
+        stem = os.path.splitext(os.path.basename(config_file))[0]
+        folder = os.path.join(os.getcwd(), "output", "dispersion")
+        with JobWorkspace(**self.workspace_settings) as workspace:
+            self.dispersion.save(workspace.output_file(f"{stem}.npz"))
+            self.dispersion.write_csv(workspace.output_file(f"{stem}.csv"), quantiles)
+            workspace.promote(folder)
+        print(f"Dispersion statistics over {self.dispersion.runs} runs saved to {folder}")
+
+    def _sensitivity_runs(self, data: dict) -> List[dict]:
+        # base values the config does not set are read from the first loaded model
+        self.use_circuit("circuit_1")
+        self.sensitivity = SensitivityStudy.for_config(data, lambda name: AMEGetParameterValue(name)[0])
+        print(f"Sensitivity study: {len(self.sensitivity.parameters)} parameter(s), "
+              f"{self.sensitivity.method} differences, {len(self.sensitivity.run_names)} runs")
+        return list(iter_runs(data, self.sensitivity.overrides()))
+
+    def _save_sensitivity(self, config_file: str) -> None:
+        stem = os.path.splitext(os.path.basename(config_file))[0]
+        folder = os.path.join(os.getcwd(), "output", "sensitivity")
+        with JobWorkspace(**self.workspace_settings) as workspace:
+            self.sensitivity.save(workspace.output_file(f"{stem}.npz"))
+            self.sensitivity.write_csv(workspace.output_file(f"{stem}.csv"))
+            workspace.promote(folder)
+        missing = self.sensitivity.missing()
+        if missing:
+            print(f"Warning: sensitivity runs without results: {', '.join(missing)}")
+        for name, ranked in self.sensitivity.ranking().items():
+            print(f"Most influential on {name}: " + ", ".join(f"{parameter} ({index:.3g})" for parameter, index in ranked[:3]))
+        print(f"Sensitivity indices saved to {folder}")
+
+    def _run_optimization(self, data: dict, config_file: str, config_dir: str, parallel_circuits: int) -> None:
+        # Every batch of candidates is one call to _execute_all: spread over the
+        # loaded circuits, catalog hits replayed, each run scored as it finishes
+        stem = os.path.splitext(os.path.basename(config_file))[0]
+        folder = os.path.join(os.getcwd(), "output", "optimize")
+        # candidate tables are shared by every search, as catalog hashes and best configs refer to them
+        study = Optimization(data["optimize"], config_dir, self.optimize_tables)
+        # progress and best config go through a workspace of their own, so two searches
+        # of the same config never truncate each other's files
+        workspace = JobWorkspace(**self.workspace_settings, label=f"optimize-{stem}")
+        progress_path = workspace.output_file(f"{stem}_progress.jsonl")
+        open(progress_path, "w").close()
+        print(f"Optimization progress in {progress_path}")
+        print(f"Optimizing {len(study.space.initial)} variable(s) with {data['optimize'].get('method', 'cmaes')}, "
+              f"up to {study.max_evaluations} evaluations, {parallel_circuits} at once")
+
+        def evaluate(points):
+            runs = list(iter_runs(data, study.candidate_runs(points, data["outputs"])))
+            for start in range(0, len(runs), parallel_circuits):
+                try:
+                    self._execute_all(runs[start:start + parallel_circuits], config_dir, parallel_circuits)
+                except Exception as e:
+                    # a candidate the solver cannot run just scores as infinitely bad
+                    print(f"Warning: candidate run failed: {e}")
+            return [study.score(run["name"]) for run in runs]
+
+        def on_progress(record):
+            print(f"Optimization batch {record['batch']}: {record['evaluations']} evaluations, "
+                  f"batch best {record['batch_best']:.6g}, best {record['best']:.6g}")
+            # appended line by line so a dashboard can tail the search while it runs
+            with open(progress_path, "a") as file:
+                file.write(json.dumps({**record, "best_point": study.space.values(record["best_point"])}) + "\n")
+
+        self.optimization = study
+        with workspace:
+            try:
+                point, value, _ = study.run(evaluate, on_progress)
+            finally:
+                self.optimization = None
+            best = {key: item for key, item in data.items() if key != "optimize"}
+            settings = study.space.run_settings(point, study.table_dir)
+            best["parameters"] = {**data.get("parameters", {}), **settings["parameters"]}
+            best["time_series_data"] = {**data.get("time_series_data", {}), **settings["time_series_data"]}
+            best["model_file"] = os.path.join(config_dir, data["model_file"])
+            with open(workspace.output_file(f"{stem}_best.json"), "w") as file:
+                json.dump(best, file, indent=2)
+            workspace.promote(folder)
+        print(f"Best objective {value:.6g} with {json.dumps(study.space.values(point))}")
+        print(f"Best config saved to {os.path.join(folder, f'{stem}_best.json')}")
+
+    def _execute_run(self, run: dict, config_dir: str) -> None:
+        if "segments" in run:
+            self._execute_segmented_run(run, config_dir)
+            return
+        state = self._begin_run(run, config_dir)
+        if state is None:
+            return
+        started = time.perf_counter()
+        try:
+            if "streaming" in run:
+                self._run_streaming_from_config(run, state["output_dir"], state["monitor"])
+            elif state["monitor"] is not None:
+                self.run_simulation_monitored(state["monitor"], float(run["interval_s"]), poll_interval([run]))
+            else:
+                self.run_simulation()
+        except Exception:
+            self._fail_run(run, state)
+            raise
+        state["timings"]["simulation_s"] = time.perf_counter() - started
+        self._finish_run(run, state)
+
+    def _execute_segmented_run(self, run: dict, config_dir: str) -> None:
+        # Legs run one after another on the active circuit, each warm-started from
+        # the final state of the one before; cached legs are not simulated again
+        segments = resolve_segments(run)
+        state = self._begin_run(run, config_dir)
+        if state is None:
+            return
+        mapping = state_map(run)
+        variables = self._run_saved_variables(run)
+        started = time.perf_counter()
+        parts, key, carried = [], None, {}
+        reused = 0
+        try:
+            for segment in segments:
+                key = segment_key(key, segment, config_dir)
+                cached = self.segment_cache.load(key, variables) if self.segment_cache else None
+                if cached is not None:
+                    print(f"Segment {segment['index']}/{len(segments)}: reusing cached leg ({key[:12]})")
+                    carried, trajectory = cached
+                    reused += 1
+                else:
+                    print(f"Segment {segment['index']}/{len(segments)}: simulating "
+                          f"{segment['start_time_s']} s to {segment['end_time_s']} s")
+                    leg = warm_parameters(segment, carried)
+                    # the state variables must be in the results file to be read back
+                    leg["save_variables"] = list(leg.get("save_variables", [])) + list(mapping.values())
+                    self._apply_run_settings(leg, config_dir)
+                    self.run_simulation()
+                    trajectory = {name: self.get_output_values(name) for name in variables}
+                    carried = capture_state(lambda path: AMEGetVariableFinalValue(path)[1], mapping)
+                    if self.segment_cache is not None:
+                        self.segment_cache.store(key, carried, trajectory)
+                parts.append(trajectory)
+        except Exception:
+            self._fail_run(run, state)
+            raise
+        state["timings"]["simulation_s"] = time.perf_counter() - started
+        state["timings"]["segments"] = len(segments)
+        state["timings"]["segments_reused"] = reused
+        self.segment_trajectory = join_trajectories(parts)
+        try:
+            self._finish_run(run, state)
+        finally:
+            self.segment_trajectory = None
+
+    def _execute_runs_overlapped(self, runs: List[dict], config_dir: str) -> None:
+        # One run per loaded circuit: setup and outputs go one circuit at a time,
+        # the solvers themselves run side by side
+        batch = []
+        for run, circuit_name in zip(runs, self.circuits):
+            self.use_circuit(circuit_name)
+            state = self._begin_run(run, config_dir)
+            if state is not None:
+                state["circuit"] = circuit_name
+                batch.append((run, state))
+        if not batch:
+            return
+        monitors = {state["circuit"]: (state["monitor"], float(run["interval_s"]))
+                    for run, state in batch if state["monitor"] is not None}
+        elapsed = self.run_simulations_overlapped(
+            [state["circuit"] for _, state in batch], monitors, poll_interval([run for run, _ in batch]))
+        first_error = None
+        for run, state in batch:
+            self.use_circuit(state["circuit"])
+            result = elapsed[state["circuit"]]
+            if isinstance(result, Exception):
+                self._fail_run(run, state)
+                first_error = first_error or result
+                continue
+            state["timings"]["simulation_s"] = result
+            try:
+                self._finish_run(run, state)
+            except Exception as e:
+                # _finish_run has already marked this run failed; the rest of the batch still gets finished
+                print(f"Error writing outputs of circuit {state['circuit']}: {e}")
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+
+    def run_simulations_overlapped(self, circuit_names: List[str] = None, monitors: dict = None,
+                                   poll_interval_s: float = 0.2) -> dict:
+        # Starts every circuit's solver, then waits on each in turn. Returns the
+        # seconds each one took (from the common start), or the exception it raised.
+        # monitors: circuit name -> (TerminationMonitor, window_s) for runs polled until a rule fires
+        circuit_names = list(circuit_names or self.circuits)
+        print(f"Running {len(circuit_names)} simulations side by side...")
+        results = {}
+        started = time.perf_counter()
+        running = []
+        for circuit_name in circuit_names:
+            try:
+                AMEStartSimulation(circuit=self.circuits[circuit_name])
+                running.append(circuit_name)
+            except Exception as e:
+                print(f"Error starting simulation on {circuit_name}: {e}")
+                results[circuit_name] = e
+        if monitors:
+            self._poll_monitored(running, monitors, poll_interval_s, started, results)
+        for circuit_name in running:
+            if circuit_name in results:
+                continue
+            try:
+                AMEWaitForSimulationEnd(circuit=self.circuits[circuit_name])
+                results[circuit_name] = time.perf_counter() - started
+            except Exception as e:
+                print(f"Error running simulation on {circuit_name}: {e}")
+                results[circuit_name] = e
+        return results
+
+    def _poll_monitored(self, running: List[str], monitors: dict, poll_interval_s: float, started: float,
+                        results: dict) -> None:
+        # one pass over the monitored circuits per poll: read what is new, stop the decided ones
+        publishers = {name: ChunkPublisher([monitors[name][0]], monitors[name][1]) for name in running if name in monitors}
+        readers = {name: _partial_reader() for name in publishers}
+        while publishers:
+            for circuit_name in list(publishers):
+                monitor = monitors[circuit_name][0]
+                try:
+                    self.use_circuit(circuit_name)
+                    active = AMEIsSimulationRunning()
+                    try:
+                        publishers[circuit_name].offer(*self._read_partial_values(monitor.variables, readers[circuit_name]),
+                                                       final=not active)
+                    except Exception as e:
+                        # the results file may not exist yet right after the start
+                        print(f"Waiting for first results on {circuit_name}: {e}")
+                    if active and monitor.triggered is None:
+                        continue
+                    if active:
+                        print(f"Stopping simulation on {circuit_name}: {monitor.triggered['reason']}")
+                        self._stop_simulation(poll_interval_s)
+                    else:
+                        AMEWaitForSimulationEnd(circuit=self.circuits[circuit_name])
+                    results[circuit_name] = time.perf_counter() - started
+                except Exception as e:
+                    print(f"Error running simulation on {circuit_name}: {e}")
+                    results[circuit_name] = e
+                del publishers[circuit_name]
+            if publishers:
+                time.sleep(poll_interval_s)
+
     def run_from_config_file(self, config_file: str) -> None:
         print(f"Running from config file")
         data = self._parse_config_file(config_file)
         # Construct absolute path for model file relative to config file location
         config_dir = os.path.dirname(os.path.abspath(config_file))
+        if "sweep" in data:
+            runs = self._sweep_runs(data, config_dir)
+            run_count = None
+        elif "sensitivity" in data:
+            # generated once the model is loaded, which supplies unset base values
+            for key in ("start_time_s", "end_time_s", "outputs"):
+                if key not in data:
+                    raise RuntimeError(f"Error: 'sensitivity' needs a top-level '{key}' in the JSON config file")
+            runs = None
+            run_count = sensitivity_run_count(data["sensitivity"])
+        elif "optimize" in data:
+            if "outputs" not in data:
+                raise RuntimeError("Error: 'optimize' needs a top-level 'outputs' in the JSON config file")
+            runs = []
+            # never more simulations at once than the search may hold licenses for
+            run_count = int(data["optimize"].get("licenses", data.get("parallel_circuits", 1)))
+        else:
+            runs = self._resolve_runs(data)
+            run_count = len(runs)
+        settings = data.get("dispersion")
+        if settings is not None:
+            # { "dispersion": { "points": 500, "quantiles": [0.05, 0.5, 0.95] } }
+            for key in ("start_time_s", "end_time_s", "outputs"):
+                if key not in data:
+                    raise RuntimeError(f"Error: 'dispersion' needs a top-level '{key}' in the JSON config file")
+            self.dispersion = DispersionStats.for_run(data, int(settings.get("points", DISPERSION_POINTS)))
         model_path_relative = data["model_file"]
         model_path_absolute = os.path.join(config_dir, model_path_relative)
-        self.load_model(model_path_absolute)
-        for param_name, value in data["parameters"].items():
-            self.set_model_parameter(param_name, str(value))
-        # config_dir was defined earlier when handling model_file path
-        # Process time series data only if the key exists in the config
-        if "time_series_data" in data:
-            for table_name, table_info in data["time_series_data"].items():
-                # Assuming config structure like: { "table_name": { "file": "relative/path/to/data.csv", ... } }
-                if "file" in table_info:
-                    data_file_relative = table_info["file"]
-                    data_file_absolute = os.path.join(config_dir, data_file_relative)
-                    # Check if the data file exists before setting the parameter
-                    if os.path.exists(data_file_absolute):
-                        self.set_model_parameter_timeseries(table_name, data_file_absolute)
-                    else:
-                        print(f"Warning: Time series data file not found at {data_file_absolute}")
-                else:
-                    # Fallback or error handling if 'file' key is missing?
-                    # For now, let's just print a warning.
-                    print(f"Warning: 'file' key missing for time_series_data table '{table_name}' in config.")
-        self.set_runtime_parameters(
-            str(data["start_time_s"]),
-            str(data["end_time_s"]),
-            str(data["interval_s"]),
-        )
-        self.run_simulation()
-        for output_param in data["outputs"]:
-            self.plot_variable(output_param)
-        if data["generate_output_files"]:
-            self.save_all_output_files(data["outputs"])
+        # The model is loaded once per circuit and reused by every run in the file
+        parallel_circuits = max(1, min(int(data.get("parallel_circuits", 1)), run_count or float("inf")))
+        for i in range(parallel_circuits):
+            circuit_name = f"circuit_{i + 1}"
+            # a single copy stays in the working directory, as it always has
+            circuit_dir = os.path.join(os.getcwd(), "circuits", circuit_name) if parallel_circuits > 1 else None
+            self.load_model(model_path_absolute, circuit_name, circuit_dir)
+        if runs is None:
+            runs = self._sensitivity_runs(data)
+        if "optimize" in data:
+            self._run_optimization(data, config_file, config_dir, parallel_circuits)
+        else:
+            self._execute_all(runs, config_dir, parallel_circuits)
+        if self.dispersion is not None:
+            self._save_dispersion(config_file, settings.get("quantiles", DEFAULT_QUANTILES))
+            self.dispersion = None
+        if self.sensitivity is not None:
+            self._save_sensitivity(config_file)
+            self.sensitivity = None
         self.quit()
 
+    def _execute_all(self, runs, config_dir: str, parallel_circuits: int) -> None:
+        if parallel_circuits == 1:
+            for run in runs:
+                self._execute_run(run, config_dir)
+            return
+        batch = []
+        for run in runs:
+            if "streaming" in run or "segments" in run:
+                # streaming polls one solver at a time; legs depend on each other
+                self.use_circuit("circuit_1")
+                self._execute_run(run, config_dir)
+                continue
+            batch.append(run)
+            if len(batch) == parallel_circuits:
+                self._execute_runs_overlapped(batch, config_dir)
+                batch = []
+        if batch:
+            self._execute_runs_overlapped(batch, config_dir)
+
     def run_simulation(self) -> None:
         print("Running system simulation...")
         try:
@@ -162,8 +877,131 @@ class SimulationService:
             print(f"Error running simulation: {e}")
             raise
 
+    def _run_streaming_from_config(self, run: dict, output_dir: str, monitor: TerminationMonitor = None) -> None:
+        settings = run["streaming"]
+        # written in place rather than in the workspace: readers tail this file while the solver runs
+        sink = CsvChunkSink(os.path.join(output_dir, "stream.csv"), run["outputs"])
+        try:
+            self.run_simulation_streaming(
+                run["outputs"],
+                [sink],
+                window_s=float(settings.get("window_s", 0.5)),
+                poll_interval_s=float(settings.get("poll_interval_s", 0.1)),
+                realtime_factor=settings.get("realtime_factor"),
+                monitor=monitor,
+            )
+        finally:
+            sink.close()
+
+    def _open_partial_results(self, reader: dict, variable_names: List[str]):
+        # The results file of the active circuit, memory-mapped by column once the
+        # saved variables line up with its header and with what the API reads
+        if reader["results"] is None:
+            path = self.results_file()
+            if not os.path.exists(path):
+                return None
+            try:
+                results = ResultsFile(path, self._saved_names())
+                _, values = results.read(variable_names)
+            except ValueError:
+                # header not written yet, or the saved variables do not match it (yet)
+                return None
+            for variable_name in variable_names:
+                pairs = AMEGetVariableValues(variable_name)
+                count = min(len(pairs), len(values[variable_name]))
+                if count == 0:
+                    return None
+                if not all(math.isclose(value, pair[1], rel_tol=1e-6, abs_tol=1e-9)
+                           for value, pair in zip(values[variable_name][:count], pairs)):
+                    print(f"Reading partial results through the API: {variable_name} is not where the variable list puts it")
+                    results = False
+                    break
+            reader["results"] = results
+        return reader["results"] or None
+
+    def _read_partial_values(self, variable_names: List[str], reader: dict) -> Tuple[List[float], dict]:
+        # Quiet read used while polling. Only samples newer than the reader's last
+        # read come back, so a long run costs the same per poll as a short one:
+        # straight from the results file when it can be mapped, else through the
+        # API, skipping what was already read
+        results = self._open_partial_results(reader, variable_names)
+        if results is not None:
+            time_values, values = results.read(variable_names, start_time=reader["last_time"])
+            time_values = time_values.tolist()
+        else:
+            columns = {name: AMEGetVariableValues(name)[reader["offset"]:] for name in variable_names}
+            # variables can be read a few samples apart; trim to the shortest
+            count = min((len(pairs) for pairs in columns.values()), default=0)
+            time_values = [pair[0] for pair in next(iter(columns.values()), ())[:count]]
+            values = {name: [pair[1] for pair in pairs[:count]] for name, pairs in columns.items()}
+            reader["offset"] += count
+        if time_values:
+            reader["last_time"] = time_values[-1]
+        return time_values, values
+
+    def run_simulation_streaming(
+        self,
+        variable_names: List[str],
+        consumers: list,
+        window_s: float = 0.5,
+        poll_interval_s: float = 0.1,
+        realtime_factor: float = None,
+        monitor: TerminationMonitor = None,
+    ) -> None:
+        print("Running system simulation (streaming)...")
+        pacer = WallClockPacer(float(realtime_factor)) if realtime_factor else None
+        if monitor is not None:
+            consumers = list(consumers) + [monitor]
+            variable_names = list(dict.fromkeys(list(variable_names) + monitor.variables))
+        publisher = ChunkPublisher(consumers, window_s, pacer)
+        reader = _partial_reader()
+        started = time.perf_counter()
+        stopped = False
+        try:
+            AMEStartSimulation()
+            while True:
+                running = AMEIsSimulationRunning()
+                try:
+                    publisher.offer(*self._read_partial_values(variable_names, reader))
+                except Exception as e:
+                    # the results file may not exist yet right after the start
+                    print(f"Waiting for first results: {e}")
+                if not running:
+                    break
+                if monitor is not None and monitor.triggered is not None:
+                    print(f"Stopping simulation: {monitor.triggered['reason']}")
+                    self._stop_simulation(poll_interval_s)
+                    stopped = True
+                    break
+                time.sleep(poll_interval_s)
+            if not stopped:
+                AMEWaitForSimulationEnd()
+            publisher.offer(*self._read_partial_values(variable_names, reader), final=True)
+        except Exception as e:
+            print(f"Error running simulation: {e}")
+            raise
+        if publisher.first_publish_wall is not None:
+            print(f"First window published after {publisher.first_publish_wall - started:.3f} s, "
+                  f"{publisher.samples} samples streamed")
+
+    def _stop_simulation(self, poll_interval_s: float) -> None:
+        # AMEWaitForSimulationEnd raises for a run that was stopped, so the active
+        # circuit is polled until its solver is gone; the results up to the stop stay
+        AMEStopSimulation()
+        while AMEIsSimulationRunning():
+            time.sleep(poll_interval_s)
+
+    def run_simulation_monitored(self, monitor: TerminationMonitor, window_s: float, poll_interval_s: float) -> None:
+        # polls only the variables the rules watch; nothing is published
+        self.run_simulation_streaming([], [], window_s=window_s, poll_interval_s=poll_interval_s, monitor=monitor)
+
     def get_output_values(self, variable_name: str) -> Tuple[List[float], List[float]]:
         print(f"Getting output data for variable: {variable_name}")
+        if self.segment_trajectory is not None:
+            if variable_name not in self.segment_trajectory:
+                raise ValueError(f"Variable {variable_name} was not kept for the segmented run")
+            time_values, data_values = self.segment_trajectory[variable_name]
+            return tuple(time_values.tolist()), tuple(data_values.tolist())
         try:
             pairs = AMEGetVariableValues(variable_name)
         except Exception as e:
@@ -180,8 +1018,14 @@ class SimulationService:
         time_list, data_list = zip(*pairs)
         return time_list, data_list
 
-    def plot_variable(self, variable_name: str) -> None:
+    def get_output_preview(self, variable_name: str, max_points: int, method: str = "minmax") -> Tuple[List[float], List[float]]:
+        time_values, variable_values = self.get_output_values(variable_name)
+        time_preview, value_preview = decimate(time_values, variable_values, max_points, method)
+        return time_preview.tolist(), value_preview.tolist()
+
+    def plot_variable(self, variable_name: str, max_points: int = PLOT_MAX_POINTS) -> None:
         time_values, variable_values = self.get_output_values(variable_name)
+        time_values, variable_values = decimate(time_values, variable_values, max_points)
         plt.plot(time_values, variable_values, label=variable_name)
         plt.legend(loc="upper left")
         plt.xlabel("Time")
@@ -196,13 +1040,7 @@ class SimulationService:
             self.save_plot_pdf(variable_name, output_path)
 
     def save_output_data_csv(self, variable_names: List[str], output_path: str = None) -> None:
-        if output_path is None:
-            output_path = os.path.join(os.getcwd(), "output", "data.csv")
-        else:
-            output_path = os.path.join(output_path, "data.csv")
-        output_dir = os.path.dirname(output_path)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        output_path = self._output_file(output_path, "data.csv")
         print(f"Saving output data")
         output_data = {}
         for i, variable_name in enumerate(variable_names):
@@ -218,24 +1056,42 @@ class SimulationService:
                 row = {field: output_data[field][i] for field in fieldnames}
                 writer.writerow(row)
 
-    def save_plot_pdf(self, variable_name: str, output_path: str = None) -> None:
+    def save_resampled_csv(self, variable_names: List[str], rate_hz: float, method: str = "linear", output_path: str = None) -> None:
+        output_path = self._output_file(output_path, "resampled.csv")
+        print(f"Saving output data resampled at {rate_hz} Hz ({method})")
+        series = {name: self.get_output_values(name) for name in variable_names}
+        write_uniform_csv(output_path, series, rate_hz, method, time_label="time")
+
+    def save_plane_path(self, output_path: str = None, max_error_m: float = None) -> None:
+        output_path = self._output_file(output_path, "PlanePath.csv")
+        print(f"Saving flight path for Unity")
+        columns = [self.get_output_values(name)[1] for name in PATH_VARIABLES]
+        rows = export_plane_path(output_path, *columns, max_error=max_error_m)
+        print(f"Wrote {rows} waypoints to {output_path}")
+
+    def save_plot_pdf(self, variable_name: str, output_path: str = None, max_points: int = PLOT_MAX_POINTS) -> None:
         time_values, variable_values = self.get_output_values(variable_name)
+        time_values, variable_values = decimate(time_values, variable_values, max_points)
         plt.plot(time_values, variable_values, label=variable_name)
         plt.legend(loc="upper left")
         plt.xlabel("Time")
         plt.ylabel(variable_name)
         plt.grid(True)
-        if output_path is None:
-            output_path = os.path.join(os.getcwd(), "output", f"{variable_name}.pdf")
-        else:
-            output_path = os.path.join(output_path, f"{variable_name}.pdf")
-        output_dir = os.path.dirname(output_path)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        output_path = self._output_file(output_path, f"{variable_name}.pdf")
         plt.savefig(output_path)
 
     def quit(self):
         print(f"Quitting Simulation Service...")
         self._delete_temporary_files()
-        AMECloseCircuit(True)
+        if self.catalog is not None:
+            self.catalog.close()
+        if not self.circuits:
+            AMECloseCircuit(True)
+        for circuit_id in self.circuits.values():
+            AMESetActiveCircuit(circuit_id)
+            # closing saves the circuit, so the model's own save flags go back first
+            self.restore_saved_variables()
+            AMECloseCircuit(True)
+        self.circuits = {}
+        self.circuit_dirs = {}
         AMECloseAPI(False)
@@ -0,0 +1,215 @@
+r"""
+Capture and parse the solver's ``STDSIM_<timestamp>_<host>_<pid>_.std.log`` files.
+
+Amesim drops one of these into the working directory for every simulation.
+The service moves each new log into the run's workspace, reduces it to a few
+solver statistics (CPU time, integration steps, discontinuities, Jacobian and
+function evaluations, warnings, errors, outcome) for the run catalog, and
+keeps a bounded history: the newest logs stay as text, older ones are
+gzipped, and gzipped logs past the age limit are deleted.
+
+    python src/solver_log.py [DIR|FILE …]   → one JSON line of statistics per log
+"""
+
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from typing import Dict, Iterable, List, Set
+
+LOG_PATTERN = "STDSIM_*.std.log"
+KEEP_PLAIN = 20
+MAX_AGE_DAYS = 30
+MAX_MESSAGES = 20
+
+_CPU = re.compile(r"Total CPU time:\s*([-+0-9.eE]+)\s*s")
+_UNKNOWNS = re.compile(r"system with (\d+) unknowns")
+_COUNTER = re.compile(r"^(?:Total )?[Nn]umber of ([A-Za-z /_-]+?)\s*(?:\(.*\))?\s*[:=]\s*(\d+)\s*\.?$")
+_TABLE = re.compile(r"x-y pairs read from file (\S+)\s*:\s*(\d+)")
+_OUTCOME = re.compile(r"^(SUCCESS|FAILURE) MESSAGE:\s*(.*)$")
+_WARNING = re.compile(r"^Warning in (\S+) instance (\d+)")
+_ERROR = re.compile(r"^Fatal error in (\S+) instance (\d+)")
+
+# counter names vary between solver versions; fold them onto stable keys
+_COUNTER_KEYS = (
+    ("discontinu", "discontinuities"),
+    ("jacobian", "jacobian_evaluations"),
+    ("function", "function_evaluations"),
+    ("residual", "function_evaluations"),
+    ("step", "integration_steps"),
+)
+
+
+def _counter_key(label: str) -> str:
+    label = label.lower()
+    for fragment, key in _COUNTER_KEYS:
+        if fragment in label:
+            return key
+    return re.sub(r"[^a-z0-9]+", "_", label).strip("_")
+
+
+def _open_log(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, "r", errors="replace")
+
+
+def _add_messages(target: List[str], lines: Iterable[str], prefix: str = "") -> None:
+    for line in lines:
+        message = prefix + line
+        if message not in target and len(target) < MAX_MESSAGES:
+            target.append(message)
+
+
+def parse_log(path: str) -> Dict:
+    stats = {
+        "log": os.path.basename(path),
+        "status": "unknown",
+        "message": None,
+        "cpu_s": None,
+        "unknowns": None,
+        "warnings": 0,
+        "errors": 0,
+        "warning_messages": [],
+        "error_messages": [],
+        "tables": {},
+    }
+    # Amesim prints the detail lines first and the "Warning in …" /
+    # "Fatal error in …" header after them, so STDERR lines wait here
+    details: List[str] = []
+    with _open_log(path) as file:
+        for raw in file:
+            line = raw.strip()
+            if not line:
+                continue
+            stream, _, text = line.partition(": ") if line.startswith(("STDOUT:", "STDERR:")) else ("", "", line)
+            outcome = _OUTCOME.match(line)
+            if outcome:
+                stats["status"] = outcome.group(1).lower()
+                stats["message"] = outcome.group(2).strip()
+                continue
+            cpu, unknowns, table, counter = (
+                _CPU.search(text), _UNKNOWNS.search(text), _TABLE.search(text), _COUNTER.match(text)
+            )
+            warning, error = _WARNING.match(text), _ERROR.match(text)
+            if cpu:
+                stats["cpu_s"] = float(cpu.group(1))
+            elif unknowns:
+                stats["unknowns"] = int(unknowns.group(1))
+            elif table:
+                stats["tables"][table.group(1)] = int(table.group(2))
+            elif counter:
+                key = _counter_key(counter.group(1))
+                stats[key] = stats.get(key, 0) + int(counter.group(2))
+            elif warning or error:
+                kind = "warning" if warning else "error"
+                match = warning or error
+                stats[kind + "s"] += 1
+                _add_messages(stats[kind + "_messages"], details, f"{match.group(1)} #{match.group(2)}: ")
+                details = []
+            elif stream == "STDERR":
+                details.append(text)
+    # trailing lines ("Terminating the program.", "Initialization failed.") have no header
+    if details:
+        _add_messages(stats["error_messages" if stats["status"] == "failure" else "warning_messages"], details)
+    return stats
+
+
+def list_logs(folder: str) -> Set[str]:
+    return set(glob.glob(os.path.join(folder, LOG_PATTERN)))
+
+
+def new_logs(folder: str, before: Iterable[str]) -> List[str]:
+    # logs that appeared since the snapshot, oldest first (the name starts with its timestamp)
+    return sorted(list_logs(folder) - set(before), key=os.path.basename)
+
+
+def move_logs(paths: Iterable[str], destination: str) -> List[str]:
+    os.makedirs(destination, exist_ok=True)
+    moved = []
+    for path in paths:
+        target = os.path.join(destination, os.path.basename(path))
+        shutil.move(path, target)
+        moved.append(target)
+    return moved
+
+
+def _mtime(path: str) -> float:
+    # None once another process has rotated the file away
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+
+def _compress(path: str) -> None:
+    # gzipped next to the log and renamed into place, so a reader (or a second
+    # rotation running at the same time) never sees a half-written .gz
+    staging = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(path, "rb") as source, gzip.open(staging, "wb") as target:
+            shutil.copyfileobj(source, target)
+        shutil.copystat(path, staging)
+        os.replace(staging, path + ".gz")
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def rotate_logs(
+    folder: str,
+    keep_plain: int = KEEP_PLAIN,
+    max_age_days: float = MAX_AGE_DAYS,
+    min_age_s: float = 3600,
+) -> None:
+    # Safe to run from several processes at once (the pipeline and every service
+    # rotate the same folder): a log another rotation got to first is skipped
+    if not os.path.isdir(folder):
+        return
+    # anything newer than min_age_s may still be open by a running solver
+    settled = time.time() - min_age_s
+    dated = ((_mtime(path), path) for path in list_logs(folder))
+    plain = [path for mtime, path in sorted(item for item in dated if item[0] is not None) if mtime < settled]
+    for path in plain[:max(len(plain) - keep_plain, 0)]:
+        _compress(path)
+    cutoff = time.time() - max_age_days * 24 * 3600
+    for path in glob.glob(os.path.join(folder, LOG_PATTERN + ".gz")):
+        mtime = _mtime(path)
+        if mtime is not None and mtime < cutoff:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def summarize(stats: Iterable[Dict]) -> Dict:
+    # combined view when one run produced several logs (e.g. a failed first attempt)
+    stats = list(stats)
+    if not stats:
+        return {}
+    summary = dict(stats[-1])
+    summary["logs"] = [s["log"] for s in stats]
+    for key in ("cpu_s", "warnings", "errors", "integration_steps", "discontinuities",
+                "jacobian_evaluations", "function_evaluations"):
+        values = [s[key] for s in stats if s.get(key) is not None]
+        if values:
+            summary[key] = sum(values)
+    summary.pop("log", None)
+    return summary
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or ["."]
+    for target in targets:
+        paths = sorted(list_logs(target) | set(glob.glob(os.path.join(target, LOG_PATTERN + ".gz")))) \
+            if os.path.isdir(target) else [target]
+        for path in paths:
+            print(json.dumps(parse_log(path)))
@@ -0,0 +1,119 @@
+r"""
+Chunked publication of results while the solver is still running.
+
+The service polls the running simulation, hands every batch of new samples to
+a ``ChunkPublisher``, and the publisher forwards them to its consumers in
+fixed simulation-time windows. It can optionally hold each window back until
+the wall clock catches up (``realtime_factor`` = 1.0 is real time, 2.0 is
+twice as fast, None publishes as soon as data exists).
+
+A consumer is any callable ``consumer(time, values)``, where ``time`` is a 1-D
+array and ``values`` maps variable names to arrays of the same length.
+"""
+
+import csv
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+Consumer = Callable[[np.ndarray, Dict[str, np.ndarray]], None]
+
+
+class WallClockPacer:
+    def __init__(self, realtime_factor: float = 1.0):
+        if realtime_factor <= 0:
+            raise ValueError(f"realtime_factor must be positive, got {realtime_factor}")
+        self.realtime_factor = realtime_factor
+        self._origin = None
+
+    def wait_until(self, sim_time: float) -> None:
+        now = time.perf_counter()
+        if self._origin is None:
+            self._origin = (now, sim_time)
+            return
+        wall0, sim0 = self._origin
+        delay = wall0 + (sim_time - sim0) / self.realtime_factor - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ChunkPublisher:
+    def __init__(self, consumers: Sequence[Consumer], window_s: float, pacer: Optional[WallClockPacer] = None):
+        if window_s <= 0:
+            raise ValueError(f"window_s must be positive, got {window_s}")
+        self.consumers = list(consumers)
+        self.window_s = window_s
+        self.pacer = pacer
+        self.last_time = -np.inf
+        self.samples = 0
+        self.first_publish_wall = None
+        self._pending_t: List[np.ndarray] = []
+        self._pending_v: List[Dict[str, np.ndarray]] = []
+        self._window_end = None
+
+    def offer(self, time_values: Sequence[float], values: Dict[str, Sequence[float]], final: bool = False) -> None:
+        # Takes the full (or partial) result arrays and keeps only samples newer
+        # than anything already seen, so callers can pass cumulative reads
+        t = np.asarray(time_values, dtype=np.float64)
+        new = t > self.last_time
+        if new.any():
+            self._pending_t.append(t[new])
+            self._pending_v.append({name: np.asarray(v, dtype=np.float64)[new] for name, v in values.items()})
+            self.last_time = float(t[new][-1])
+        self._flush(final)
+
+    def _flush(self, final: bool) -> None:
+        if not self._pending_t:
+            return
+        t = np.concatenate(self._pending_t)
+        values = {name: np.concatenate([v[name] for v in self._pending_v]) for name in self._pending_v[0]}
+        if self._window_end is None:
+            self._window_end = t[0] + self.window_s
+        # publish every complete window; the newest partial window waits for more data
+        while t.size and (final or t[-1] >= self._window_end):
+            cut = t.size if final else int(np.searchsorted(t, self._window_end, side="left"))
+            if cut:
+                self._publish(t[:cut], {name: v[:cut] for name, v in values.items()})
+                t = t[cut:]
+                values = {name: v[cut:] for name, v in values.items()}
+                self._window_end += self.window_s
+            else:
+                # skip straight over empty windows
+                self._window_end += self.window_s * (np.floor((t[0] - self._window_end) / self.window_s) + 1)
+        self._pending_t = [t] if t.size else []
+        self._pending_v = [values] if t.size else []
+
+    def _publish(self, t: np.ndarray, values: Dict[str, np.ndarray]) -> None:
+        if self.pacer is not None:
+            self.pacer.wait_until(float(t[-1]))
+        if self.first_publish_wall is None:
+            self.first_publish_wall = time.perf_counter()
+        for consumer in self.consumers:
+            consumer(t, values)
+        self.samples += t.size
+
+
+class CsvChunkSink:
+    """Appends each published window to a CSV and flushes it, so a reader
+    (e.g. Unity) can tail the file while the solver runs."""
+
+    def __init__(self, path: str, variable_names: Sequence[str], float_fmt: str = "%.6f"):
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        self.path = path
+        self.variable_names = list(variable_names)
+        self.float_fmt = float_fmt
+        self._file = open(path, "w", newline="")
+        csv.writer(self._file).writerow(["time"] + self.variable_names)
+        self._file.flush()
+
+    def __call__(self, t: np.ndarray, values: Dict[str, np.ndarray]) -> None:
+        block = np.column_stack([t] + [values[name] for name in self.variable_names])
+        np.savetxt(self._file, block, fmt=self.float_fmt, delimiter=",")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,381 @@
+r"""
+Surrogate models that preview output trajectories without running Amesim.
+
+A surrogate is trained on cataloged runs of one model. Each run becomes a
+point in parameter space (e.g. veGxbinit, veGzbinit) paired with one output
+trajectory resampled onto a shared time grid. Three regressors are available,
+all plain NumPy on the CPU:
+
+• "poly" – quadratic ridge regression, uncertainty from the residual variance
+  and the leverage of the query point
+• "rbf"  – Gaussian radial-basis interpolation through every training run,
+  uncertainty from the kriging power function
+• "gp"   – Gaussian process with length scale and noise picked by marginal
+  likelihood, predictive standard deviation
+
+One linear solve serves every time sample at once, so a prediction costs a
+few microseconds per training run. ``predict_or_simulate`` returns the
+surrogate's answer, flagged approximate, when its uncertainty is low enough.
+Otherwise it falls back to a real simulation.
+
+    python src/surrogate.py train CATALOG OUTPUT MODEL.npz [--kind gp]
+    python src/surrogate.py predict MODEL.npz veGxbinit@aero_fd_6dof_body=5 …
+    python src/surrogate.py serve MODEL.npz [--port 8765] [--config CONFIG.json]   → POST /predict
+
+With ``--config`` the server runs that config with the requested parameters
+whenever the surrogate is not confident, and answers with the real
+trajectory. The run is cataloged with ``--catalog``, so it can train the next
+surrogate. Without ``--config`` such answers only carry ``confident: false``.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from resampling import interpolate
+from run_catalog import RunCatalog
+
+KINDS = ("poly", "rbf", "gp")
+DEFAULT_POINTS = 200
+MAX_RELATIVE_STD = 0.05
+RESULT_FILES = ("resampled.csv", "data.csv")
+
+
+def _poly_features(x: np.ndarray) -> np.ndarray:
+    # 1, x_i, x_i * x_j (i <= j)
+    n, d = x.shape
+    i, j = np.triu_indices(d)
+    return np.hstack((np.ones((n, 1)), x, x[:, i] * x[:, j]))
+
+
+def _sq_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    d2 = np.sum(a * a, axis=1)[:, None] + np.sum(b * b, axis=1)[None, :] - 2.0 * a @ b.T
+    return np.maximum(d2, 0.0)
+
+
+class Surrogate:
+    def __init__(self, kind: str = "gp", ridge: float = 1e-6):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown surrogate kind '{kind}'. Use one of: {', '.join(KINDS)}")
+        self.kind = kind
+        self.ridge = ridge
+        self.parameter_names: List[str] = []
+        self.output = None
+        self.time = None
+
+    def fit(self, x: np.ndarray, time_grid: np.ndarray, y: np.ndarray, parameter_names: Sequence[str], output: str) -> "Surrogate":
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if x.shape[0] != y.shape[0] or x.shape[0] < 2:
+            raise ValueError("A surrogate needs at least two runs with one trajectory each")
+        self.parameter_names, self.output = list(parameter_names), output
+        self.time = np.asarray(time_grid, dtype=np.float64)
+        # parameters and every time sample are standardized, so one kernel fits all
+        self.x_mean, self.x_scale = x.mean(axis=0), x.std(axis=0)
+        self.x_scale[self.x_scale == 0] = 1.0
+        self.y_mean, self.y_scale = y.mean(axis=0), y.std(axis=0)
+        self.y_scale[self.y_scale == 0] = 1.0
+        self.x_train = (x - self.x_mean) / self.x_scale
+        ys = (y - self.y_mean) / self.y_scale
+        if self.kind == "poly":
+            self._fit_poly(ys)
+        else:
+            self._fit_kernel(ys)
+        return self
+
+    def _fit_poly(self, ys: np.ndarray) -> None:
+        f = _poly_features(self.x_train)
+        a = f.T @ f + self.ridge * len(f) * np.eye(f.shape[1])
+        self.a_inv = np.linalg.inv(a)
+        self.coefficients = self.a_inv @ f.T @ ys
+        residual = ys - f @ self.coefficients
+        dof = max(len(f) - f.shape[1], 1)
+        self.sigma2 = float(np.sum(residual ** 2) / (dof * ys.shape[1]))
+
+    def _kernel(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.exp(-0.5 * _sq_distances(a, b) / self.length ** 2)
+
+    def _fit_kernel(self, ys: np.ndarray) -> None:
+        d2 = _sq_distances(self.x_train, self.x_train)
+        spacing = float(np.sqrt(np.median(d2[d2 > 0]))) if np.any(d2 > 0) else 1.0
+        if self.kind == "rbf":
+            candidates = [(spacing, 1e-10)]
+        else:
+            candidates = [(spacing * f, noise) for f in (0.25, 0.5, 1.0, 2.0, 4.0) for noise in (1e-8, 1e-4, 1e-2)]
+        best = None
+        n, m = ys.shape
+        for length, noise in candidates:
+            k = np.exp(-0.5 * d2 / length ** 2) + (noise + 1e-10) * np.eye(n)
+            try:
+                chol = np.linalg.cholesky(k)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, ys))
+            # amplitude has a closed-form ML estimate; the log-likelihood follows from it
+            amplitude2 = max(float(np.sum(ys * alpha)) / (n * m), 1e-12)
+            lml = -0.5 * n * m * np.log(amplitude2) - m * np.sum(np.log(np.diag(chol)))
+            if best is None or lml > best[0]:
+                best = (lml, length, noise, chol, alpha, amplitude2)
+        if best is None:
+            raise ValueError("Could not fit the kernel surrogate (training runs are degenerate)")
+        _, self.length, self.noise, self.chol, self.alpha, self.amplitude2 = best
+
+    def predict(self, parameters) -> Tuple[np.ndarray, np.ndarray]:
+        x = self._parameter_matrix(parameters)
+        xs = (x - self.x_mean) / self.x_scale
+        if self.kind == "poly":
+            f = _poly_features(xs)
+            mean = f @ self.coefficients
+            leverage = np.einsum("ij,jk,ik->i", f, self.a_inv, f)
+            variance = self.sigma2 * (1.0 + leverage)
+        else:
+            ks = self._kernel(xs, self.x_train)
+            mean = ks @ self.alpha
+            v = np.linalg.solve(self.chol, ks.T)
+            variance = self.amplitude2 * np.maximum(1.0 + self.noise - np.sum(v * v, axis=0), 0.0)
+        std = np.sqrt(variance)[:, None] * self.y_scale
+        return mean * self.y_scale + self.y_mean, np.broadcast_to(std, mean.shape)
+
+    def _parameter_matrix(self, parameters) -> np.ndarray:
+        if isinstance(parameters, dict):
+            missing = [name for name in self.parameter_names if name not in parameters]
+            if missing:
+                raise ValueError(f"Missing surrogate parameter(s): {', '.join(missing)}")
+            return np.array([[float(parameters[name]) for name in self.parameter_names]])
+        return np.atleast_2d(np.asarray(parameters, dtype=np.float64))
+
+    def relative_uncertainty(self, std: np.ndarray) -> float:
+        # largest standard deviation relative to the output's spread in the training runs
+        spread = float(np.max(self.y_mean + self.y_scale) - np.min(self.y_mean - self.y_scale)) or 1.0
+        return float(np.max(std)) / spread
+
+    def save(self, path: str) -> None:
+        state = {key: value for key, value in vars(self).items() if isinstance(value, np.ndarray)}
+        meta = {key: value for key, value in vars(self).items() if not isinstance(value, np.ndarray)}
+        np.savez(path, meta=json.dumps(meta), **state)
+
+    @classmethod
+    def load(cls, path: str) -> "Surrogate":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            surrogate = cls(meta["kind"], meta["ridge"])
+            vars(surrogate).update(meta)
+            vars(surrogate).update({key: data[key] for key in data.files if key != "meta"})
+        return surrogate
+
+
+def _read_trajectory(path: str, output: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    with open(path, "r", newline="") as file:
+        rows = [row for row in csv.reader(file) if row and not row[0].startswith("#")]
+    if not rows or output not in rows[0]:
+        return None
+    column = rows[0].index(output)
+    data = np.array([[float(row[0]), float(row[column])] for row in rows[1:]])
+    return (data[:, 0], data[:, 1]) if data.size else None
+
+
+def training_set(
+    catalog: RunCatalog,
+    output: str,
+    parameter_names: Optional[Sequence[str]] = None,
+    points: int = DEFAULT_POINTS,
+    model_file: Optional[str] = None,
+    limit: int = 100000,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    _, x, grid, y, names = cataloged_trajectories(catalog, output, parameter_names, points, model_file, limit)
+    return x, grid, y, names
+
+
+def cataloged_trajectories(
+    catalog: RunCatalog,
+    output: str,
+    parameter_names: Optional[Sequence[str]] = None,
+    points: int = DEFAULT_POINTS,
+    model_file: Optional[str] = None,
+    limit: int = 100000,
+) -> Tuple[List[int], np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    # run ids, parameter matrix, shared time grid, trajectories on that grid, parameter names
+    runs, run_ids = [], []
+    for row in catalog.query(limit=limit):
+        if model_file and row["model_file"] != model_file:
+            continue
+        paths = {os.path.basename(path): path for path in catalog.artifacts(row["id"])}
+        trajectory = None
+        for name in RESULT_FILES:
+            if name in paths and os.path.isfile(paths[name]):
+                trajectory = _read_trajectory(paths[name], output)
+                if trajectory is not None:
+                    break
+        if trajectory is not None:
+            runs.append((catalog.parameters(row["id"]), trajectory))
+            run_ids.append(row["id"])
+    if len(runs) < 2:
+        raise ValueError(f"Need at least two cataloged runs with '{output}', found {len(runs)}")
+
+    if parameter_names is None:
+        # every numeric parameter that all runs set and that actually varies
+        common = set.intersection(*(set(params) for params, _ in runs))
+        parameter_names = []
+        for name in sorted(common):
+            try:
+                values = {float(params[name]) for params, _ in runs}
+            except ValueError:
+                continue
+            if len(values) > 1:
+                parameter_names.append(name)
+        if not parameter_names:
+            raise ValueError("Cataloged runs do not vary any numeric parameter")
+    x = np.array([[float(params[name]) for name in parameter_names] for params, _ in runs])
+
+    # shared grid over the time span every run covers
+    t0 = max(t[0] for _, (t, _) in runs)
+    t1 = min(t[-1] for _, (t, _) in runs)
+    grid = np.linspace(t0, t1, points)
+    y = np.array([interpolate(t, v, grid) for _, (t, v) in runs])
+    return run_ids, x, grid, y, list(parameter_names)
+
+
+def train_from_catalog(catalog: RunCatalog, output: str, kind: str = "gp", **options) -> Surrogate:
+    x, grid, y, names = training_set(catalog, output, **options)
+    return Surrogate(kind).fit(x, grid, y, names, output)
+
+
+def predict_or_simulate(
+    surrogate: Surrogate,
+    parameters: Dict[str, float],
+    max_relative_std: float = MAX_RELATIVE_STD,
+    simulate: Optional[Callable[[Dict[str, float]], Tuple[Sequence[float], Sequence[float]]]] = None,
+) -> dict:
+    started = time.perf_counter()
+    mean, std = surrogate.predict(parameters)
+    uncertainty = surrogate.relative_uncertainty(std)
+    result = {
+        "output": surrogate.output,
+        "time": surrogate.time.tolist(),
+        "values": mean[0].tolist(),
+        "std": std[0].tolist(),
+        "relative_uncertainty": uncertainty,
+        "approximate": True,
+        "confident": uncertainty <= max_relative_std,
+        "elapsed_ms": (time.perf_counter() - started) * 1e3,
+    }
+    if not result["confident"] and simulate is not None:
+        time_values, values = simulate(parameters)
+        result.update(time=list(time_values), values=list(values), std=None, approximate=False)
+    return result
+
+
+def simulation_fallback(
+    config_file: str,
+    output: str,
+    catalog_path: Optional[str] = None,
+) -> Callable[[Dict[str, float]], Tuple[Sequence[float], Sequence[float]]]:
+    # A real run of config_file with the requested parameters, read back from its
+    # data.csv. Imported here: simulating needs Amesim, predicting does not.
+    from simulation_service import SimulationService
+
+    config_file = os.path.abspath(config_file)
+    with open(config_file, "r") as file:
+        base = json.load(file)
+
+    def simulate(parameters: Dict[str, float]) -> Tuple[Sequence[float], Sequence[float]]:
+        name = f"surrogate_{int(time.time() * 1000)}"
+        data = {key: value for key, value in base.items()
+                if key not in ("runs", "sweep", "sensitivity", "optimize", "dispersion", "parallel_circuits")}
+        data["outputs"] = list(dict.fromkeys(list(data.get("outputs", [])) + [output]))
+        data["generate_output_files"] = True
+        data["runs"] = [{"name": name, "parameters": dict(parameters)}]
+        # next to the original so its relative model and table paths still resolve
+        run_config = os.path.join(os.path.dirname(config_file), f".{name}.json")
+        with open(run_config, "w") as file:
+            json.dump(data, file)
+        try:
+            SimulationService(catalog_path).run_from_config_file(run_config)
+        finally:
+            os.remove(run_config)
+        trajectory = _read_trajectory(os.path.join(os.getcwd(), "output", name, "data.csv"), output)
+        if trajectory is None:
+            raise RuntimeError(f"Simulation run '{name}' produced no '{output}'")
+        return trajectory[0].tolist(), trajectory[1].tolist()
+
+    return simulate
+
+
+def serve(
+    surrogate: Surrogate,
+    port: int = 8765,
+    max_relative_std: float = MAX_RELATIVE_STD,
+    simulate: Optional[Callable[[Dict[str, float]], Tuple[Sequence[float], Sequence[float]]]] = None,
+) -> None:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/predict":
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                result = predict_or_simulate(surrogate, body.get("parameters", body), max_relative_std, simulate)
+                status, payload = 200, result
+            except (ValueError, TypeError) as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                # the fallback simulation failed; the client can still ask again
+                status, payload = 500, {"error": f"Simulation failed: {e}"}
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    fallback = "simulating when unsure" if simulate is not None else "no simulation fallback"
+    print(f"Serving surrogate for {surrogate.output} on port {port} ({fallback})")
+    HTTPServer(("", port), Handler).serve_forever()
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Train and serve trajectory surrogates")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train")
+    train.add_argument("catalog")
+    train.add_argument("output")
+    train.add_argument("model")
+    train.add_argument("--kind", choices=KINDS, default="gp")
+    train.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    predict = commands.add_parser("predict")
+    predict.add_argument("model")
+    predict.add_argument("parameters", nargs="+", help="name=value")
+    predict.add_argument("--max-relative-std", type=float, default=MAX_RELATIVE_STD)
+    server = commands.add_parser("serve")
+    server.add_argument("model")
+    server.add_argument("--port", type=int, default=8765)
+    server.add_argument("--max-relative-std", type=float, default=MAX_RELATIVE_STD)
+    server.add_argument("--config", help="simulate this config with the requested parameters when unsure")
+    server.add_argument("--catalog", help="catalog the fallback runs here")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        catalog = RunCatalog(args.catalog)
+        surrogate = train_from_catalog(catalog, args.output, args.kind, points=args.points)
+        catalog.close()
+        surrogate.save(args.model)
+        print(f"Trained {args.kind} surrogate for {args.output} on {len(surrogate.x_train)} runs "
+              f"over {', '.join(surrogate.parameter_names)}")
+    elif args.command == "predict":
+        parameters = dict(item.split("=", 1) for item in args.parameters)
+        print(json.dumps(predict_or_simulate(Surrogate.load(args.model), parameters, args.max_relative_std)))
+    else:
+        surrogate = Surrogate.load(args.model)
+        simulate = simulation_fallback(args.config, surrogate.output, args.catalog) if args.config else None
+        serve(surrogate, args.port, args.max_relative_std, simulate)
+
+
+if __name__ == "__main__":
+    _main()
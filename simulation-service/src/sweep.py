@@ -0,0 +1,279 @@
+r"""
+Sweep templates: one config that expands lazily into many concrete runs.
+
+A config with a ``"sweep"`` block may give any of its ``parameters`` as a
+spec instead of a value:
+
+• a list – discrete levels, e.g. ``[4, 5, 6]``
+• a range – ``{"range": [4, 6], "steps": 5}`` or ``{"range": [4, 6], "step": 0.5}``
+• a distribution – ``{"distribution": "uniform", "low": 4, "high": 6}``, also
+  ``loguniform`` (low, high), ``normal`` (mean, std) and ``triangular``
+  (low, mode, high)
+
+``"sweep": {"method": "factorial" | "lhs" | "sobol", "samples": N, "seed": 0}``
+picks the design. Factorial takes every combination of levels; a
+distribution there needs ``"levels": n`` and contributes its n quantiles.
+Latin hypercube and Sobol map each sample's unit coordinates through the
+spec: lists pick a level, ranges are uniform (snapped to ``step`` when
+given) and distributions use their inverse CDF.
+
+Everything is a generator. Factorial designs walk the level product, Latin
+hypercube strata come from a keyed permutation evaluated per index (a Feistel
+network with cycle walking), and Sobol points come from Gray-code updates. A
+million-point design never exists in memory. ``skip_cached`` drops runs whose
+resolved config the run catalog already holds, before anything is scheduled.
+
+    python src/sweep.py TEMPLATE.json [--limit 10] [--catalog DB]
+    python src/sweep.py TEMPLATE.json --split DIR --per-file 100   → concrete multi-run configs
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+from statistics import NormalDist
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from run_catalog import RunCatalog, artifact_names, config_hash
+from run_config import iter_runs
+
+METHODS = ("factorial", "lhs", "sobol")
+DISTRIBUTIONS = ("uniform", "loguniform", "normal", "triangular")
+DEFAULT_NAME = "sweep_{index:06d}"
+BLOCK = 4096
+
+# Sobol direction numbers (Joe & Kuo) for dimensions 2…: (degree, coefficients, initial m values)
+SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+)
+SOBOL_BITS = 32
+
+
+def is_spec(value) -> bool:
+    return isinstance(value, list) or (isinstance(value, dict) and ("range" in value or "distribution" in value))
+
+
+def sweep_parameters(data: dict) -> Dict[str, object]:
+    return {name: value for name, value in data.get("parameters", {}).items() if is_spec(value)}
+
+
+def _levels(name: str, spec) -> list:
+    if isinstance(spec, list):
+        if not spec:
+            raise RuntimeError(f"Error: sweep parameter '{name}' has an empty list")
+        return spec
+    if "range" in spec:
+        low, high = (float(v) for v in spec["range"])
+        if "step" in spec:
+            step = float(spec["step"])
+            return [low + i * step for i in range(int(math.floor((high - low) / step + 1e-9)) + 1)]
+        if "steps" in spec:
+            return np.linspace(low, high, int(spec["steps"])).tolist()
+        raise RuntimeError(f"Error: range for '{name}' needs 'steps' or 'step' in a factorial sweep")
+    if "levels" not in spec:
+        raise RuntimeError(f"Error: distribution for '{name}' needs 'levels' in a factorial sweep")
+    n = int(spec["levels"])
+    return [_from_unit(name, spec, (k + 0.5) / n) for k in range(n)]
+
+
+def _from_unit(name: str, spec, u: float):
+    # maps a unit coordinate in [0, 1) onto the parameter's values
+    if isinstance(spec, list):
+        return spec[min(int(u * len(spec)), len(spec) - 1)]
+    if "range" in spec:
+        low, high = (float(v) for v in spec["range"])
+        if "step" in spec:
+            levels = _levels(name, spec)
+            return levels[min(int(u * len(levels)), len(levels) - 1)]
+        return low + u * (high - low)
+    kind = spec["distribution"]
+    if kind == "uniform":
+        return float(spec["low"]) + u * (float(spec["high"]) - float(spec["low"]))
+    if kind == "loguniform":
+        low, high = math.log(float(spec["low"])), math.log(float(spec["high"]))
+        return math.exp(low + u * (high - low))
+    if kind == "normal":
+        return NormalDist(float(spec["mean"]), float(spec["std"])).inv_cdf(min(max(u, 1e-12), 1 - 1e-12))
+    if kind == "triangular":
+        low, mode, high = float(spec["low"]), float(spec["mode"]), float(spec["high"])
+        split = (mode - low) / (high - low)
+        if u < split:
+            return low + math.sqrt(u * (high - low) * (mode - low))
+        return high - math.sqrt((1 - u) * (high - low) * (high - mode))
+    raise RuntimeError(f"Error: unknown distribution '{kind}' for '{name}'. Use one of: {', '.join(DISTRIBUTIONS)}")
+
+
+def _permute(index: np.ndarray, n: int, key: int) -> np.ndarray:
+    # keyed bijection on [0, n): a 4-round Feistel network on the next even power
+    # of two, re-applied to any result that lands outside [0, n) (cycle walking)
+    half = max((max(n - 1, 1).bit_length() + 1) // 2, 1)
+    mask = (1 << half) - 1
+    keys = [(key * 0x9E3779B1 + r * 0x85EBCA77) & 0xFFFFFFFF for r in range(4)]
+
+    def encrypt(x: np.ndarray) -> np.ndarray:
+        left, right = x >> half, x & mask
+        for k in keys:
+            f = (right * 0x2C1B3C6D + k) & 0xFFFFFFFF
+            f = ((f ^ (f >> 15)) * 0x297A2D39) & 0xFFFFFFFF
+            left, right = right, left ^ ((f ^ (f >> 12)) & mask)
+        return (left << half) | right
+
+    x = encrypt(index.astype(np.uint64))
+    outside = x >= n
+    while outside.any():
+        x[outside] = encrypt(x[outside])
+        outside = x >= n
+    return x.astype(np.int64)
+
+
+def latin_hypercube(samples: int, dimensions: int, seed: int = 0) -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    keys = rng.integers(1, 2 ** 31, size=dimensions)
+    for start in range(0, samples, BLOCK):
+        index = np.arange(start, min(start + BLOCK, samples))
+        strata = np.column_stack([_permute(index, samples, int(key)) for key in keys])
+        # one point somewhere inside each stratum
+        yield from (strata + rng.random(strata.shape)) / samples
+
+
+def _sobol_directions(dimensions: int) -> np.ndarray:
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise RuntimeError(f"Error: Sobol sweeps support up to {len(SOBOL_DIRECTIONS) + 1} parameters; use 'lhs'")
+    v = np.zeros((dimensions, SOBOL_BITS), dtype=np.uint64)
+    v[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    for d in range(1, dimensions):
+        degree, a, m = SOBOL_DIRECTIONS[d - 1]
+        m = list(m)
+        for k in range(degree, SOBOL_BITS):
+            value = m[k - degree] ^ (m[k - degree] << degree)
+            for j in range(1, degree):
+                if (a >> (degree - 1 - j)) & 1:
+                    value ^= m[k - j] << j
+            m.append(value)
+        v[d] = [m[k] << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    return v
+
+
+def sobol(samples: int, dimensions: int, seed: int = 0) -> Iterator[np.ndarray]:
+    # Gray-code order; the seed draws a random digital shift, so the first point is not all zeros
+    v = _sobol_directions(dimensions)
+    shift = np.random.default_rng(seed).integers(0, 2 ** SOBOL_BITS, size=dimensions, dtype=np.uint64)
+    x = np.zeros(dimensions, dtype=np.uint64)
+    scale = float(2 ** SOBOL_BITS)
+    for i in range(samples):
+        yield (x ^ shift).astype(np.float64) / scale
+        x ^= v[:, (~i & (i + 1)).bit_length() - 1]
+
+
+def design_size(data: dict) -> int:
+    settings = data.get("sweep") or {}
+    specs = sweep_parameters(data)
+    if settings.get("method", "factorial") == "factorial":
+        return math.prod(len(_levels(name, spec)) for name, spec in specs.items())
+    return int(settings["samples"])
+
+
+def expand(data: dict) -> Iterator[dict]:
+    # run overrides ({"name", "parameters"}) in design order, one at a time
+    settings = data.get("sweep") or {}
+    method = settings.get("method", "factorial")
+    if method not in METHODS:
+        raise RuntimeError(f"Error: unknown sweep method '{method}'. Use one of: {', '.join(METHODS)}")
+    specs = sweep_parameters(data)
+    if not specs:
+        raise RuntimeError("Error: a sweep needs at least one parameter given as a list, range or distribution")
+    names = list(specs)
+    pattern = settings.get("name", DEFAULT_NAME)
+    if method == "factorial":
+        points = itertools.product(*(_levels(name, specs[name]) for name in names))
+    else:
+        if "samples" not in settings:
+            raise RuntimeError(f"Error: a '{method}' sweep needs 'samples'")
+        sampler = latin_hypercube if method == "lhs" else sobol
+        units = sampler(int(settings["samples"]), len(names), int(settings.get("seed", 0)))
+        points = ([_from_unit(name, specs[name], float(u)) for name, u in zip(names, unit)] for unit in units)
+    for index, values in enumerate(points, start=1):
+        yield {"name": pattern.format(index=index), "parameters": dict(zip(names, values))}
+
+
+def skip_cached(
+    runs: Iterator[dict],
+    catalog: Optional[RunCatalog],
+    config_dir: str,
+    on_cached: Optional[Callable[[dict, object], None]] = None,
+) -> Iterator[dict]:
+    # resolved runs the catalog can already serve are dropped; on_cached(run, row) hears about each
+    for run in runs:
+        cached = catalog.find_cached(config_hash(run, config_dir), artifact_names(run)) if catalog is not None else None
+        if cached is not None:
+            if on_cached is not None:
+                on_cached(run, cached)
+            continue
+        yield run
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Expand a sweep template into concrete runs")
+    parser.add_argument("template")
+    parser.add_argument("--catalog", help="skip runs this run catalog already holds")
+    parser.add_argument("--limit", type=int, help="stop after this many runs")
+    parser.add_argument("--split", metavar="DIR", help="write concrete multi-run configs here instead of printing")
+    parser.add_argument("--per-file", type=int, default=100, help="runs per config written with --split")
+    args = parser.parse_args()
+
+    with open(args.template, "r") as file:
+        data = json.load(file)
+    config_dir = os.path.dirname(os.path.abspath(args.template))
+    catalog = RunCatalog(args.catalog) if args.catalog else None
+    skipped = []
+    runs = itertools.islice(skip_cached(iter_runs(data, expand(data)), catalog, config_dir, lambda run, row: skipped.append(run["name"])), args.limit)
+    if not args.split:
+        for run in runs:
+            print(json.dumps({"name": run["name"], "parameters": run["parameters"]}))
+    else:
+        os.makedirs(args.split, exist_ok=True)
+        shared = {key: value for key, value in data.items() if key != "sweep"}
+        # model and table paths stay relative to the template's folder
+        shared["model_file"] = os.path.relpath(os.path.join(config_dir, data["model_file"]), args.split)
+        # new table dicts: the template's own still resolve against config_dir for the catalog lookup
+        shared["time_series_data"] = {
+            name: {key: os.path.relpath(os.path.join(config_dir, value), args.split) if key in ("file", "stages") else value
+                   for key, value in table.items()}
+            for name, table in data.get("time_series_data", {}).items()
+        }
+        shared["parameters"] = {k: v for k, v in data.get("parameters", {}).items() if not is_spec(v)}
+        stem = os.path.splitext(os.path.basename(args.template))[0]
+        for part, chunk in enumerate(iter(lambda: list(itertools.islice(runs, args.per_file)), []), start=1):
+            config = {**shared, "runs": [{"name": run["name"], "parameters": {
+                name: run["parameters"][name] for name in sweep_parameters(data)}} for run in chunk]}
+            with open(os.path.join(args.split, f"{stem}_{part:04d}.json"), "w") as file:
+                json.dump(config, file, indent=2)
+    if catalog is not None:
+        print(f"Skipped {len(skipped)} cataloged run(s)")
+        catalog.close()
+
+
+if __name__ == "__main__":
+    _main()
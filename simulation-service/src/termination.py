@@ -0,0 +1,108 @@
+r"""
+Early termination: stop a run once its outcome is decided.
+
+A run with ``"terminate"`` rules is polled while the solver runs. Each poll
+hands the new samples to a ``TerminationMonitor``. The first rule that holds
+stops the solver with ``AMEStopSimulation``, and the results up to that point
+are kept like those of any finished run.
+
+    "terminate": [
+        {"variable": "altitude@aero_fd_6dof_body", "below": 0, "reason": "crashed"},
+        {"variable": "eulerangles_1@aero_fd_6dof_body", "abs_above": 90, "for_s": 0.5,
+         "reason": "departed controlled flight"}
+    ],
+    "terminate_poll_s": 0.2
+
+A rule names one variable and one condition: ``below``, ``above`` or
+``abs_above``. ``for_s`` makes the condition hold that long without a break
+before the run is stopped, so brief excursions are ignored. A rule may give
+its own ``reason``. The monitor is a streaming consumer. It checks each new
+chunk in one array pass per rule, and a violation that spans two polls is
+carried over.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+CONDITIONS = ("below", "above", "abs_above")
+DEFAULT_POLL_S = 0.2
+
+
+def parse_rules(rules) -> List[dict]:
+    if isinstance(rules, dict):
+        rules = [rules]
+    if not isinstance(rules, list) or not rules:
+        raise RuntimeError("Error: 'terminate' must be a non-empty list of rules in the JSON config file")
+    parsed = []
+    for i, rule in enumerate(rules):
+        conditions = [name for name in CONDITIONS if name in rule]
+        if "variable" not in rule or len(conditions) != 1:
+            raise RuntimeError(f"Error: termination rule {i + 1} needs a 'variable' and one of: {', '.join(CONDITIONS)}")
+        condition = conditions[0]
+        parsed.append({
+            "variable": rule["variable"],
+            "condition": condition,
+            "threshold": float(rule[condition]),
+            "for_s": float(rule.get("for_s", 0.0)),
+            "reason": rule.get("reason", f"{rule['variable']} {condition.replace('_', ' ')} {rule[condition]}"),
+        })
+    return parsed
+
+
+def _violates(condition: str, values: np.ndarray, threshold: float) -> np.ndarray:
+    if condition == "below":
+        return values < threshold
+    if condition == "above":
+        return values > threshold
+    return np.abs(values) > threshold
+
+
+class TerminationMonitor:
+    def __init__(self, rules):
+        self.rules = parse_rules(rules)
+        self.variables = list(dict.fromkeys(rule["variable"] for rule in self.rules))
+        # per rule: time the current unbroken violation started, or None
+        self.since: List[Optional[float]] = [None] * len(self.rules)
+        self.last_time = None
+        self.triggered = None
+
+    def __call__(self, t: np.ndarray, values: Dict[str, np.ndarray]) -> None:
+        if not len(t):
+            return
+        self.last_time = float(t[-1])
+        if self.triggered is not None:
+            return
+        first = None
+        for i, rule in enumerate(self.rules):
+            v = np.asarray(values[rule["variable"]], dtype=np.float64)
+            hit = _violates(rule["condition"], v, rule["threshold"])
+            # index of the sample each violation streak started at; -1 = before this chunk
+            started = hit & ~np.concatenate(([self.since[i] is not None], hit[:-1]))
+            start_index = np.maximum.accumulate(np.where(started, np.arange(len(t)), -1))
+            carried = np.nan if self.since[i] is None else self.since[i]
+            start_time = np.where(start_index >= 0, t[np.maximum(start_index, 0)], carried)
+            decided = np.flatnonzero(hit & (t - start_time >= rule["for_s"]))
+            if decided.size and (first is None or t[decided[0]] < first[0]):
+                first = (float(t[decided[0]]), float(v[decided[0]]), rule)
+            self.since[i] = float(start_time[-1]) if hit[-1] else None
+        if first is not None:
+            time_s, value, rule = first
+            self.triggered = {
+                "reason": rule["reason"],
+                "variable": rule["variable"],
+                "condition": rule["condition"],
+                "threshold": rule["threshold"],
+                "time_s": time_s,
+                "value": value,
+            }
+
+    def summary(self) -> Optional[dict]:
+        # the solver stops a poll after the decision, so results run on a little past time_s
+        if self.triggered is None:
+            return None
+        return {**self.triggered, "stopped_at_s": self.last_time}
+
+
+def poll_interval(runs: Sequence[dict]) -> float:
+    return min(float(run.get("terminate_poll_s", DEFAULT_POLL_S)) for run in runs)
@@ -0,0 +1,144 @@
+r"""
+Per-job workspaces, so concurrent jobs never write to the same files.
+
+Each job gets its own directory (optionally on tmpfs) with an ``out`` tree for
+results and a ``scratch`` directory for temporary tables. Nothing a job writes
+is visible outside the workspace until ``promote()``, which moves every
+finished file into the destination with an atomic rename, so readers (Unity,
+the next pipeline stage) only ever see complete files. Afterwards the
+workspace is deleted or kept according to its retention policy, and
+``prune_workspaces`` trims the kept ones by age and count. A kept workspace
+is marked closed first. The pruner only touches marked ones, so a workspace
+that another process is still writing is never removed, however long its
+solve runs.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import List, Optional
+
+RETENTION = ("never", "failed", "always")
+DEFAULT_ROOT = os.path.join("output", ".jobs")
+TMPFS_ROOT = "/dev/shm"
+# written into a workspace when its job is done with it; only these are pruned
+CLOSED_MARKER = ".closed"
+
+
+def _workspace_root(root: Optional[str], tmpfs: bool) -> str:
+    if tmpfs:
+        if os.path.isdir(TMPFS_ROOT):
+            return os.path.join(TMPFS_ROOT, "amesim-jobs")
+        print(f"Warning: {TMPFS_ROOT} not available, using {tempfile.gettempdir()} for job workspaces")
+        return os.path.join(tempfile.gettempdir(), "amesim-jobs")
+    return os.path.abspath(root or DEFAULT_ROOT)
+
+
+def atomic_move(source: str, target: str) -> None:
+    target_dir = os.path.dirname(target)
+    os.makedirs(target_dir, exist_ok=True)
+    try:
+        os.replace(source, target)
+    except OSError:
+        # different filesystem (e.g. tmpfs → disk): copy next to the target, then rename
+        staging = os.path.join(target_dir, f".{os.path.basename(target)}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            shutil.copy2(source, staging)
+            os.replace(staging, target)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        os.remove(source)
+
+
+class JobWorkspace:
+    def __init__(
+        self,
+        job_id: str = None,
+        root: str = None,
+        tmpfs: bool = False,
+        retention: str = "failed",
+        label: str = None,
+    ):
+        if retention not in RETENTION:
+            raise ValueError(f"Unknown retention '{retention}'. Use one of: {', '.join(RETENTION)}")
+        self.job_id = job_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        if label:
+            self.job_id = f"{label}-{self.job_id}"
+        self.retention = retention
+        self.root = _workspace_root(root, tmpfs)
+        self.path = os.path.join(self.root, self.job_id)
+        self.output_dir = os.path.join(self.path, "out")
+        self.scratch_dir = os.path.join(self.path, "scratch")
+        # exist_ok=False: two jobs must never share a directory
+        os.makedirs(self.path, exist_ok=False)
+        os.makedirs(self.output_dir)
+        os.makedirs(self.scratch_dir)
+        self.closed = False
+
+    def output_file(self, *parts: str) -> str:
+        path = os.path.join(self.output_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def output_subdir(self, name: str) -> str:
+        path = os.path.join(self.output_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def scratch_file(self, name: str) -> str:
+        return os.path.join(self.scratch_dir, name)
+
+    def promote(self, destination: str, subdir: str = "") -> List[str]:
+        # relative layout under out/ is kept, e.g. out/run_001/data.csv → destination/run_001/data.csv;
+        # subdir promotes only that part of out/
+        source_root = os.path.join(self.output_dir, subdir)
+        promoted = []
+        for folder, _, files in os.walk(source_root):
+            for name in sorted(files):
+                source = os.path.join(folder, name)
+                target = os.path.join(destination, os.path.relpath(source, source_root))
+                atomic_move(source, target)
+                promoted.append(target)
+        return promoted
+
+    def close(self, failed: bool = False) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.retention == "always" or (failed and self.retention == "failed"):
+            print(f"Keeping job workspace {self.path}")
+            open(os.path.join(self.path, CLOSED_MARKER), "w").close()
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(failed=exc_type is not None)
+
+
+def prune_workspaces(root: str = None, max_age_s: float = 7 * 24 * 3600, max_count: int = 20, tmpfs: bool = False) -> int:
+    root = _workspace_root(root, tmpfs)
+    if not os.path.isdir(root):
+        return 0
+    # workspaces without the marker belong to running jobs (or crashed ones) and are left alone
+    entries = []
+    for name in os.listdir(root):
+        try:
+            entries.append((os.path.getmtime(os.path.join(root, name, CLOSED_MARKER)), os.path.join(root, name)))
+        except OSError:
+            continue
+    entries.sort()
+    now = time.time()
+    # oldest first: anything past the age limit, then the excess over max_count
+    excess = max(len(entries) - max_count, 0)
+    removed = 0
+    for i, (closed, path) in enumerate(entries):
+        if i < excess or now - closed > max_age_s:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,88 @@
+r"""
+Polling a running simulation must only read the samples added since the last
+poll, whether the results file can be mapped or the API has to be used.
+
+    python -m unittest discover simulation-service/tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import simulation_service  # noqa: E402
+from results_reader import NAMES_SUFFIX, write_results  # noqa: E402
+from simulation_service import SimulationService, _partial_reader  # noqa: E402
+
+CIRCUIT = "plane(1)"
+SAVED = ["x@mass", "v@mass", "altitude@body"]
+
+
+class GrowingResults:
+    # a results file that gains ten samples per grow(); the API reads it whole
+    def __init__(self, folder: str):
+        self.path = os.path.join(folder, "plane_.results")
+        self.samples = 0
+        self.api_reads = 0
+
+    def grow(self) -> None:
+        self.samples += 10
+        t = [i * 0.1 for i in range(self.samples)]
+        write_results(self.path, t, {name: [(k + 1) * x for x in t] for k, name in enumerate(SAVED)}, [4, 7, 9])
+        os.remove(self.path + NAMES_SUFFIX)
+
+    def values(self, name, dataset=None):
+        self.api_reads += 1
+        k = SAVED.index(name)
+        return tuple((i * 0.1, (k + 1) * i * 0.1) for i in range(self.samples))
+
+
+class PartialReadTest(unittest.TestCase):
+    def _poll(self, saved):
+        with tempfile.TemporaryDirectory() as folder:
+            results = GrowingResults(folder)
+            service, reader, reads = SimulationService.__new__(SimulationService), _partial_reader(), []
+            service.results_file = lambda: results.path
+            service._saved_names = lambda: list(saved)
+            with mock.patch.multiple(simulation_service, create=True, AMEGetVariableValues=results.values):
+                for _ in range(3):
+                    results.grow()
+                    reads.append(service._read_partial_values(["altitude@body", "x@mass"], reader))
+                results.api_reads = 0
+                reads.append(service._read_partial_values(["altitude@body", "x@mass"], reader))
+            return reads, reader, results.api_reads
+
+    def test_mapped_reads_only_new_samples(self):
+        reads, reader, api_reads = self._poll(SAVED)
+        self.assertTrue(reader["results"])
+        self.assertEqual([len(t) for t, _ in reads], [10, 10, 10, 0])
+        t, values = reads[1]
+        self.assertAlmostEqual(t[0], 1.0)
+        self.assertAlmostEqual(values["altitude@body"][0], 3.0)
+        self.assertAlmostEqual(values["x@mass"][-1], 1.9)
+        # once mapped, the API is no longer read
+        self.assertEqual(api_reads, 0)
+
+    def test_mismatched_columns_stay_on_the_api(self):
+        # saved variables listed in the wrong order: the values disagree with the API
+        reads, reader, api_reads = self._poll(list(reversed(SAVED)))
+        self.assertIs(reader["results"], False)
+        self.assertEqual([len(t) for t, _ in reads], [10, 10, 10, 0])
+        self.assertAlmostEqual(reads[2][1]["altitude@body"][0], 6.0)
+        self.assertEqual(api_reads, 2)
+
+    def test_api_fallback_reads_only_new_samples(self):
+        # a variable list that does not match the header keeps the reads on the API
+        reads, reader, api_reads = self._poll(SAVED[:2])
+        self.assertIsNone(reader["results"])
+        self.assertEqual([len(t) for t, _ in reads], [10, 10, 10, 0])
+        self.assertEqual(reader["offset"], 30)
+        self.assertAlmostEqual(reads[2][1]["altitude@body"][0], 6.0)
+        self.assertEqual(api_reads, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+r"""
+Round trip through the synthetic writer: what write_results lays down,
+ResultsFile and load_results must read back by name and by column position.
+
+    python -m unittest discover simulation-service/tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from results_reader import NAMES_SUFFIX, ResultsFile, load_results, results_path, write_results  # noqa: E402
+
+TIME = [0.0, 0.5, 1.0, 1.5]
+COLUMNS = {
+    "x@mass": [0.0, 1.0, 2.0, 3.0],
+    "v@mass": [10.0, 11.0, 12.0, 13.0],
+    "altitude@body": [100.0, 99.0, 97.0, 94.0],
+}
+
+
+class ResultsRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = results_path(self.folder.name, "plane")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_all_variables_by_name(self):
+        write_results(self.path, TIME, COLUMNS)
+        results = ResultsFile(self.path)
+        self.assertEqual(results.names, list(COLUMNS))
+        np.testing.assert_array_equal(results.model_indices, [1, 2, 3])
+        time_values, values = load_results(self.path, ["altitude@body", "x@mass"])
+        np.testing.assert_array_equal(time_values, TIME)
+        np.testing.assert_array_equal(values["altitude@body"], COLUMNS["altitude@body"])
+        np.testing.assert_array_equal(values["x@mass"], COLUMNS["x@mass"])
+
+    def test_subset_keeps_model_indices(self):
+        # a negative count in the header, followed by the saved variables' model indices
+        write_results(self.path, TIME, COLUMNS, model_indices=[4, 9, 12])
+        with open(self.path, "rb") as file:
+            self.assertEqual(int(np.frombuffer(file.read(4), dtype="<i4")[0]), -3)
+        results = ResultsFile(self.path)
+        np.testing.assert_array_equal(results.model_indices, [4, 9, 12])
+        _, values = results.read(["v@mass"])
+        np.testing.assert_array_equal(values["v@mass"], COLUMNS["v@mass"])
+
+    def test_column_positions_without_sidecar(self):
+        write_results(self.path, TIME, COLUMNS, model_indices=[4, 9, 12])
+        os.remove(self.path + NAMES_SUFFIX)
+        results = ResultsFile(self.path)
+        self.assertIsNone(results.names)
+        _, values = results.read([0, 2])
+        np.testing.assert_array_equal(values[0], COLUMNS["x@mass"])
+        np.testing.assert_array_equal(values[2], COLUMNS["altitude@body"])
+        with self.assertRaises(ValueError):
+            results.read(["x@mass"])
+        with self.assertRaises(ValueError):
+            results.read([3])
+
+    def test_explicit_names_override_sidecar(self):
+        write_results(self.path, TIME, COLUMNS)
+        _, values = load_results(self.path, ["c"], names=["a", "b", "c"])
+        np.testing.assert_array_equal(values["c"], COLUMNS["altitude@body"])
+        with self.assertRaises(ValueError):
+            ResultsFile(self.path, names=["a", "b"])
+
+    def test_tail_and_partial_record(self):
+        write_results(self.path, TIME, COLUMNS)
+        # half a record, as a solver still writing leaves it
+        with open(self.path, "ab") as file:
+            file.write(np.zeros(2, dtype="<f8").tobytes())
+        time_values, values = ResultsFile(self.path).read(["v@mass"], start_time=0.5)
+        np.testing.assert_array_equal(time_values, [1.0, 1.5])
+        np.testing.assert_array_equal(values["v@mass"], [12.0, 13.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
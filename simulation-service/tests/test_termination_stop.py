@@ -0,0 +1,106 @@
+r"""
+A run stopped by a termination rule must end like any other run, although
+AMEWaitForSimulationEnd raises once a simulation has been stopped.
+
+    python -m unittest discover simulation-service/tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import simulation_service  # noqa: E402
+from simulation_service import SimulationService  # noqa: E402
+from termination import TerminationMonitor  # noqa: E402
+
+CIRCUIT = "plane(1)"
+
+
+class FakeSolver:
+    # altitude = 10 - t; every poll of AMEIsSimulationRunning adds one second of samples
+    def __init__(self, end_time_s: float = 30.0, fails: bool = False):
+        self.end_time_s = end_time_s
+        self.fails = fails
+        self.samples = 0
+        self.stop_requested = False
+        self.stopped = False
+        self.waits = 0
+
+    def api(self) -> dict:
+        return {
+            "AMEStartSimulation": lambda circuit=None: None,
+            "AMEIsSimulationRunning": self.is_running,
+            "AMEStopSimulation": self.stop,
+            "AMEWaitForSimulationEnd": self.wait,
+            "AMEGetVariableValues": self.values,
+            "AMEGetActiveCircuit": lambda: CIRCUIT,
+            "AMESetActiveCircuit": lambda circuit: None,
+        }
+
+    def is_running(self, circuit=None) -> bool:
+        if self.stop_requested:
+            # the solver needs one more poll to wind down
+            running, self.stopped = not self.stopped, True
+            return running
+        if self.samples * 0.1 >= self.end_time_s:
+            return False
+        self.samples += 10
+        return True
+
+    def stop(self, circuit=None) -> None:
+        self.stop_requested = True
+
+    def wait(self, circuit=None) -> None:
+        # as in the vendored AME.py: raises for a stopped or failed last run
+        self.waits += 1
+        if self.stop_requested or self.fails:
+            raise RuntimeError("simulation failed or stopped")
+
+    def values(self, name, dataset=None):
+        return [(i * 0.1, 10.0 - i * 0.1) for i in range(self.samples)]
+
+
+def _service() -> SimulationService:
+    # only the polling paths are exercised, so no API session is opened
+    service = SimulationService.__new__(SimulationService)
+    service.circuits = {"circuit_1": CIRCUIT}
+    service.circuit_dirs = {"circuit_1": os.getcwd()}
+    return service
+
+
+def _monitor() -> TerminationMonitor:
+    return TerminationMonitor([{"variable": "altitude@body", "below": 0, "reason": "crashed"}])
+
+
+class TerminationStopTest(unittest.TestCase):
+    def test_stopped_run_is_not_a_failure(self):
+        solver, monitor = FakeSolver(), _monitor()
+        with mock.patch.multiple(simulation_service, create=True, **solver.api()):
+            _service().run_simulation_monitored(monitor, 0.5, 0.0)
+        self.assertTrue(solver.stopped)
+        self.assertEqual(solver.waits, 0)
+        self.assertEqual(monitor.summary()["reason"], "crashed")
+        self.assertAlmostEqual(monitor.summary()["time_s"], 10.1)
+
+    def test_stopped_overlapped_run_is_not_a_failure(self):
+        solver, monitor = FakeSolver(), _monitor()
+        with mock.patch.multiple(simulation_service, create=True, **solver.api()):
+            results = _service().run_simulations_overlapped(["circuit_1"], {"circuit_1": (monitor, 0.5)}, 0.0)
+        self.assertIsInstance(results["circuit_1"], float)
+        self.assertTrue(solver.stopped)
+        self.assertEqual(monitor.summary()["reason"], "crashed")
+
+    def test_failed_run_still_raises(self):
+        # ends before any rule fires, so the wait reports the failure as before
+        solver, monitor = FakeSolver(end_time_s=5.0, fails=True), _monitor()
+        with mock.patch.multiple(simulation_service, create=True, **solver.api()):
+            with self.assertRaises(RuntimeError):
+                _service().run_simulation_monitored(monitor, 0.5, 0.0)
+        self.assertIsNone(monitor.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()